@@ -0,0 +1,123 @@
+# anomaly.py
+"""
+Autoencoder anomaly scoring.
+
+The autoencoder from train.train_autoencoder is trained on healthy signatures only, so its
+reconstruction error is the anomaly score. Errors are computed per trace and per frequency band
+(equal slices of the log grid), and thresholds calibrated on the healthy training set are stored
+next to the model as <model>.thresholds.json. A multitask model (multitask.py) works as well; its
+reconstruction output is used.
+"""
+import json
+import os
+import numpy as np
+
+AE_PATH = 'fra_autoencoder.h5'
+
+def thresholds_path(model_path):
+    return os.path.splitext(model_path)[0] + '.thresholds.json'
+
+def _band_edges(length, n_bands):
+    return np.linspace(0, length, n_bands + 1).astype(int)
+
+def reconstruction_errors(model, X, n_bands=8, batch_size=1024):
+    """
+    Mean squared reconstruction error of an (N, L) batch: per trace (N,) and per band (N, n_bands).
+    Rows containing NaN (e.g. archive rows without features) score NaN.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    edges = _band_edges(X.shape[1], n_bands)
+    trace = np.empty(X.shape[0], dtype=np.float32)
+    bands = np.empty((X.shape[0], n_bands), dtype=np.float32)
+    for s in range(0, X.shape[0], batch_size):
+        xb = X[s:s + batch_size]
+        out = model(xb[..., None], training=False)
+        # a multitask model returns class probabilities and the reconstruction together
+        rec = np.asarray(out['recon_out'] if isinstance(out, dict) else out)[..., 0]
+        sq = (xb - rec) ** 2
+        trace[s:s + len(xb)] = sq.mean(axis=1)
+        bands[s:s + len(xb)] = np.add.reduceat(sq, edges[:-1], axis=1) / np.diff(edges)
+    return trace, bands
+
+def calibrate(model, X_healthy, quantile=0.99, n_bands=8, batch_size=1024):
+    """Thresholds at the given quantile of the healthy reconstruction-error distribution."""
+    trace, bands = reconstruction_errors(model, X_healthy, n_bands=n_bands, batch_size=batch_size)
+    return {
+        'quantile': quantile,
+        'n_bands': n_bands,
+        'input_len': int(np.shape(X_healthy)[1]),
+        'trace': float(np.nanquantile(trace, quantile)),
+        'bands': np.nanquantile(bands, quantile, axis=0).astype(float).tolist(),
+        'healthy_mean': float(np.nanmean(trace)),
+    }
+
+def save_thresholds(thresholds, model_path=AE_PATH):
+    path = thresholds_path(model_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(thresholds, f, indent=2)
+    return path
+
+def load_thresholds(model_path=AE_PATH):
+    with open(thresholds_path(model_path), encoding='utf-8') as f:
+        return json.load(f)
+
+class AnomalyScorer:
+    """
+    Loads the autoencoder and its thresholds once and scores batches or whole archives.
+    Inputs must have the model's length, and archives the grid saved with it (<model>.grid.json);
+    anything else raises ValueError rather than returning scores for misaligned features.
+    """
+
+    def __init__(self, model_path=AE_PATH, batch_size=1024):
+        from export import load_runtime_model
+        from preprocessing import load_grid
+        self.model = load_runtime_model(model_path)
+        if self.model is None:
+            raise FileNotFoundError(f"Autoencoder '{model_path}' not found. Train it with train.train_autoencoder.")
+        self.thresholds = load_thresholds(model_path)
+        self.grid = load_grid(model_path)
+        self.batch_size = batch_size
+
+    def score(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        input_len = self.thresholds.get('input_len')
+        if input_len is not None and (X.ndim != 2 or X.shape[1] != input_len):
+            raise ValueError(f"Expected (N, {input_len}) features, got {X.shape}")
+        n_bands = self.thresholds['n_bands']
+        trace, bands = reconstruction_errors(self.model, X, n_bands=n_bands, batch_size=self.batch_size)
+        band_th = np.asarray(self.thresholds['bands'], dtype=np.float32)
+        with np.errstate(invalid='ignore'):
+            return {
+                'score': trace,
+                'band_scores': bands,
+                'anomalous': trace > self.thresholds['trace'],
+                'band_anomalous': bands > band_th,
+            }
+
+    def score_archive(self, archive, channel='magnitude_db', block=None):
+        """
+        Score every feature row of a FleetArchive in one pass, reading `block` rows at a time,
+        so memory is bounded by one block of features plus the (N,) and (N, n_bands) results.
+        """
+        grid = archive.feature_grid
+        if self.grid is not None and grid is not None:
+            from preprocessing import grid_span
+            g = self.grid
+            got = grid_span(grid) + (len(grid),)
+            if not np.allclose(got, (g['fmin'], g['fmax'], g['n_points']), rtol=1e-9):
+                raise ValueError(f"Archive features are on grid {got} (fmin, fmax, n_points), "
+                                 f"the model was trained on {(g['fmin'], g['fmax'], g['n_points'])}")
+        block = block or 8 * self.batch_size
+        n = len(archive)
+        n_bands = self.thresholds['n_bands']
+        out = {
+            'score': np.empty(n, dtype=np.float32),
+            'band_scores': np.empty((n, n_bands), dtype=np.float32),
+            'anomalous': np.empty(n, dtype=bool),
+            'band_anomalous': np.empty((n, n_bands), dtype=bool),
+        }
+        for s in range(0, n, block):
+            res = self.score(archive.features(channel, s, min(s + block, n)))
+            for k, v in res.items():
+                out[k][s:s + len(v)] = v
+        return out
@@ -1,140 +1,202 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-import base64
+import hashlib
 import numpy as np
 from datetime import datetime
+from decimate import decimate
+from metrics import span
 
 # ------------------- Streamlit Page Config -------------------
 st.set_page_config(page_title="AI FRA Fault Report Analyzer", layout="wide")
 st.title("🧠 Transformer FRA Fault Analyzer")
 st.markdown("Upload your FRA dataset to generate an **AI-powered diagnostic report** including predictions, plots, and recommendations.")
 
+# ------------------- Cached computations -------------------
+# Everything below is keyed by the SHA-256 of the uploaded bytes, so widget interactions and
+# reruns reuse results instead of re-parsing and re-rendering. max_entries bounds memory.
+# Arguments with a leading underscore are not hashed by Streamlit; the digest stands in for them.
+# The parsed frame is shared read-only (cache_resource) rather than copied out on every rerun.
+CACHE_ENTRIES = 16
+
+# simulated output, used while no trained model file is present
+fault_types = [
+    "Core Grounding or Shorted Turns",
+    "Open Circuit",
+    "Tap Changer Fault",
+    "Partial Discharge or Dielectric Fault",
+    "Healthy Transformer"
+]
+simulated_recommendations = {
+    "Core Grounding or Shorted Turns": "Inspect transformer core grounding and perform insulation resistance testing. Possible winding short detected.",
+    "Open Circuit": "Check for discontinuities in winding connections or broken leads.",
+    "Tap Changer Fault": "Inspect OLTC (On Load Tap Changer) contacts for carbonization or wear.",
+    "Partial Discharge or Dielectric Fault": "Conduct PD testing and DGA to evaluate insulation health.",
+    "Healthy Transformer": "No major fault detected. Continue with routine maintenance schedule."
+}
+
+@st.cache_resource(max_entries=CACHE_ENTRIES, show_spinner=False)
+def load_frame(digest, _data):
+    with span('parse_csv', app='streamlit'):
+        return pd.read_csv(io.BytesIO(_data))
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def summarize(digest, _df):
+    summary = _df.describe().T
+    rows = [["Column", "Mean", "Std Dev", "Min", "Max"]]
+    for col in _df.select_dtypes(include=["float64", "int64"]).columns:
+        rows.append([
+            col,
+            round(_df[col].mean(), 3),
+            round(_df[col].std(), 3),
+            round(_df[col].min(), 3),
+            round(_df[col].max(), 3)
+        ])
+    return summary, rows
+
+# ------------------- AI Fault Prediction (trained model when present, else simulated) -------------------
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def predict(digest, _data):
+    # features come from the on-disk feature cache shared with the API and training, so they
+    # survive app restarts and are not recomputed for files the service has already seen.
+    # With a model present, a file that cannot be featurized raises ValueError (not cached).
+    from inference import load_classifier, model_grid, predict_proba, label_for
+    model = load_classifier()
+    if model is not None:
+        from feature_cache import default_cache, features_from_bytes
+        from parse_csv import parse_csv
+        fmin, fmax = model_grid()
+        with span('preprocess', app='streamlit'):
+            x = features_from_bytes(_data, parse_csv, n_points=model.input_shape[1], fmin=fmin, fmax=fmax,
+                                    cache=default_cache(), digest=digest)[:1]
+        with span('predict', app='streamlit'):
+            probs = predict_proba(model, x)[0]
+        i = int(np.argmax(probs))
+        return label_for(i), round(float(probs[i]) * 100, 2)
+    with span('predict', app='streamlit'):
+        fault = np.random.choice(fault_types)
+        probability = round(np.random.uniform(85, 99), 2)
+    return fault, probability
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def plot_png(digest, _df):
+    with span('report_png', app='streamlit'):
+        return _plot_png(_df)
+
+def _plot_png(_df):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    if "Frequency" in _df.columns and "Magnitude" in _df.columns:
+        ax.plot(*decimate(_df["Frequency"], _df["Magnitude"]), color="blue", linewidth=2)
+        ax.set_xlabel("Frequency (Hz)")
+        ax.set_ylabel("Magnitude (dB)")
+        ax.set_title("Frequency Response Curve")
+        ax.grid(True, alpha=0.3)
+    else:
+        ax.text(0.5, 0.5, "Frequency/Magnitude columns not found in dataset", ha="center", va="center")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+# ------------------- PDF Report Generator -------------------
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner="Building PDF report...")
+def create_pdf(digest, filename, fault, probability, recommendation, _data_summary, _png):
+    # ReportLab is only loaded once a report is actually requested
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    # -------- Cover Page --------
+    elements.append(Paragraph("AI-Based Transformer FRA Diagnostic Report", styles["Title"]))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles["Normal"]))
+    elements.append(Paragraph(f"Uploaded File: {filename}", styles["Normal"]))
+    elements.append(PageBreak())
+
+    # -------- Summary --------
+    elements.append(Paragraph("Dataset Summary", styles["Heading2"]))
+    t = Table(_data_summary)
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ]))
+    elements.append(t)
+    elements.append(PageBreak())
+
+    # -------- Prediction Section --------
+    elements.append(Paragraph("AI Fault Prediction", styles["Heading2"]))
+    elements.append(Paragraph(f"<b>Predicted Fault:</b> {fault}", styles["Normal"]))
+    elements.append(Paragraph(f"<b>Confidence:</b> {probability}%", styles["Normal"]))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph("Recommendation:", styles["Heading3"]))
+    elements.append(Paragraph(recommendation, styles["Normal"]))
+    elements.append(PageBreak())
+
+    # -------- Visualization --------
+    elements.append(Paragraph("Frequency Response Visualization", styles["Heading2"]))
+    elements.append(Image(io.BytesIO(_png), width=400, height=200))
+    elements.append(Spacer(1, 12))
+
+    # -------- Closing --------
+    elements.append(Paragraph("This report was auto-generated using AI and FRA signal analysis models.", styles["Italic"]))
+    elements.append(Paragraph("© 2025 Purgon AI Systems", styles["Normal"]))
+
+    with span('report_pdf', app='streamlit'):
+        doc.build(elements)
+    pdf_data = buffer.getvalue()
+    buffer.close()
+    return pdf_data
+
 # ------------------- File Upload -------------------
 uploaded_file = st.file_uploader("📤 Upload FRA Dataset (CSV)", type=["csv"])
 
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
+    data = uploaded_file.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    df = load_frame(digest, data)
     st.success(f"✅ File '{uploaded_file.name}' uploaded successfully!")
 
     # ------------------- Dataset Summary -------------------
     st.subheader("📊 Dataset Summary")
     st.dataframe(df.head())
 
-    summary = df.describe().T
+    summary, data_summary = summarize(digest, df)
     st.write(summary)
 
-    # ------------------- AI Fault Prediction (Simulated / Replace with Model) -------------------
-    fault_types = [
-        "Core Grounding or Shorted Turns",
-        "Open Circuit",
-        "Tap Changer Fault",
-        "Partial Discharge or Dielectric Fault",
-        "Healthy Transformer"
-    ]
-    fault = np.random.choice(fault_types)
-    probability = round(np.random.uniform(85, 99), 2)
+    try:
+        fault, probability = predict(digest, data)
+    except ValueError as e:
+        st.error(f"❌ Could not prepare '{uploaded_file.name}' for the model: {e}")
+        st.stop()
 
     # ------------------- Insights -------------------
     st.markdown(f"### 🔍 Predicted Fault: **{fault}**")
     st.markdown(f"### 📈 Confidence: **{probability}%**")
 
-    if fault == "Core Grounding or Shorted Turns":
-        recommendation = "Inspect transformer core grounding and perform insulation resistance testing. Possible winding short detected."
-    elif fault == "Open Circuit":
-        recommendation = "Check for discontinuities in winding connections or broken leads."
-    elif fault == "Tap Changer Fault":
-        recommendation = "Inspect OLTC (On Load Tap Changer) contacts for carbonization or wear."
-    elif fault == "Partial Discharge or Dielectric Fault":
-        recommendation = "Conduct PD testing and DGA to evaluate insulation health."
-    else:
-        recommendation = "No major fault detected. Continue with routine maintenance schedule."
+    # model labels share the report recommendations; the simulated labels keep their own
+    from inference import recommendation_for
+    recommendation = simulated_recommendations.get(fault) or recommendation_for(fault)
 
     st.info(recommendation)
 
     # ------------------- Visualization -------------------
     st.subheader("📉 Frequency Response Plot")
-    fig, ax = plt.subplots(figsize=(8, 4))
-    if "Frequency" in df.columns and "Magnitude" in df.columns:
-        ax.plot(df["Frequency"], df["Magnitude"], color="blue", linewidth=2)
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Magnitude (dB)")
-        ax.set_title("Frequency Response Curve")
-        ax.grid(True, alpha=0.3)
-    else:
-        ax.text(0.5, 0.5, "Frequency/Magnitude columns not found in dataset", ha="center", va="center")
-    st.pyplot(fig)
+    png = plot_png(digest, df)
+    st.image(png)
 
-    # ------------------- PDF Report Generator -------------------
+    # ------------------- PDF Report -------------------
     st.subheader("📄 Generate AI Report")
 
-    def create_pdf():
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-
-        # -------- Cover Page --------
-        elements.append(Paragraph("AI-Based Transformer FRA Diagnostic Report", styles["Title"]))
-        elements.append(Spacer(1, 12))
-        elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles["Normal"]))
-        elements.append(Paragraph(f"Uploaded File: {uploaded_file.name}", styles["Normal"]))
-        elements.append(PageBreak())
-
-        # -------- Summary --------
-        elements.append(Paragraph("Dataset Summary", styles["Heading2"]))
-        data_summary = [["Column", "Mean", "Std Dev", "Min", "Max"]]
-        for col in df.select_dtypes(include=["float64", "int64"]).columns:
-            data_summary.append([
-                col,
-                round(df[col].mean(), 3),
-                round(df[col].std(), 3),
-                round(df[col].min(), 3),
-                round(df[col].max(), 3)
-            ])
-        t = Table(data_summary)
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ]))
-        elements.append(t)
-        elements.append(PageBreak())
-
-        # -------- Prediction Section --------
-        elements.append(Paragraph("AI Fault Prediction", styles["Heading2"]))
-        elements.append(Paragraph(f"<b>Predicted Fault:</b> {fault}", styles["Normal"]))
-        elements.append(Paragraph(f"<b>Confidence:</b> {probability}%", styles["Normal"]))
-        elements.append(Spacer(1, 12))
-        elements.append(Paragraph("Recommendation:", styles["Heading3"]))
-        elements.append(Paragraph(recommendation, styles["Normal"]))
-        elements.append(PageBreak())
-
-        # -------- Visualization --------
-        elements.append(Paragraph("Frequency Response Visualization", styles["Heading2"]))
-        img_buf = io.BytesIO()
-        fig.savefig(img_buf, format="png")
-        img_buf.seek(0)
-        elements.append(Image(img_buf, width=400, height=200))
-        elements.append(Spacer(1, 12))
-
-        # -------- Closing --------
-        elements.append(Paragraph("This report was auto-generated using AI and FRA signal analysis models.", styles["Italic"]))
-        elements.append(Paragraph("© 2025 Purgon AI Systems", styles["Normal"]))
-
-        doc.build(elements)
-        pdf_data = buffer.getvalue()
-        buffer.close()
-        return pdf_data
-
-    if st.button("📥 Download Full Report as PDF"):
-        pdf = create_pdf()
-        b64 = base64.b64encode(pdf).decode()
-        href = f'<a href="data:application/pdf;base64,{b64}" download="FRA_Report.pdf">📄 Click here to download your detailed report</a>'
-        st.markdown(href, unsafe_allow_html=True)
+    # built only on request, then served from the cache on every later rerun
+    if st.button("🛠️ Prepare PDF Report") or st.session_state.get("pdf_digest") == digest:
+        st.session_state["pdf_digest"] = digest
+        pdf = create_pdf(digest, uploaded_file.name, fault, probability, recommendation, data_summary, png)
+        st.download_button("📥 Download Full Report as PDF", data=pdf, file_name="FRA_Report.pdf", mime="application/pdf")
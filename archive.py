@@ -0,0 +1,215 @@
+# archive.py
+import json
+import numpy as np
+import h5py
+
+INDEX_KEYS = ('transformer', 'tap', 'date', 'operator', 'source')
+CHANNELS = ('frequency', 'magnitude_db', 'phase_deg')
+
+def _index_values(parsed, source=None):
+    meta = parsed.get('metadata') or {}
+    return {
+        'transformer': str(meta.get('transformer', meta.get('id', ''))),
+        'tap': str(meta.get('tap', '')),
+        'date': str(meta.get('date', '')),
+        'operator': str(meta.get('operator', '')),
+        'source': '' if source is None else str(source),
+    }
+
+class FleetArchive:
+    """
+    Append-only HDF5 store holding many FRA sweeps in one file.
+
+    Samples of every sweep are concatenated into chunked, compressed 1-D datasets under
+    /data (one per channel); /rows holds offset/length per sweep, so row i is one slice read.
+    /index holds one string column per INDEX_KEYS entry for cheap lookups, and
+    /rows/metadata keeps the full metadata dict as JSON.
+    Optionally /features holds preprocessed (N, n_points) float32 matrices per channel on the
+    shared log grid /features/frequency, ready to feed the models.
+
+        with FleetArchive('fleet.h5') as ar:
+            ar.extend(parsed_dicts)
+            rows = ar.find(transformer='T-104', tap='5')
+            for sweep in ar.iter_rows(rows): ...
+    """
+
+    def __init__(self, path, mode='a', chunk_samples=1 << 16, chunk_rows=4096, compression='gzip'):
+        self.path = path
+        self.f = h5py.File(path, mode)
+        self._chunk_samples = chunk_samples
+        self._chunk_rows = chunk_rows
+        self._compression = compression
+        if 'rows' not in self.f and self.f.mode != 'r':
+            self._create()
+
+    # ---------- layout ----------
+    def _col(self, name, dtype, chunks):
+        return self.f.create_dataset(name, shape=(0,), maxshape=(None,), dtype=dtype,
+                                     chunks=(chunks,), compression=self._compression, shuffle=True)
+
+    def _create(self):
+        for ch in CHANNELS:
+            self._col(f'data/{ch}', 'f8', self._chunk_samples)
+        self._col('rows/offset', 'i8', self._chunk_rows)
+        self._col('rows/length', 'i8', self._chunk_rows)
+        self._col('rows/has_phase', 'bool', self._chunk_rows)
+        self._col('rows/metadata', h5py.string_dtype(), self._chunk_rows)
+        for k in INDEX_KEYS:
+            self._col(f'index/{k}', h5py.string_dtype(), self._chunk_rows)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.f['rows/offset'].shape[0]
+
+    # ---------- writing ----------
+    def append(self, parsed, source=None):
+        """Append one canonical parser dict; returns its row number."""
+        return self.extend([parsed], sources=[source])[0]
+
+    def _create_features(self, grid):
+        n = len(grid)
+        self.f.create_dataset('features/frequency', data=np.asarray(grid, dtype=float))
+        for ch in CHANNELS[1:]:
+            # rows appended before features existed read back as NaN
+            self.f.create_dataset(f'features/{ch}', shape=(len(self), n), maxshape=(None, n), dtype='f4',
+                                  chunks=(max(1, min(self._chunk_rows, (1 << 20) // (4 * n))), n),
+                                  compression=self._compression, shuffle=True, fillvalue=np.nan)
+
+    def extend(self, parsed_list, sources=None, features=None):
+        """
+        Append many canonical dicts with one resize per dataset; returns their row numbers.
+        features: optional preprocessing.preprocess_batch() result for the same rows on a fixed grid;
+        once an archive holds features every later append must supply them.
+        """
+        parsed_list = list(parsed_list)
+        if not parsed_list:
+            return np.empty(0, dtype=np.int64)
+        if features is not None:
+            grid = np.asarray(features['frequency'])
+            if grid.ndim != 1:
+                raise ValueError("Archive: features must be resampled onto one shared grid (pass fmin and fmax).")
+            if 'features' not in self.f:
+                self._create_features(grid)
+            elif not np.allclose(self.f['features/frequency'][...], grid):
+                raise ValueError("Archive: feature grid differs from the one stored in the archive.")
+        elif 'features' in self.f:
+            raise ValueError("Archive: this archive stores features; pass features= for new rows.")
+        sources = list(sources) if sources is not None else [None] * len(parsed_list)
+        lengths = np.array([len(p['frequency']) for p in parsed_list], dtype=np.int64)
+        for p, n in zip(parsed_list, lengths):
+            if len(p['magnitude_db']) != n or (p.get('phase_deg') is not None and len(p['phase_deg']) != n):
+                raise ValueError("Archive: frequency/magnitude/phase lengths differ.")
+
+        start_row = len(self)
+        start = self.f['data/frequency'].shape[0]
+        total = int(lengths.sum())
+        offsets = start + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        for ch in CHANNELS:
+            buf = np.full(total, np.nan)
+            for p, o, n in zip(parsed_list, offsets - start, lengths):
+                if p.get(ch) is not None:
+                    buf[o:o + n] = p[ch]
+            ds = self.f[f'data/{ch}']
+            ds.resize((start + total,))
+            ds[start:] = buf
+
+        cols = {
+            'rows/length': lengths,
+            'rows/has_phase': np.array([p.get('phase_deg') is not None for p in parsed_list]),
+            'rows/metadata': np.array([json.dumps(p.get('metadata') or {}, default=str) for p in parsed_list], dtype=object),
+        }
+        idx = [_index_values(p, s) for p, s in zip(parsed_list, sources)]
+        for k in INDEX_KEYS:
+            cols[f'index/{k}'] = np.array([v[k] for v in idx], dtype=object)
+        cols['rows/offset'] = offsets
+        if features is not None:
+            for ch in CHANNELS[1:]:
+                ds = self.f[f'features/{ch}']
+                ds.resize((start_row + len(parsed_list), ds.shape[1]))
+                ds[start_row:] = features[ch]
+        # rows/offset goes last: len() follows it, so a sweep only becomes visible once fully written
+        for name, values in cols.items():
+            ds = self.f[name]
+            ds.resize((start_row + len(parsed_list),))
+            ds[start_row:] = values
+        self.f.flush()
+        return np.arange(start_row, start_row + len(parsed_list))
+
+    # ---------- reading ----------
+    def __getitem__(self, i):
+        """Row i as a canonical dict; only that sweep's samples are read."""
+        n_rows = len(self)
+        if i < 0:
+            i += n_rows
+        if not 0 <= i < n_rows:
+            raise IndexError(i)
+        o = int(self.f['rows/offset'][i]); n = int(self.f['rows/length'][i])
+        out = {'metadata': json.loads(self.f['rows/metadata'].asstr()[i])}
+        for ch in CHANNELS:
+            out[ch] = self.f[f'data/{ch}'][o:o + n]
+        if not self.f['rows/has_phase'][i]:
+            out['phase_deg'] = None
+        return out
+
+    def iter_rows(self, rows=None, block=256):
+        """Yield canonical dicts for `rows` (default: all), reading row tables in blocks."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        for b in range(0, rows.size, block):
+            # h5py fancy indexing needs strictly increasing indices
+            srt, back = np.unique(rows[b:b + block], return_inverse=True)
+            offs = self.f['rows/offset'][srt]; lens = self.f['rows/length'][srt]
+            phase = self.f['rows/has_phase'][srt]
+            meta = self.f['rows/metadata'].asstr()[srt]
+            for j in back:
+                o, n = int(offs[j]), int(lens[j])
+                out = {'metadata': json.loads(meta[j])}
+                for ch in CHANNELS:
+                    out[ch] = self.f[f'data/{ch}'][o:o + n]
+                if not phase[j]:
+                    out['phase_deg'] = None
+                yield out
+
+    @property
+    def feature_grid(self):
+        return self.f['features/frequency'][...] if 'features' in self.f else None
+
+    def features(self, channel='magnitude_db', start=0, stop=None):
+        """Preprocessed feature rows [start, stop) of one channel as an (n, n_points) float32 array."""
+        if 'features' not in self.f:
+            raise KeyError("Archive: no features stored. Ingest with preprocessing enabled.")
+        return self.f[f'features/{channel}'][start:stop]
+
+    def index(self, key, start=0, stop=None):
+        """String values of one index column for rows [start, stop)."""
+        return self.f[f'index/{key}'].asstr()[start:stop]
+
+    def find(self, block=1 << 16, **criteria):
+        """
+        Row numbers whose index columns equal the given values, e.g. find(transformer='T1', tap='3').
+        Values may also be a collection of accepted strings. Columns are scanned in blocks.
+        """
+        for k in criteria:
+            if k not in INDEX_KEYS:
+                raise KeyError(f"Archive: unknown index key '{k}'. Use one of {INDEX_KEYS}.")
+        hits = []
+        n_rows = len(self)
+        for start in range(0, n_rows, block):
+            stop = min(start + block, n_rows)
+            mask = np.ones(stop - start, dtype=bool)
+            for k, want in criteria.items():
+                col = self.index(k, start, stop)
+                if isinstance(want, (list, tuple, set, frozenset)):
+                    mask &= np.isin(col, [str(w) for w in want])
+                else:
+                    mask &= col == str(want)
+            hits.append(start + np.flatnonzero(mask))
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.int64)
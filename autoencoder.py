@@ -1,7 +1,7 @@
 # autoencoder.py
-from tensorflow.keras import layers, models
 
 def build_autoencoder(input_len=1024, latent_dim=64):
+    from tensorflow.keras import layers, models
     inp = layers.Input(shape=(input_len,1))
     x = layers.Conv1D(32, 7, activation='relu', padding='same')(inp)
     x = layers.MaxPooling1D(2, padding='same')(x)
@@ -0,0 +1,352 @@
+# benchmark.py
+"""
+Reproducible pipeline benchmarks.
+
+Input files are built from synthetic_data signatures (seeded) for two axes:
+  * points: one sweep of 1k .. 10M samples as CSV, XML and vendor binary
+  * sweeps: 1 .. 10k sweeps of SWEEP_POINTS samples as multi-sweep CSV and binary
+and every stage (parsing, resample/denoise/normalize, batched preprocessing, classifier
+prediction, analyze_fra_file reports) is timed and memory-profiled, along with the import cost of
+each entry module (fresh interpreter: wall time, RSS, heavy dependencies loaded). Results are
+written as JSON named after the current commit, so runs can be compared across commits:
+
+    python benchmark.py --quick
+    python benchmark.py --out bench_results
+    python benchmark.py --compare bench_results/<old>.json bench_results/<new>.json
+
+Wall time is the median of --repeats runs; peak_mb is the tracemalloc peak of one extra run
+(NumPy buffers included), and rss_mb the process high-water mark after the stage.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+POINT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+SWEEP_COUNTS = [1, 10, 100, 1_000, 10_000]
+SWEEP_POINTS = 1_000
+N_FEATURES = 1024
+MAX_REPORTS = 100  # analyze_fra_file writes two files per sweep; cap the sweeps axis there
+ENTRY_POINTS = ['parse_csv', 'parse_xml', 'parse_vendor_binary', 'preprocessing', 'ingest', 'inference',
+                'export', 'anomaly', 'similarity', 'train', 'server']
+HEAVY_MODULES = ['pandas', 'scipy', 'h5py', 'matplotlib', 'plotly', 'reportlab', 'tensorflow', 'sklearn',
+                 'fastapi']
+DATA_DIR = 'bench_data'
+RESULTS_DIR = 'bench_results'
+
+# ---------- inputs ----------
+
+def make_sweeps(n_sweeps, n_points, seed=0):
+    """(freq, mag (n_sweeps, n_points), phase (n_sweeps, n_points)) on one log axis (Hz)."""
+    from synthetic_data import LABELS, generate_batch, _grid
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, len(LABELS), n_sweeps)
+    mag = np.empty((n_sweeps, n_points))
+    for i, label in enumerate(LABELS):
+        rows = np.flatnonzero(labels == i)
+        mag[rows] = generate_batch(rows.size, n_points, fault=label, rng=rng, dtype=float)
+    freq, logf, _ = _grid(n_points)
+    phase = -90 * np.tanh(logf - np.log(300)) + np.gradient(mag, axis=1) * 10
+    return freq * 100, mag, phase  # 100 Hz .. 1 MHz, a typical FRA span
+
+def write_csv(path, freq, mag, phase):
+    """Single sweep with the app's headers, or several with a 'sweep' column."""
+    n_sweeps, n = mag.shape
+    with open(path, 'w', encoding='utf-8') as f:
+        if n_sweeps == 1:
+            f.write('Frequency (Hz),Magnitude (dB),Phase (°)\n')
+            np.savetxt(f, np.column_stack([freq, mag[0], phase[0]]), fmt='%.8g', delimiter=',')
+        else:
+            f.write('sweep,Frequency (Hz),Magnitude (dB),Phase (°)\n')
+            sweep = np.repeat(np.arange(n_sweeps), n)
+            np.savetxt(f, np.column_stack([sweep, np.tile(freq, n_sweeps), mag.ravel(), phase.ravel()]),
+                       fmt=['%d', '%.8g', '%.8g', '%.8g'], delimiter=',')
+
+def write_xml(path, freq, mag, phase):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<sweep><transformer>T1</transformer><tap>5</tap>\n')
+        for tag, arr in (('Frequency', freq), ('Magnitude', mag[0]), ('Phase', phase[0])):
+            f.write(f'<{tag}>')
+            np.savetxt(f, arr[None], fmt='%.8g', delimiter=' ', newline='')
+            f.write(f'</{tag}>\n')
+        f.write('</sweep>\n')
+
+def binary_schema(n_points):
+    """Per-record f64 freq/mag/phase layout with a small record header, one record per sweep."""
+    from parse_vendor_binary import SCHEMAS, register_schema
+    name = f'bench_f64_{n_points}'
+    if name not in SCHEMAS:
+        register_schema(name, [('frequency', 'f8'), ('magnitude_db', 'f8'), ('phase_deg', 'f8')],
+                        header_size=16, record_header=8, header_fields=[('sweep', 'u4'), ('tap', 'u4')],
+                        points=n_points)
+    return name
+
+def write_binary(path, freq, mag, phase):
+    n_sweeps, n = mag.shape
+    rec = np.zeros(n_sweeps, dtype=[('sweep', '<u4'), ('tap', '<u4'),
+                                    ('points', [('frequency', '<f8'), ('magnitude_db', '<f8'),
+                                                ('phase_deg', '<f8')], (n,))])
+    rec['sweep'] = np.arange(n_sweeps)
+    rec['points']['frequency'] = freq
+    rec['points']['magnitude_db'] = mag
+    rec['points']['phase_deg'] = phase
+    with open(path, 'wb') as f:
+        f.write(b'FRABENCH'.ljust(16, b'\0'))
+        rec.tofile(f)
+
+def ensure_inputs(data_dir, name, n_sweeps, n_points, formats):
+    """Write missing input files (cached across runs); returns {format: path}."""
+    os.makedirs(data_dir, exist_ok=True)
+    writers = {'csv': write_csv, 'xml': write_xml, 'bin': write_binary}
+    paths = {fmt: os.path.join(data_dir, f'{name}.{fmt}') for fmt in formats}
+    missing = [fmt for fmt, p in paths.items() if not os.path.exists(p)]
+    if missing:
+        data = make_sweeps(n_sweeps, n_points)
+        for fmt in missing:
+            tmp = paths[fmt] + '.tmp'
+            writers[fmt](tmp, *data)
+            os.replace(tmp, paths[fmt])
+    return paths
+
+# ---------- measurement ----------
+
+def measure(fn, repeats=3, items=1):
+    """Median wall time of `repeats` calls, then one traced call for the allocation peak."""
+    fn()  # warm-up (imports, caches, model load)
+    times = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    median = statistics.median(times)
+    return {
+        'seconds': round(median, 6),
+        'min_seconds': round(min(times), 6),
+        'items_per_s': round(items / median, 2) if median > 0 else None,
+        'peak_mb': round(peak / 2**20, 2),
+        'rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def _consume(it):
+    n = 0
+    for _ in it:
+        n += 1
+    return n
+
+_IMPORT_PROBE = '''
+import json, resource, sys, time
+t = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - t
+print(json.dumps({{'seconds': seconds, 'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+def import_cost(module, repeats=3):
+    """Import time (median), peak RSS and loaded heavy dependencies of `module` in fresh interpreters."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, '-c', _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                              capture_output=True, text=True, cwd=here)
+        if proc.returncode != 0:
+            return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed'}
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        'seconds': round(statistics.median(r['seconds'] for r in runs), 4),
+        'rss_mb': round(max(r['rss_kb'] for r in runs) / 1024, 1),
+        'loaded': runs[-1]['loaded'],
+    }
+
+# ---------- stages ----------
+
+def point_stages(paths, n_points):
+    from parse_csv import parse_csv
+    from parse_xml import parse_xml
+    from parse_vendor_binary import parse_vendor_binary
+    from preprocessing import resample_to_log_grid, denoise, normalize
+    schema = binary_schema(n_points)
+    parsed = parse_vendor_binary(paths['bin'], schema)
+    freq, mag = np.array(parsed['frequency']), np.array(parsed['magnitude_db'])
+    _, grid_mag = resample_to_log_grid(freq, mag, n_points=N_FEATURES)
+    clean = denoise(grid_mag)
+    return {
+        'parse_csv': lambda: parse_csv(paths['csv']),
+        'parse_xml': lambda: parse_xml(paths['xml']),
+        'parse_vendor_binary': lambda: np.array(parse_vendor_binary(paths['bin'], schema)['magnitude_db']),
+        'resample_to_log_grid': lambda: resample_to_log_grid(freq, mag, n_points=N_FEATURES),
+        'denoise': lambda: denoise(grid_mag),
+        'normalize': lambda: normalize(clean),
+    }
+
+def sweep_stages(paths, n_sweeps):
+    from parse_csv import iter_csv_sweeps
+    from parse_vendor_binary import iter_vendor_binary
+    from preprocessing import preprocess_batch
+    schema = binary_schema(SWEEP_POINTS)
+    sweeps = list(iter_vendor_binary(paths['bin'], schema))
+    return {
+        'iter_csv_sweeps': lambda: _consume(iter_csv_sweeps(paths['csv'])),
+        'iter_vendor_binary': lambda: _consume(iter_vendor_binary(paths['bin'], schema)),
+        'preprocess_batch': lambda: preprocess_batch(sweeps, n_points=N_FEATURES),
+    }
+
+# imported lazily inside analyze_fra_file/render_report, so importing inference does not prove they exist
+REPORT_DEPENDENCIES = ('plotly', 'reportlab', 'matplotlib')
+
+def missing_modules(modules):
+    import importlib.util
+    return [m for m in modules if importlib.util.find_spec(m) is None]
+
+def model_stages(paths, n_sweeps, n_points):
+    """Classifier prediction and full reports; skipped with a reason when a backend is missing."""
+    import pandas as pd
+    from parse_vendor_binary import iter_vendor_binary
+    from preprocessing import preprocess_batch
+    stages, skipped = {}, {}
+    sweeps = list(iter_vendor_binary(paths['bin'], binary_schema(n_points)))
+    try:
+        from inference import load_classifier, predict_proba, analyze_fra_file
+    except ImportError as e:
+        return stages, {'predict': str(e), 'analyze_fra_file': str(e)}
+    try:
+        model = load_classifier()
+        if model is None:
+            skipped['predict'] = 'no trained classifier (fra_classifier.h5)'
+        else:
+            X = preprocess_batch(sweeps, n_points=model.input_shape[1])['magnitude_db'].astype(np.float32)
+            stages['predict'] = lambda: predict_proba(model, X)
+    except ImportError as e:
+        # a model file exists but neither TensorFlow nor tflite_runtime is installed
+        skipped['predict'] = f'no model runtime: {e}'
+    missing = missing_modules(REPORT_DEPENDENCIES)
+    if missing:
+        skipped['analyze_fra_file'] = f"missing optional dependencies: {', '.join(missing)}"
+        return stages, skipped
+    if n_sweeps > MAX_REPORTS:
+        skipped['analyze_fra_file'] = f'more than {MAX_REPORTS} sweeps'
+        return stages, skipped
+    frames = [pd.DataFrame({'Frequency (Hz)': np.array(s['frequency']), 'Magnitude (dB)': np.array(s['magnitude_db']),
+                            'Phase (°)': np.array(s['phase_deg'])}) for s in sweeps]
+    out_dir = tempfile.mkdtemp(prefix='fra_bench_')
+
+    def reports():
+        for df in frames:
+            for p in analyze_fra_file(df, out_dir=out_dir).values():
+                if isinstance(p, str) and os.path.exists(p):
+                    os.remove(p)
+    stages['analyze_fra_file'] = reports
+    return stages, skipped
+
+# ---------- runner ----------
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+def run(point_sizes=POINT_SIZES, sweep_counts=SWEEP_COUNTS, repeats=3, data_dir=DATA_DIR, stages=None,
+        imports=ENTRY_POINTS):
+    """All benchmark cases as a list of result rows."""
+    rows = []
+    for module in imports or ():
+        row = dict({'axis': 'import', 'size': 0, 'stage': module}, **import_cost(module, repeats))
+        rows.append(row)
+        print(json.dumps(row), flush=True)
+
+    def record(axis, size, table, skipped, items):
+        for stage, fn in table.items():
+            if stages and stage not in stages:
+                continue
+            row = {'axis': axis, 'size': size, 'stage': stage}
+            try:
+                row.update(measure(fn, repeats, items))
+            except Exception as e:  # one failing stage should not lose the whole run
+                row['error'] = f'{type(e).__name__}: {e}'
+            rows.append(row)
+            print(json.dumps(row), flush=True)
+        for stage, reason in skipped.items():
+            if not stages or stage in stages:
+                rows.append({'axis': axis, 'size': size, 'stage': stage, 'skipped': reason})
+
+    for n in point_sizes:
+        paths = ensure_inputs(data_dir, f'points_{n}', 1, n, ('csv', 'xml', 'bin'))
+        record('points', n, point_stages(paths, n), {}, n)
+        record('points', n, *model_stages(paths, 1, n), 1)
+    for n in sweep_counts:
+        paths = ensure_inputs(data_dir, f'sweeps_{n}', n, SWEEP_POINTS, ('csv', 'bin'))
+        record('sweeps', n, sweep_stages(paths, n), {}, n)
+        record('sweeps', n, *model_stages(paths, n, SWEEP_POINTS), n)
+    return rows
+
+def save(rows, out_dir=RESULTS_DIR, env=None):
+    env = env or environment()
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = env['timestamp'].replace(':', '').replace('-', '')[:15]
+    path = os.path.join(out_dir, f"{env['commit'] or 'nogit'}-{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': env, 'results': rows}, f, indent=1)
+    return path
+
+def compare(old_path, new_path):
+    """Print new/old time ratios per (axis, size, stage); >1 means slower."""
+    def load(p):
+        with open(p, encoding='utf-8') as f:
+            doc = json.load(f)
+        return doc['environment'], {(r['axis'], r['size'], r['stage']): r for r in doc['results']}
+    old_env, old = load(old_path)
+    new_env, new = load(new_path)
+    print(f"{old_env['commit']} -> {new_env['commit']}")
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key].get('seconds'), new[key].get('seconds')
+        if a and b:
+            print(f"{key[0]:>6} {key[1]:>10} {key[2]:<22} {a:>10.4f}s {b:>10.4f}s  x{b / a:.2f}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark parsing, preprocessing, inference and reports.")
+    ap.add_argument('--quick', action='store_true', help="small sizes only (<=100k points, <=100 sweeps)")
+    ap.add_argument('--points', type=int, nargs='*', default=None, help="override point sizes")
+    ap.add_argument('--sweeps', type=int, nargs='*', default=None, help="override sweep counts")
+    ap.add_argument('--stages', nargs='*', default=None, help="only these stage names")
+    ap.add_argument('--repeats', type=int, default=3)
+    ap.add_argument('--data-dir', default=DATA_DIR)
+    ap.add_argument('--out', default=RESULTS_DIR)
+    ap.add_argument('--imports', nargs='*', default=ENTRY_POINTS, help="entry modules to time imports of")
+    ap.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = ap.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+    points = args.points if args.points is not None else [n for n in POINT_SIZES if not args.quick or n <= 100_000]
+    sweeps = args.sweeps if args.sweeps is not None else [n for n in SWEEP_COUNTS if not args.quick or n <= 100]
+    rows = run(points, sweeps, args.repeats, args.data_dir, args.stages, args.imports)
+    print("Saved", save(rows, args.out), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 # classifier.py
-import tensorflow as tf
-from tensorflow.keras import layers, models
 
 def build_1d_cnn(input_len=1024, n_classes=4):
+    from tensorflow.keras import layers, models
     inp = layers.Input(shape=(input_len,1), name='inp')
     x = layers.Conv1D(32, 11, activation='relu', padding='same')(inp)
     x = layers.MaxPooling1D(2)(x)
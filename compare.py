@@ -0,0 +1,128 @@
+# compare.py
+"""
+Baseline-vs-current FRA comparison with the standard numerical indices.
+
+Both traces of every pair are resampled onto one shared log grid (preprocessing.resample_batch),
+so the indices for N pairs and all frequency bands are computed as (N, n_bands) matrix operations:
+
+    cc          correlation coefficient
+    sd          standard deviation of the difference, sqrt(sum((C - B)^2) / (n - 1))
+    asle        absolute sum of logarithmic error, mean |C_dB - B_dB|
+    max_diff    largest C - B in dB
+    min_diff    smallest C - B in dB
+    res_shift   shift of the band's dominant resonance (deepest minimum), % of baseline frequency
+
+Magnitudes are in dB, so ASLE is taken directly on the dB values.
+"""
+import numpy as np
+from preprocessing import log_grid, resample_batch
+
+# CIGRE TB 342 style bands: core/magnetizing, winding interaction, winding structure, leads
+BANDS = {
+    'low': (20.0, 2e3),
+    'mid': (2e3, 20e3),
+    'high': (20e3, 1e6),
+    'very_high': (1e6, 2e6),
+}
+INDICES = ('cc', 'sd', 'asle', 'max_diff', 'min_diff', 'res_shift')
+LABELS = {
+    'cc': 'CC', 'sd': 'SD (dB)', 'asle': 'ASLE (dB)', 'max_diff': 'Max diff (dB)',
+    'min_diff': 'Min diff (dB)', 'res_shift': 'Res. shift (%)',
+}
+
+def band_slices(grid, bands=BANDS):
+    """(name, slice) of each band on an ascending grid; bands outside the grid get an empty slice."""
+    return [(name, slice(*np.searchsorted(grid, [lo, hi], side='left'))) for name, (lo, hi) in bands.items()]
+
+def indices(B, C, grid, bands=BANDS):
+    """
+    Indices for (N, L) baseline and current magnitude matrices on a shared ascending grid.
+    Returns {'bands': names, index: (N, n_bands) array}; bands with fewer than 3 samples are NaN.
+    """
+    B = np.atleast_2d(np.asarray(B, dtype=float))
+    C = np.atleast_2d(np.asarray(C, dtype=float))
+    slices = band_slices(grid, bands)
+    out = {k: np.full((B.shape[0], len(slices)), np.nan) for k in INDICES}
+    for j, (_, sl) in enumerate(slices):
+        b, c = B[:, sl], C[:, sl]
+        n = b.shape[1]
+        if n < 3:
+            continue
+        d = c - b
+        bc = b - b.mean(axis=1, keepdims=True)
+        cc = c - c.mean(axis=1, keepdims=True)
+        denom = np.sqrt((bc ** 2).sum(axis=1) * (cc ** 2).sum(axis=1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out['cc'][:, j] = (bc * cc).sum(axis=1) / denom
+        out['sd'][:, j] = np.sqrt((d ** 2).sum(axis=1) / (n - 1))
+        out['asle'][:, j] = np.abs(d).mean(axis=1)
+        out['max_diff'][:, j] = d.max(axis=1)
+        out['min_diff'][:, j] = d.min(axis=1)
+        f = grid[sl]
+        fb, fc = f[b.argmin(axis=1)], f[c.argmin(axis=1)]
+        out['res_shift'][:, j] = (fc - fb) / fb * 100
+    out['bands'] = [name for name, _ in slices]
+    out['band_ranges'] = list(bands.values())
+    return out
+
+def _span(traces):
+    lo = hi = None
+    for t in traces:
+        f = np.asarray(t['frequency'] if isinstance(t, dict) else t[0], dtype=float)
+        tlo, thi = max(f.min(), 1e-3), f.max()
+        lo = tlo if lo is None else max(lo, tlo)
+        hi = thi if hi is None else min(hi, thi)
+    return lo, hi
+
+def compare_batch(baseline, current, n_points=1024, fmin=None, fmax=None, bands=BANDS):
+    """
+    Indices for many (baseline, current) pairs in one call.
+    baseline/current: equal-length sequences of parser dicts or (frequency, magnitude_db) tuples.
+    Without fmin/fmax the grid spans the frequency range every trace covers, so nothing is
+    extrapolated. Adds 'frequency' (the grid) to the indices() result.
+    """
+    baseline, current = list(baseline), list(current)
+    if len(baseline) != len(current):
+        raise ValueError("compare_batch: baseline and current must have the same length")
+    if fmin is None or fmax is None:
+        lo, hi = _span(baseline + current)
+        fmin = lo if fmin is None else fmin
+        fmax = hi if fmax is None else fmax
+    if not fmin < fmax:
+        raise ValueError("compare_batch: traces share no frequency range")
+    res = resample_batch(baseline + current, n_points=n_points, fmin=fmin, fmax=fmax)
+    mag = res['magnitude_db']
+    out = indices(mag[:len(baseline)], mag[len(baseline):], res['frequency'], bands)
+    out['frequency'] = res['frequency']
+    return out
+
+def compare_archive(archive, baseline_rows, current_rows, n_points=1024, fmin=20.0, fmax=2e6, bands=BANDS,
+                    block=1024):
+    """
+    Fleet re-assessment: indices for archive row pairs, streamed `block` pairs at a time.
+    The grid is fixed (fmin, fmax) so all blocks are comparable.
+    """
+    baseline_rows = np.asarray(baseline_rows, dtype=np.int64)
+    current_rows = np.asarray(current_rows, dtype=np.int64)
+    parts = []
+    for s in range(0, baseline_rows.size, block):
+        b = list(archive.iter_rows(baseline_rows[s:s + block]))
+        c = list(archive.iter_rows(current_rows[s:s + block]))
+        parts.append(compare_batch(b, c, n_points, fmin, fmax, bands))
+    if not parts:
+        empty = np.empty((0, n_points))
+        return dict(indices(empty, empty, log_grid(float(fmin), float(fmax), n_points), bands),
+                    frequency=log_grid(float(fmin), float(fmax), n_points))
+    out = {k: np.concatenate([p[k] for p in parts]) for k in INDICES}
+    out['bands'] = parts[0]['bands']
+    out['band_ranges'] = parts[0]['band_ranges']
+    out['frequency'] = parts[0]['frequency']
+    return out
+
+def table(result, i=0, digits=3):
+    """Rows [['Band', <index labels>...], ...] for pair i, ready for HTML/ReportLab tables."""
+    rows = [['Band'] + [LABELS[k] for k in INDICES]]
+    for j, (band, (lo, hi)) in enumerate(zip(result['bands'], result['band_ranges'])):
+        values = [result[k][i, j] for k in INDICES]
+        rows.append([f"{band} ({lo:g}-{hi:g} Hz)"] + ['n/a' if np.isnan(v) else f"{v:.{digits}f}" for v in values])
+    return rows
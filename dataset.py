@@ -0,0 +1,260 @@
+# dataset.py
+"""
+Streaming training sources and the tf.data input pipeline.
+
+A source is either
+  * sharded arrays: a directory (or glob) of <name>.X.npy (N, L) files with optional <name>.y.npy
+    integer labels, read through np.load(mmap_mode='r'), or
+  * a FleetArchive (.h5) with stored features; labels come from an array or a metadata key, or
+  * a list of raw FRA files (any format ingest.parse_any reads), featurized through the shared
+    feature cache so repeated runs and epochs skip parsing and resampling.
+Rows are read in blocks, so none of them ever has to fit in RAM. Each source's `grid` is the
+(fmin, fmax) of the fixed log grid its rows live on, or None for per-trace ranges; train.py saves
+it next to the model so serving resamples uploads the same way.
+"""
+import glob
+import json
+import os
+import numpy as np
+from preprocessing import grid_span
+
+SHARD_X = '.X.npy'
+SHARD_Y = '.y.npy'
+BLOCK_ROWS = 4096
+
+class ShardSource:
+    preprocessed = False
+
+    def __init__(self, pattern, block_rows=BLOCK_ROWS):
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*' + SHARD_X)
+        self.x_paths = sorted(glob.glob(pattern))
+        if not self.x_paths:
+            raise FileNotFoundError(f"No '*{SHARD_X}' shards match '{pattern}'")
+        self.y_paths = [p[:-len(SHARD_X)] + SHARD_Y for p in self.x_paths]
+        self.has_labels = all(os.path.exists(p) for p in self.y_paths)
+        shapes = [np.load(p, mmap_mode='r').shape for p in self.x_paths]
+        self.input_len = shapes[0][1]
+        self.sizes = [s[0] for s in shapes]
+        self.length = sum(self.sizes)
+        self.block_rows = block_rows
+        # (fmin, fmax) of the shared grid when the shards come with one (synthetic_data.create_shards)
+        freq_path = os.path.join(os.path.dirname(self.x_paths[0]), 'frequency.npy')
+        freq = np.load(freq_path, mmap_mode='r') if os.path.exists(freq_path) else None
+        self.grid = grid_span(freq) if freq is not None and len(freq) == self.input_len else None
+
+    def n_classes(self):
+        return int(max(np.load(p, mmap_mode='r').max() for p in self.y_paths)) + 1
+
+    def blocks(self):
+        return [(i, s, min(s + self.block_rows, n)) for i, n in enumerate(self.sizes)
+                for s in range(0, n, self.block_rows)]
+
+    def read(self, block):
+        i, s, e = block
+        X = np.asarray(np.load(self.x_paths[i], mmap_mode='r')[s:e], dtype=np.float32)
+        y = np.asarray(np.load(self.y_paths[i], mmap_mode='r')[s:e], dtype=np.int32) if self.has_labels \
+            else np.full(e - s, -1, dtype=np.int32)
+        return X, y
+
+def class_index(value, class_labels):
+    """
+    Class index of a metadata label: an integer (or integer string), or a name from class_labels.
+    Other names, such as free-text diagnoses recorded for the similarity index, give -1 (unlabelled).
+    """
+    if isinstance(value, str):
+        if value in class_labels:
+            return class_labels.index(value)
+        try:
+            return int(value)
+        except ValueError:
+            return -1
+    return int(value)
+
+class ArchiveSource:
+    """
+    Feature rows of a FleetArchive (already resampled, denoised and normalized at ingest).
+    Labels come from the label_key metadata field, mapped through class_index with class_labels
+    (default inference.CLASS_LABELS); rows without a class are unlabelled.
+    """
+    preprocessed = True
+
+    def __init__(self, path, labels=None, label_key='label', channel='magnitude_db', block_rows=BLOCK_ROWS,
+                 class_labels=None):
+        from archive import FleetArchive
+        if class_labels is None:
+            from inference import CLASS_LABELS as class_labels
+        self.path = path
+        self.channel = channel
+        self.block_rows = block_rows
+        with FleetArchive(path, 'r') as ar:
+            self.length = len(ar)
+            self.input_len = ar.f[f'features/{channel}'].shape[1]
+            self.grid = grid_span(ar.feature_grid)
+            if labels is None and label_key:
+                labels = np.full(self.length, -1, dtype=np.int32)
+                meta = ar.f['rows/metadata'].asstr()
+                for s in range(0, self.length, 65536):
+                    for j, m in enumerate(meta[s:s + 65536]):
+                        v = json.loads(m).get(label_key)
+                        if v is not None:
+                            labels[s + j] = class_index(v, class_labels)
+        self.labels = None if labels is None else np.asarray(labels, dtype=np.int32)
+        self.has_labels = self.labels is not None and bool((self.labels >= 0).all())
+
+    def n_classes(self):
+        return int(self.labels.max()) + 1
+
+    def blocks(self):
+        return [(s, min(s + self.block_rows, self.length)) for s in range(0, self.length, self.block_rows)]
+
+    def read(self, block):
+        from archive import FleetArchive
+        s, e = block
+        with FleetArchive(self.path, 'r') as ar:
+            X = ar.features(self.channel, s, e).astype(np.float32)
+        y = self.labels[s:e] if self.labels is not None else np.full(e - s, -1, dtype=np.int32)
+        return X, y
+
+class FileSource:
+    """
+    Model-ready rows of raw FRA files, one per sweep, labelled per file. Features are taken from
+    feature_cache (computed and stored on first use), so they match what inference sees.
+    """
+    preprocessed = True
+
+    def __init__(self, paths, labels=None, n_points=1024, fmin=None, fmax=None, cache=None, block_rows=BLOCK_ROWS):
+        from feature_cache import default_cache, features_for_file
+        self.paths = list(paths)
+        if not self.paths:
+            raise FileNotFoundError("FileSource: no input files")
+        self.cache = cache if cache is not None else default_cache()
+        self._features = lambda p: features_for_file(p, n_points=n_points, fmin=fmin, fmax=fmax, cache=self.cache)
+        # one pass to learn the sweep count per file; it also warms the cache for every epoch
+        self.sizes = [len(self._features(p)) for p in self.paths]
+        self.length = sum(self.sizes)
+        self.input_len = n_points
+        self.grid = (fmin, fmax) if fmin is not None and fmax is not None else None
+        self.file_labels = None if labels is None else np.asarray(labels, dtype=np.int32)
+        self.has_labels = self.file_labels is not None
+        self.block_rows = block_rows
+
+    def n_classes(self):
+        return int(self.file_labels.max()) + 1
+
+    def blocks(self):
+        out, start, rows = [], 0, 0
+        for i, n in enumerate(self.sizes):
+            rows += n
+            if rows >= self.block_rows:
+                out.append((start, i + 1)); start, rows = i + 1, 0
+        if start < len(self.sizes):
+            out.append((start, len(self.sizes)))
+        return out
+
+    def read(self, block):
+        s, e = block
+        X = np.concatenate([self._features(p) for p in self.paths[s:e]]).astype(np.float32, copy=False)
+        if self.file_labels is None:
+            return X, np.full(len(X), -1, dtype=np.int32)
+        return X, np.repeat(self.file_labels[s:e], self.sizes[s:e])
+
+def open_source(source, **kwargs):
+    if isinstance(source, (ShardSource, ArchiveSource, FileSource)):
+        return source
+    if isinstance(source, (list, tuple)):
+        return FileSource(source, **kwargs)
+    if str(source).endswith(('.h5', '.hdf5')):
+        return ArchiveSource(source, **kwargs)
+    return ShardSource(source, **kwargs)
+
+def sample(source, n, only_label=None):
+    """Up to n model-ready rows (numpy preprocessing applied to raw shards) for calibration."""
+    from preprocessing import denoise_batch, normalize_batch
+    out = []
+    got = 0
+    for block in source.blocks():
+        X, y = source.read(block)
+        if only_label is not None:
+            X = X[y == only_label]
+        X = X[~np.isnan(X).any(axis=1)]
+        if not source.preprocessed:
+            X = normalize_batch(denoise_batch(X)).astype(np.float32)
+        out.append(X[:n - got]); got += len(out[-1])
+        if got >= n:
+            break
+    return np.concatenate(out) if out else np.empty((0, source.input_len), dtype=np.float32)
+
+# ---------- tf.data ----------
+
+def _median5(x):
+    """Per-row 5-tap median with zero padding (same as preprocessing.denoise)."""
+    import tensorflow as tf
+    frames = tf.signal.frame(tf.pad(x, [[2, 2]]), 5, 1)
+    return tf.sort(frames, axis=-1)[:, 2]
+
+def _zscore(x):
+    import tensorflow as tf
+    mean, var = tf.nn.moments(x, axes=[-1], keepdims=True)
+    return (x - mean) / (tf.sqrt(var) + 1e-12)
+
+def _augment(x, noise_std, max_shift):
+    """Batched: Gaussian noise plus a random shift of up to max_shift grid samples per row
+    (on a log grid a constant sample shift is a small multiplicative frequency shift)."""
+    import tensorflow as tf
+    length = tf.shape(x)[1]
+    lf = tf.cast(length, tf.float32)
+    shift = tf.random.uniform((tf.shape(x)[0], 1), -max_shift, max_shift)
+    pos = tf.clip_by_value(tf.range(lf)[None, :] - shift, 0.0, lf - 1.0)
+    i0 = tf.cast(tf.floor(pos), tf.int32)
+    i1 = tf.minimum(i0 + 1, length - 1)
+    w = pos - tf.floor(pos)
+    x = tf.gather(x, i0, batch_dims=1) * (1.0 - w) + tf.gather(x, i1, batch_dims=1) * w
+    return x + tf.random.normal(tf.shape(x), stddev=noise_std)
+
+def make_dataset(source, batch_size=32, n_classes=None, autoencoder=False, only_label=None,
+                 shuffle=True, shuffle_buffer=8192, augment=False, noise_std=0.05, max_shift=4.0,
+                 cache=None, preprocess=None, seed=42):
+    """
+    Batched, prefetched tf.data pipeline over a streaming source.
+    Blocks are read in parallel (interleave), raw shards are median-filtered and z-scored like
+    serving inputs (preprocess=None picks this automatically), then optionally cached (cache='' for
+    memory or a file path), shuffled, augmented with noise and small frequency shifts, and batched.
+    Yields (x, one-hot y) for classification or (x, x) with autoencoder=True.
+    """
+    import tensorflow as tf
+    src = open_source(source)
+    preprocess = not src.preprocessed if preprocess is None else preprocess
+    if not autoencoder and n_classes is None:
+        n_classes = src.n_classes()
+    blocks = src.blocks()
+    order = np.random.default_rng(seed).permutation(len(blocks)) if shuffle else np.arange(len(blocks))
+    signature = (tf.TensorSpec((src.input_len,), tf.float32), tf.TensorSpec((), tf.int32))
+
+    def rows(i):
+        X, y = src.read(blocks[int(i)])
+        for xi, yi in zip(X, y):
+            yield xi, yi
+
+    AUTOTUNE = tf.data.AUTOTUNE
+    ds = tf.data.Dataset.from_tensor_slices(order).interleave(
+        lambda i: tf.data.Dataset.from_generator(rows, output_signature=signature, args=(i,)),
+        cycle_length=max(1, min(len(blocks), os.cpu_count() or 1)),
+        num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+    ds = ds.filter(lambda x, y: tf.reduce_all(tf.math.is_finite(x)))
+    if only_label is not None:
+        ds = ds.filter(lambda x, y: tf.equal(y, only_label))
+    if preprocess:
+        ds = ds.map(lambda x, y: (_zscore(_median5(x)), y), num_parallel_calls=AUTOTUNE)
+    if cache is not None:
+        ds = ds.cache(cache)
+    if shuffle:
+        ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size, num_parallel_calls=AUTOTUNE)
+    if augment:
+        ds = ds.map(lambda x, y: (_augment(x, noise_std, max_shift), y), num_parallel_calls=AUTOTUNE)
+
+    def to_model(x, y):
+        x = x[..., None]
+        return (x, x) if autoencoder else (x, tf.one_hot(y, n_classes))
+    return ds.map(to_model, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
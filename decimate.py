@@ -0,0 +1,74 @@
+# decimate.py
+"""
+Shape-preserving decimation for plotting large FRA traces.
+
+Every plotting path calls decimate() so the number of rendered points stays bounded whatever the
+sweep resolution. 'minmax' keeps the lowest and highest sample of each log-frequency bucket, so
+resonance peaks and notches survive exactly; 'lttb' (largest-triangle-three-buckets) picks one
+visually representative point per bucket.
+"""
+import numpy as np
+
+MAX_PLOT_POINTS = 4000
+
+def _prepare(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    if x.size > 1 and np.any(x[1:] < x[:-1]):
+        order = np.argsort(x, kind='mergesort')
+        x, y = x[order], y[order]
+    return x, y
+
+def minmax_log(x, y, max_points=MAX_PLOT_POINTS):
+    """Min and max sample of each of max_points//2 log-spaced frequency buckets (linear if x <= 0)."""
+    x, y = _prepare(x, y)
+    n_buckets = max(1, max_points // 2 - 1)
+    if x.size <= max_points:
+        return x, y
+    if x[0] > 0:
+        edges = np.logspace(np.log10(x[0]), np.log10(x[-1]), n_buckets + 1)
+    else:
+        edges = np.linspace(x[0], x[-1], n_buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, n_buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], x.size]
+
+    def first_where(values):
+        # first index inside each bucket holding the bucket's extreme value
+        hits = np.flatnonzero(y == np.repeat(values, ends - starts))
+        return hits[np.searchsorted(hits, starts)]
+
+    lo = first_where(np.minimum.reduceat(y, starts))
+    hi = first_where(np.maximum.reduceat(y, starts))
+    idx = np.unique(np.concatenate(([0, x.size - 1], lo, hi)))
+    return x[idx], y[idx]
+
+def lttb(x, y, max_points=MAX_PLOT_POINTS):
+    """Largest-triangle-three-buckets downsampling to max_points samples."""
+    x, y = _prepare(x, y)
+    n = x.size
+    if n <= max_points or max_points < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    idx = np.empty(max_points, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        s, e = edges[i], edges[i + 1]
+        ns, ne = edges[i + 1], (edges[i + 2] if i + 2 < edges.size else n)
+        cx, cy = x[ns:ne].mean(), y[ns:ne].mean()
+        area = np.abs((x[a] - cx) * (y[s:e] - y[a]) - (x[a] - x[s:e]) * (cy - y[a]))
+        a = s + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+def decimate(x, y, max_points=MAX_PLOT_POINTS, method='minmax'):
+    """At most ~max_points (x, y) samples for plotting; short traces are returned unchanged."""
+    if method == 'minmax':
+        return minmax_log(x, y, max_points)
+    if method == 'lttb':
+        return lttb(x, y, max_points)
+    raise ValueError(f"Unknown decimation method '{method}'")
@@ -0,0 +1,171 @@
+# export.py
+"""
+Export trained Keras models (.h5) to TensorFlow Lite for CPU-only inference, optionally with int8
+post-training quantization, and compare accuracy/latency against the Keras original.
+
+    python export.py fra_classifier.h5                     # -> fra_classifier.tflite (float32)
+    python export.py fra_classifier.h5 --quantize --compare --archive fleet.h5
+    python export.py fra_classifier.h5 --quantize --out fra_classifier.tflite   # deploy int8
+
+load_runtime_model() prefers <model>.tflite next to the .h5 when it exists and is not older than the
+.h5; a model retrained after its export is served from the .h5 until it is exported again. With the
+tflite_runtime package installed this avoids importing TensorFlow at all.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+def tflite_path_for(model_path):
+    return os.path.splitext(model_path)[0] + '.tflite'
+
+def runtime_path(model_path):
+    """
+    File the model is served from: the exported .tflite unless the .h5 was saved after it
+    (retrained and not re-exported yet), in which case the stale export is ignored.
+    """
+    lite = tflite_path_for(model_path)
+    if not os.path.exists(lite):
+        return model_path
+    if os.path.exists(model_path) and os.stat(model_path).st_mtime_ns > os.stat(lite).st_mtime_ns:
+        return model_path
+    return lite
+
+def representative_traces(n=256, n_points=1024, archive=None, seed=0, start=0):
+    """Calibration inputs: feature rows from a FleetArchive, else preprocessed synthetic signatures."""
+    if archive is not None:
+        from archive import FleetArchive
+        with FleetArchive(archive, 'r') as ar:
+            X = ar.features('magnitude_db', start, start + n)
+        return X[~np.isnan(X).any(axis=1)].astype(np.float32)
+    from synthetic_data import generate_signature
+    from preprocessing import denoise, normalize
+    np.random.seed(seed)
+    faults = [None, 'axial', 'radial', 'core_ground']
+    return np.stack([normalize(denoise(generate_signature(n_points, fault=faults[i % 4])['mag']))
+                     for i in range(n)]).astype(np.float32)
+
+def export_tflite(model_path, out_path=None, quantize=False, calibration=None):
+    """Convert a Keras .h5 model; with quantize=True weights/activations are int8, I/O stays float32."""
+    import tensorflow as tf
+    model = tf.keras.models.load_model(model_path, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        if calibration is None:
+            calibration = representative_traces(n_points=model.input_shape[1])
+        calibration = np.asarray(calibration, dtype=np.float32)
+
+        def gen():
+            for x in calibration:
+                yield [x[None, :, None]]
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = gen
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    out_path = out_path or os.path.splitext(model_path)[0] + ('.int8.tflite' if quantize else '.tflite')
+    with open(out_path, 'wb') as f:
+        f.write(converter.convert())
+    print("Saved", out_path)
+    return out_path
+
+class TFLiteModel:
+    """TFLite interpreter with the small part of the Keras model API the pipeline uses."""
+
+    def __init__(self, path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.path = path
+        self.interp = Interpreter(model_path=path, num_threads=num_threads or os.cpu_count())
+        self.interp.allocate_tensors()
+        self._in = self.interp.get_input_details()[0]
+        self._out = self.interp.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(d) for d in self._in['shape'][1:])
+
+    def __call__(self, X, training=False):
+        X = np.asarray(X, dtype=np.float32)
+        if tuple(self._in['shape']) != X.shape:
+            self.interp.resize_tensor_input(self._in['index'], X.shape)
+            self.interp.allocate_tensors()
+            self._in = self.interp.get_input_details()[0]
+            self._out = self.interp.get_output_details()[0]
+        self.interp.set_tensor(self._in['index'], X)
+        self.interp.invoke()
+        return self.interp.get_tensor(self._out['index']).copy()
+
+def load_runtime_model(model_path):
+    """Exported TFLite model when present and current, else the Keras model; None if neither file exists."""
+    path = runtime_path(model_path)
+    if path != model_path:
+        return TFLiteModel(path)
+    if os.path.exists(model_path):
+        from tensorflow.keras.models import load_model
+        return load_model(model_path, compile=False)
+    return None
+
+def _latency(model, X, repeats):
+    single = []
+    for x in X[:repeats]:
+        t = time.perf_counter(); model(x[None, :, None]); single.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    for s in range(0, len(X), 64):
+        model(X[s:s + 64, :, None])
+    batch = (time.perf_counter() - t) / len(X)
+    return float(np.median(single) * 1e3), float(batch * 1e3)
+
+def compare(model_path, tflite_paths, X, y=None, repeats=100):
+    """
+    Accuracy (if labels y are given), agreement with the Keras model and latency for each variant.
+    Latency is the median single-sweep call and the amortized per-sweep cost in batches of 64.
+    """
+    from tensorflow.keras.models import load_model
+    X = np.asarray(X, dtype=np.float32)
+    variants = [('keras', load_model(model_path, compile=False))]
+    variants += [(os.path.basename(p), TFLiteModel(p)) for p in tflite_paths]
+    ref = None
+    rows = []
+    for name, model in variants:
+        model(X[:1, :, None])  # warm-up
+        out = np.concatenate([np.asarray(model(X[s:s + 64, :, None])) for s in range(0, len(X), 64)])
+        pred = out.argmax(axis=-1) if out.ndim == 2 else None
+        ref = out if ref is None else ref
+        single_ms, batch_ms = _latency(model, X, repeats)
+        row = {'model': name, 'single_ms': round(single_ms, 3), 'batched_ms_per_sweep': round(batch_ms, 4)}
+        if pred is not None:
+            row['agreement'] = float((pred == ref.argmax(axis=-1)).mean())
+            if y is not None:
+                row['accuracy'] = float((pred == np.asarray(y)).mean())
+        else:
+            row['max_abs_diff'] = float(np.abs(out - ref).max())
+        if name != 'keras':
+            row['size_kb'] = round(os.path.getsize(model.path) / 1024, 1)
+        rows.append(row)
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export a Keras FRA model to TensorFlow Lite.")
+    ap.add_argument('model', help="trained .h5 model")
+    ap.add_argument('--out', default=None)
+    ap.add_argument('--quantize', action='store_true', help="int8 post-training quantization")
+    ap.add_argument('--archive', default=None, help="FleetArchive to draw calibration/comparison traces from")
+    ap.add_argument('--n-calibration', type=int, default=256)
+    ap.add_argument('--compare', action='store_true', help="print accuracy vs latency against the Keras model")
+    args = ap.parse_args(argv)
+
+    import tensorflow as tf
+    n_points = tf.keras.models.load_model(args.model, compile=False).input_shape[1]
+    X = representative_traces(args.n_calibration, n_points, archive=args.archive)
+    out = export_tflite(args.model, args.out, quantize=args.quantize, calibration=X)
+    if args.compare:
+        # held-out traces: the next archive rows, or a different synthetic seed
+        X_eval = representative_traces(args.n_calibration, n_points, archive=args.archive, seed=1,
+                                       start=args.n_calibration)
+        # representative_traces cycles the synthetic classes in label order
+        y = np.arange(len(X_eval)) % 4 if args.archive is None else None
+        for row in compare(args.model, [out], X_eval, y):
+            print(json.dumps(row))
+
+if __name__ == "__main__":
+    main()
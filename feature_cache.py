@@ -0,0 +1,180 @@
+# feature_cache.py
+"""
+On-disk cache of preprocessed features shared by the app, the service, inference and training.
+
+Entries are keyed by the SHA-256 of the raw file bytes (or of the trace arrays when only a frame is
+at hand), how the file was split into sweeps, and the preprocessing parameters (n_points, fmin,
+fmax, denoise method). They hold the model-ready float32 magnitude features of every sweep as an
+(n_sweeps, n_points) .npy. The service and app read a file as one trace (parse_csv/parse_xml,
+split=False); training reads every sweep of it (ingest.parse_any, split=True).
+
+    cache = default_cache()
+    X = features_from_bytes(data, parse_csv, n_points=1024, cache=cache)
+
+Writes go to a temporary file and are published with os.replace, so concurrent readers in other
+processes never see partial entries. Reads refresh the entry's mtime; eviction removes the least
+recently used entries beyond max_bytes and runs under an exclusive flock so only one process
+scans at a time. The default cache lives in $XDG_CACHE_HOME/fra/features (~/.cache/fra/features);
+FRA_FEATURE_CACHE points it elsewhere or, set to 'off', disables it. Directories are only created
+on the first write, so importing a module that uses the cache leaves the filesystem alone.
+"""
+import hashlib
+import json
+import os
+import uuid
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is then unsynchronized, reads/writes stay atomic
+    fcntl = None
+
+FEATURE_CACHE_DIR = os.environ.get("FRA_FEATURE_CACHE") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "fra", "features")
+FEATURE_CACHE_MB = float(os.environ.get("FRA_FEATURE_CACHE_MB", "1024"))
+# bump when the preprocessing chain changes so stale features are never served
+FEATURE_VERSION = 1
+
+def bytes_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def file_digest(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def trace_digest(freq, mag_db):
+    """Digest of a trace's values, for callers that only have arrays (e.g. a DataFrame)."""
+    h = hashlib.sha256(b'trace')
+    for a in (freq, mag_db):
+        h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+    return h.hexdigest()
+
+def feature_key(digest, n_points=1024, fmin=None, fmax=None, denoise_method='median', split=False):
+    params = json.dumps([FEATURE_VERSION, digest, bool(split), int(n_points), fmin, fmax, denoise_method])
+    return hashlib.sha256(params.encode()).hexdigest()[:32]
+
+class FeatureCache:
+    """Float32 feature arrays on disk, <root>/<key[:2]>/<key>.npy, LRU-bounded to max_bytes."""
+
+    def __init__(self, root=None, max_bytes=FEATURE_CACHE_MB * 2**20):
+        self.root = root or FEATURE_CACHE_DIR
+        self.max_bytes = max_bytes
+        self._written = max_bytes  # scan once on the first write of this process
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + '.npy')
+
+    def get(self, key):
+        """Cached array or None; marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            arr = np.load(path)
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            # missing, evicted meanwhile, or unreadable
+            return None
+        return arr
+
+    def put(self, key, arr):
+        arr = np.ascontiguousarray(arr, dtype=np.float32)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp, path)
+        self._written += arr.nbytes
+        if self._written >= self.max_bytes / 16:
+            self.evict()
+        return arr
+
+    def get_or_compute(self, key, compute):
+        arr = self.get(key)
+        return arr if arr is not None else self.put(key, compute())
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache is under max_bytes."""
+        self._written = 0
+        if not os.path.isdir(self.root):
+            return
+        with open(os.path.join(self.root, '.lock'), 'a') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # another process is already evicting
+            entries = []
+            for sub in os.scandir(self.root):
+                if not sub.is_dir():
+                    continue
+                for e in os.scandir(sub.path):
+                    if e.name.endswith('.npy'):
+                        try:
+                            st = e.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((st.st_mtime, e.path, st.st_size))
+            total = sum(e[2] for e in entries)
+            for _, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+_default = {}
+
+def default_cache(root=None):
+    """Process-wide cache at root (default FEATURE_CACHE_DIR), or None when that is 'off'."""
+    root = root or FEATURE_CACHE_DIR
+    if root.lower() in ('0', 'off', 'none'):
+        return None
+    if root not in _default:
+        _default[root] = FeatureCache(root)
+    return _default[root]
+
+def _compute(sweeps, n_points, fmin, fmax, denoise_method):
+    from preprocessing import preprocess_batch
+    feats = preprocess_batch(sweeps, n_points=n_points, fmin=fmin, fmax=fmax, denoise_method=denoise_method)
+    return feats['magnitude_db'].astype(np.float32)
+
+def features_from_bytes(data, parse, n_points=1024, fmin=None, fmax=None, denoise_method='median', cache=None,
+                        digest=None, split=False):
+    """
+    (n_sweeps, n_points) model features of an uploaded file; parse(BytesIO) -> canonical dict or
+    list of them is only called on a cache miss. split must say whether parse returns every sweep
+    (True) or the whole file as one trace (False), since it is part of the key. Without fmin/fmax
+    each sweep keeps its own range, as in inference.prepare_features.
+    """
+    import io
+
+    def compute():
+        parsed = parse(io.BytesIO(data))
+        return _compute(parsed if isinstance(parsed, list) else [parsed], n_points, fmin, fmax, denoise_method)
+    if cache is None:
+        return compute()
+    key = feature_key(digest or bytes_digest(data), n_points, fmin, fmax, denoise_method, split)
+    return cache.get_or_compute(key, compute)
+
+def features_from_trace(freq, mag_db, n_points=1024, fmin=None, fmax=None, denoise_method='median', cache=None):
+    """(n_points,) features of one in-memory trace, cached by its values."""
+    compute = lambda: _compute([(freq, mag_db)], n_points, fmin, fmax, denoise_method)
+    if cache is None:
+        return compute()[0]
+    key = feature_key(trace_digest(freq, mag_db), n_points, fmin, fmax, denoise_method)
+    return cache.get_or_compute(key, compute)[0]
+
+def features_for_file(path, n_points=1024, fmin=None, fmax=None, denoise_method='median', cache=None,
+                      binary_schema='interleaved_f32'):
+    """(n_sweeps, n_points) features of every sweep in a file on disk (any format ingest.parse_any reads)."""
+    from ingest import parse_any
+    compute = lambda: _compute(parse_any(path, binary_schema=binary_schema), n_points, fmin, fmax, denoise_method)
+    if cache is None:
+        return compute()
+    key = feature_key(file_digest(path), n_points, fmin, fmax, denoise_method, split=True)
+    return cache.get_or_compute(key, compute)
@@ -1,16 +1,90 @@
-import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.units import inch
 from datetime import datetime
+import io
 import random
 import os
+import uuid
+from preprocessing import resample_to_log_grid, denoise, normalize, load_grid
+from decimate import decimate
+from export import load_runtime_model
+from metrics import span
+from compare import compare_batch, table
+from feature_cache import default_cache, features_from_trace
 
-# ---------- Dummy AI model (replace later with your TensorFlow model) ----------
+# Plotly, ReportLab, matplotlib (render.py) and TensorFlow are imported on first use, so parsing,
+# preprocessing and prediction from a TFLite model never load them.
+
+MODEL_PATH = os.environ.get("FRA_MODEL_PATH", "fra_classifier.h5")
+# output order of the classifier trained on synthetic_data labels: no_fault, axial, radial, core_ground
+CLASS_LABELS = ["Normal", "Axial Displacement", "Radial Deformation", "Core Grounding"]
+# maintenance recommendation per label, shared by the reports and the Streamlit app
+RECOMMENDATIONS = {
+    "Normal": "No fault detected. Continue routine FRA testing every 12 months.",
+    "Axial Displacement": "Inspect the clamping structure and axial end winding supports.",
+    "Radial Deformation": "Possible radial bulging of windings. Perform internal inspection.",
+    "Core Grounding": "Verify insulation between core laminations and ground path.",
+    "Turn-to-Turn Fault": "Severe issue. Immediate isolation and offline diagnostic recommended."
+}
+
+# ---------- Trained model ----------
+_models = {}
+
+def load_classifier(path=MODEL_PATH):
+    """
+    Load the classifier once per process; None if no model file exists.
+    An exported <model>.tflite next to the .h5 is preferred unless it predates it (see export.py).
+    """
+    if path not in _models:
+        model = load_runtime_model(path)
+        if model is None:
+            return None
+        if getattr(model, 'output_names', None) and len(model.output_names) > 1:
+            # multitask model: run only the classification head
+            from multitask import classification_model
+            model = classification_model(model)
+        _models[path] = model
+    return _models[path]
+
+def model_grid(path=MODEL_PATH):
+    """(fmin, fmax) of the grid the model was trained on (train.py saves it), else (None, None)."""
+    grid = load_grid(path)
+    return (grid['fmin'], grid['fmax']) if grid else (None, None)
+
+def prepare_features(freq, mag_db, n_points=1024, cache=None, fmin=None, fmax=None):
+    """
+    Model input for one trace: log-grid resample -> median denoise -> z-score, as float32.
+    The grid spans fmin..fmax (pass model_grid() for models trained on a fixed grid), else the
+    trace's own frequency range. With a feature_cache.FeatureCache the result is looked up by the
+    trace's content hash first.
+    """
+    with span('preprocess'):
+        if cache is not None:
+            return features_from_trace(freq, mag_db, n_points=n_points, fmin=fmin, fmax=fmax, cache=cache)
+        _, mag = resample_to_log_grid(freq, mag_db, n_points=n_points, fmin=fmin, fmax=fmax)
+        return normalize(denoise(mag)).astype(np.float32)
+
+def predict_proba(model, X):
+    """Class probabilities for an (N, L) feature batch in one forward pass."""
+    X = np.asarray(X, dtype=np.float32)[..., None]
+    with span('predict', items=len(X)):
+        return np.asarray(model(X, training=False))
+
+def label_for(index):
+    return CLASS_LABELS[index] if index < len(CLASS_LABELS) else f"Class {index}"
+
+def recommendation_for(fault_type):
+    return RECOMMENDATIONS.get(fault_type, "Compare this sweep against the unit's baseline before acting.")
+
+# ---------- Dummy AI model (used while no trained model file is present) ----------
 def predict_fault_type(df):
+    model = load_classifier()
+    if model is not None:
+        fmin, fmax = model_grid()
+        x = prepare_features(df["Frequency (Hz)"].to_numpy(dtype=float), df["Magnitude (dB)"].to_numpy(dtype=float),
+                             n_points=model.input_shape[1], cache=default_cache(), fmin=fmin, fmax=fmax)
+        probs = predict_proba(model, x[None])[0]
+        i = int(np.argmax(probs))
+        return label_for(i), round(float(probs[i]), 2)
     faults = [
         "Normal",
         "Axial Displacement",
@@ -24,95 +98,151 @@ def predict_fault_type(df):
 
 
 # ---------- Main analysis ----------
-def analyze_fra_file(df: pd.DataFrame):
+def analyze_fra_file(df, out_dir=".", baseline=None):
+    """
+    df: pandas DataFrame with Frequency (Hz), Magnitude (dB) and Phase (°) columns.
+    baseline: optional frame of the same unit's reference sweep; adds the comparison indices.
+    """
     if "Frequency (Hz)" not in df.columns or "Magnitude (dB)" not in df.columns:
         raise ValueError("Input CSV must have columns: Frequency (Hz), Magnitude (dB), Phase (°)")
 
-    fault_type, prob = predict_fault_type(df)
+    with span('analyze_fra_file'):
+        fault_type, prob = predict_fault_type(df)
+        comparison = compare_to_baseline(df, baseline) if baseline is not None else None
+        paths = render_report(df, fault_type, prob, out_dir=out_dir, comparison=comparison)
+
+    # ---------- Return summary ----------
+    return {
+        "fault_type": fault_type,
+        "probability": prob,
+        "html_report": paths["html_report"],
+        "pdf_report": paths["pdf_report"]
+    }
+
+
+def compare_to_baseline(df, baseline):
+    """Per-band comparison table rows (compare.table) for one sweep against its baseline frame."""
+    with span('compare'):
+        trace = lambda d: (d["Frequency (Hz)"].to_numpy(dtype=float), d["Magnitude (dB)"].to_numpy(dtype=float))
+        return table(compare_batch([trace(baseline)], [trace(df)]))
+
+def render_report(df, fault_type, prob, out_dir=".", stem=None, renderer=None, comparison=None):
+    """
+    Write the HTML and PDF reports for an already-predicted trace into out_dir.
+    File names carry a random suffix so concurrent calls never collide.
+    PDF figures are rasterized in-process by `renderer` (default: this thread's warm renderer).
+    comparison: optional baseline comparison table rows (see compare_to_baseline).
+    """
+    import plotly.graph_objects as go
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+    from render import get_renderer
+    renderer = renderer or get_renderer()
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    stem = stem or f"fra_report_{timestamp}_{uuid.uuid4().hex[:8]}"
+
+    # Plot at most MAX_PLOT_POINTS per curve; min/max per log-frequency bucket keeps resonances
+    mag_x, mag_y = decimate(df["Frequency (Hz)"], df["Magnitude (dB)"])
+    phase_x, phase_y = decimate(df["Frequency (Hz)"], df["Phase (°)"])
 
     # ---------- Plotly interactive graphs ----------
-    fig_mag = go.Figure()
-    fig_mag.add_trace(go.Scatter(
-        x=df["Frequency (Hz)"], y=df["Magnitude (dB)"],
-        mode='lines', name='Magnitude (dB)', line=dict(color='royalblue', width=2)
-    ))
-    fig_mag.update_layout(
-        title="Frequency Response (Magnitude)",
-        xaxis_title="Frequency (Hz)",
-        yaxis_title="Magnitude (dB)",
-        template="plotly_dark"
-    )
-
-    fig_phase = go.Figure()
-    fig_phase.add_trace(go.Scatter(
-        x=df["Frequency (Hz)"], y=df["Phase (°)"],
-        mode='lines', name='Phase (°)', line=dict(color='orange', width=2)
-    ))
-    fig_phase.update_layout(
-        title="Phase Response",
-        xaxis_title="Frequency (Hz)",
-        yaxis_title="Phase (°)",
-        template="plotly_dark"
-    )
-
-    # Save graph images (for PDF)
-    mag_path = f"magnitude_{timestamp}.png"
-    phase_path = f"phase_{timestamp}.png"
-    fig_mag.write_image(mag_path)
-    fig_phase.write_image(phase_path)
-
-    # ---------- Maintenance recommendations ----------
-    recommendations = {
-        "Normal": "No fault detected. Continue routine FRA testing every 12 months.",
-        "Axial Displacement": "Inspect the clamping structure and axial end winding supports.",
-        "Radial Deformation": "Possible radial bulging of windings. Perform internal inspection.",
-        "Core Grounding": "Verify insulation between core laminations and ground path.",
-        "Turn-to-Turn Fault": "Severe issue. Immediate isolation and offline diagnostic recommended."
-    }
+    with span('report_plotly'):
+        fig_mag = go.Figure()
+        fig_mag.add_trace(go.Scatter(
+            x=mag_x, y=mag_y,
+            mode='lines', name='Magnitude (dB)', line=dict(color='royalblue', width=2)
+        ))
+        fig_mag.update_layout(
+            title="Frequency Response (Magnitude)",
+            xaxis_title="Frequency (Hz)",
+            yaxis_title="Magnitude (dB)",
+            template="plotly_dark"
+        )
+
+        fig_phase = go.Figure()
+        fig_phase.add_trace(go.Scatter(
+            x=phase_x, y=phase_y,
+            mode='lines', name='Phase (°)', line=dict(color='orange', width=2)
+        ))
+        fig_phase.update_layout(
+            title="Phase Response",
+            xaxis_title="Frequency (Hz)",
+            yaxis_title="Phase (°)",
+            template="plotly_dark"
+        )
+
+    # Graph images for the PDF, kept in memory
+    with span('report_png'):
+        mag_png = renderer.render("magnitude", mag_x, mag_y)
+        phase_png = renderer.render("phase", phase_x, phase_y)
+
+    recommendation = recommendation_for(fault_type)
 
     # ---------- Generate HTML interactive report ----------
-    html_report = f"fra_report_{timestamp}.html"
-    with open(html_report, "w", encoding="utf-8") as f:
-        f.write(f"<h1>🧠 FRA Diagnostic Report</h1>")
-        f.write(f"<p><b>Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>")
-        f.write(f"<p><b>Predicted Fault:</b> {fault_type}</p>")
-        f.write(f"<p><b>Confidence:</b> {prob * 100}%</p>")
-        f.write(f"<p><b>Recommendation:</b> {recommendations[fault_type]}</p>")
-        f.write("<hr>")
-        f.write("<h3>Frequency Response (Magnitude)</h3>")
-        f.write(fig_mag.to_html(full_html=False, include_plotlyjs='cdn'))
-        f.write("<h3>Phase Response</h3>")
-        f.write(fig_phase.to_html(full_html=False, include_plotlyjs='cdn'))
+    with span('report_html'):
+        html_report = os.path.join(out_dir, f"{stem}.html")
+        with open(html_report, "w", encoding="utf-8") as f:
+            f.write(f"<h1>🧠 FRA Diagnostic Report</h1>")
+            f.write(f"<p><b>Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>")
+            f.write(f"<p><b>Predicted Fault:</b> {fault_type}</p>")
+            f.write(f"<p><b>Confidence:</b> {prob * 100}%</p>")
+            f.write(f"<p><b>Recommendation:</b> {recommendation}</p>")
+            f.write("<hr>")
+            f.write("<h3>Frequency Response (Magnitude)</h3>")
+            f.write(fig_mag.to_html(full_html=False, include_plotlyjs='cdn'))
+            f.write("<h3>Phase Response</h3>")
+            f.write(fig_phase.to_html(full_html=False, include_plotlyjs='cdn'))
+            if comparison:
+                f.write("<h3>Baseline Comparison</h3><table border='1' cellpadding='4'>")
+                f.write("<tr>" + "".join(f"<th>{c}</th>" for c in comparison[0]) + "</tr>")
+                for row in comparison[1:]:
+                    f.write("<tr>" + "".join(f"<td>{c}</td>" for c in row) + "</tr>")
+                f.write("</table>")
 
     # ---------- Generate PDF Report ----------
-    pdf_path = f"fra_report_{timestamp}.pdf"
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    elements.append(Paragraph("<b>AI-Driven FRA Diagnostic Report</b>", styles["Title"]))
-    elements.append(Spacer(1, 0.2 * inch))
-    elements.append(Paragraph(f"<b>Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles["Normal"]))
-    elements.append(Paragraph(f"<b>Predicted Fault:</b> {fault_type}", styles["Normal"]))
-    elements.append(Paragraph(f"<b>Confidence:</b> {prob * 100}%", styles["Normal"]))
-    elements.append(Paragraph(f"<b>Recommendation:</b> {recommendations[fault_type]}", styles["Normal"]))
-    elements.append(Spacer(1, 0.3 * inch))
-    elements.append(Paragraph("<b>Frequency Response (Magnitude)</b>", styles["Heading2"]))
-    elements.append(Image(mag_path, width=6.5 * inch, height=3.2 * inch))
-    elements.append(Spacer(1, 0.2 * inch))
-    elements.append(Paragraph("<b>Phase Response</b>", styles["Heading2"]))
-    elements.append(Image(phase_path, width=6.5 * inch, height=3.2 * inch))
-    doc.build(elements)
-
-    # Cleanup temp plots
-    os.remove(mag_path)
-    os.remove(phase_path)
+    with span('report_pdf'):
+        pdf_path = os.path.join(out_dir, f"{stem}.pdf")
+        doc = SimpleDocTemplate(pdf_path, pagesize=letter)
+        styles = getSampleStyleSheet()
+        elements = []
 
-    # ---------- Return summary ----------
-    return {
-        "fault_type": fault_type,
-        "probability": prob,
-        "html_report": html_report,
-        "pdf_report": pdf_path
-    }
+        elements.append(Paragraph("<b>AI-Driven FRA Diagnostic Report</b>", styles["Title"]))
+        elements.append(Spacer(1, 0.2 * inch))
+        elements.append(Paragraph(f"<b>Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles["Normal"]))
+        elements.append(Paragraph(f"<b>Predicted Fault:</b> {fault_type}", styles["Normal"]))
+        elements.append(Paragraph(f"<b>Confidence:</b> {prob * 100}%", styles["Normal"]))
+        elements.append(Paragraph(f"<b>Recommendation:</b> {recommendation}", styles["Normal"]))
+        elements.append(Spacer(1, 0.3 * inch))
+        elements.append(Paragraph("<b>Frequency Response (Magnitude)</b>", styles["Heading2"]))
+        elements.append(Image(io.BytesIO(mag_png), width=6.5 * inch, height=3.2 * inch))
+        elements.append(Spacer(1, 0.2 * inch))
+        elements.append(Paragraph("<b>Phase Response</b>", styles["Heading2"]))
+        elements.append(Image(io.BytesIO(phase_png), width=6.5 * inch, height=3.2 * inch))
+        if comparison:
+            elements.append(Spacer(1, 0.2 * inch))
+            elements.append(Paragraph("<b>Baseline Comparison</b>", styles["Heading2"]))
+            t = Table(comparison)
+            t.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('FONTSIZE', (0, 0), (-1, -1), 7),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ]))
+            elements.append(t)
+        doc.build(elements)
+
+    return {"html_report": html_report, "pdf_report": pdf_path}
+
+
+def render_reports_batch(items, out_dir="."):
+    """
+    Render many reports with one warm renderer.
+    items: iterable of (df, fault_type, prob); returns the path dicts in the same order.
+    """
+    from render import get_renderer
+    renderer = get_renderer()
+    return [render_report(df, fault_type, prob, out_dir=out_dir, renderer=renderer)
+            for df, fault_type, prob in items]
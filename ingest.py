@@ -0,0 +1,168 @@
+# ingest.py
+"""
+Bulk ingestion: walk a directory tree, sniff each file's format, parse across a process pool,
+resample every sweep onto a shared log grid and append everything to one FleetArchive.
+
+    python ingest.py /data/fra_tests --archive fleet.h5 --workers 8
+
+Per-file failures go to <archive>.errors.jsonl instead of aborting the run. Re-running the same
+command resumes: files already in the archive (or in the error log) are skipped.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from parse_csv import iter_csv_sweeps
+from parse_xml import parse_xml
+from parse_vendor_binary import iter_vendor_binary
+from preprocessing import preprocess_batch
+
+EXTENSIONS = {
+    '.csv': 'csv', '.txt': 'csv',
+    '.xml': 'xml',
+    '.bin': 'binary', '.dat': 'binary', '.raw': 'binary',
+}
+
+def sniff_format(path):
+    """'csv', 'xml' or 'binary', by extension first and then by the first bytes of the file."""
+    fmt = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt:
+        return fmt
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    if head.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<'):
+        return 'xml'
+    if b'\0' not in head:
+        try:
+            head.decode('utf-8')
+            if any(sep in head for sep in (b',', b';', b'\t')):
+                return 'csv'
+        except UnicodeDecodeError:
+            pass
+    return 'binary'
+
+def parse_any(path, fmt=None, binary_schema='interleaved_f32'):
+    """Every sweep in the file as a list of canonical dicts, whatever its format."""
+    fmt = fmt or sniff_format(path)
+    if fmt == 'csv':
+        return list(iter_csv_sweeps(path))
+    if fmt == 'xml':
+        return [parse_xml(path)]
+    # copy out of the memmap so results can be pickled back and the file closed
+    return [{k: (np.array(v) if isinstance(v, np.ndarray) else v) for k, v in d.items()}
+            for d in iter_vendor_binary(path, binary_schema)]
+
+def _ingest_file(path, n_points, fmin, fmax, binary_schema):
+    """Worker: parse + preprocess one file. Never raises; errors come back as strings."""
+    try:
+        sweeps = parse_any(path, binary_schema=binary_schema)
+        if not sweeps:
+            raise ValueError("no sweeps found")
+        short = [i for i, sw in enumerate(sweeps) if len(sw['frequency']) < 2 or not np.ptp(sw['frequency']) > 0]
+        if short:
+            raise ValueError(f"{len(short)} of {len(sweeps)} sweeps have fewer than 2 distinct frequencies "
+                             f"(first: sweep {short[0]})")
+        feats = preprocess_batch(sweeps, n_points=n_points, fmin=fmin, fmax=fmax)
+        # rows without phase are NaN by design; anything else non-finite would poison the archive
+        has_phase = np.array([sw.get('phase_deg') is not None for sw in sweeps])
+        bad = ~np.isfinite(feats['magnitude_db']).all(axis=1)
+        bad |= has_phase & ~np.isfinite(feats['phase_deg']).all(axis=1)
+        if bad.any():
+            raise ValueError(f"{int(bad.sum())} of {len(sweeps)} sweeps give non-finite features "
+                             f"(first: sweep {int(np.flatnonzero(bad)[0])})")
+        for ch in ('magnitude_db', 'phase_deg'):
+            feats[ch] = feats[ch].astype(np.float32)
+        return path, sweeps, feats, None
+    except Exception as e:
+        return path, None, None, f"{type(e).__name__}: {e}"
+
+def walk_files(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if not name.startswith('.'):
+                yield os.path.abspath(os.path.join(dirpath, name))
+
+def _done_sources(archive, error_log, retry_errors):
+    done = set(archive.index('source')) if len(archive) else set()
+    if not retry_errors and os.path.exists(error_log):
+        with open(error_log, encoding='utf-8') as f:
+            done.update(json.loads(line)['path'] for line in f if line.strip())
+    return done
+
+def ingest(root, archive_path, workers=None, n_points=1024, fmin=20.0, fmax=2e6,
+           binary_schema='interleaved_f32', retry_errors=False, progress_every=500):
+    """Ingest every file under `root` into `archive_path`; returns a summary dict."""
+    from archive import FleetArchive
+    error_log = archive_path + '.errors.jsonl'
+    workers = workers or os.cpu_count() or 1
+    stats = {'files': 0, 'sweeps': 0, 'errors': 0, 'skipped': 0}
+    t0 = time.time()
+
+    def report(final=False):
+        rate = stats['files'] / max(time.time() - t0, 1e-9)
+        print(f"\r{stats['files']} files, {stats['sweeps']} sweeps, {stats['errors']} errors, "
+              f"{stats['skipped']} skipped ({rate:.1f} files/s)", end='\n' if final else '', file=sys.stderr, flush=True)
+
+    with FleetArchive(archive_path) as ar, open(error_log, 'a', encoding='utf-8') as errors, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        done = _done_sources(ar, error_log, retry_errors)
+        pending = set()
+
+        def drain():
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                pending.discard(fut)
+                path, sweeps, feats, err = fut.result()
+                stats['files'] += 1
+                if err is None:
+                    try:
+                        ar.extend(sweeps, sources=[path] * len(sweeps), features=feats)
+                        stats['sweeps'] += len(sweeps)
+                    except Exception as e:
+                        err = f"{type(e).__name__}: {e}"
+                if err is not None:
+                    stats['errors'] += 1
+                    errors.write(json.dumps({'path': path, 'error': err}) + '\n'); errors.flush()
+                if progress_every and stats['files'] % progress_every == 0:
+                    report()
+
+        # keep a bounded number of files in flight so 400k paths never sit in the queue at once
+        for path in walk_files(root):
+            if path == os.path.abspath(archive_path) or path == os.path.abspath(error_log):
+                continue
+            if path in done:
+                stats['skipped'] += 1
+                continue
+            pending.add(pool.submit(_ingest_file, path, n_points, fmin, fmax, binary_schema))
+            if len(pending) >= 4 * workers:
+                drain()
+        while pending:
+            drain()
+    report(final=True)
+    stats['seconds'] = round(time.time() - t0, 2)
+    return stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk-ingest FRA test files into a fleet archive.")
+    ap.add_argument('root', help="directory tree to ingest")
+    ap.add_argument('--archive', default='fleet.h5')
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--n-points', type=int, default=1024)
+    ap.add_argument('--fmin', type=float, default=20.0)
+    ap.add_argument('--fmax', type=float, default=2e6)
+    ap.add_argument('--binary-schema', default='interleaved_f32', help="parse_vendor_binary schema name")
+    ap.add_argument('--retry-errors', action='store_true', help="re-try files listed in the error log")
+    args = ap.parse_args(argv)
+    stats = ingest(args.root, args.archive, workers=args.workers, n_points=args.n_points,
+                   fmin=args.fmin, fmax=args.fmax, binary_schema=args.binary_schema,
+                   retry_errors=args.retry_errors)
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# metrics.py
+"""
+Lightweight per-stage instrumentation.
+
+    with span('parse_csv'):             # or  @timed('parse_csv')
+        ...
+    with span('predict', items=len(X)):
+        ...
+
+Each span records a latency histogram (fra_stage_seconds), throughput counters
+(fra_stage_calls_total, fra_stage_items_total), failures (fra_stage_errors_total) and the process
+peak RSS seen when the stage ends (fra_stage_max_rss_bytes). render_prometheus() returns the
+Prometheus text format served by server.py at /metrics.
+
+FRA_METRICS=0 disables everything: span() then returns one shared no-op context manager and
+timed() functions cost a single flag check. FRA_METRICS_LOG=<path> (or '-' for stderr) also writes
+one JSON line per span.
+"""
+import bisect
+import contextlib
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# ru_maxrss is kilobytes on Linux, bytes on macOS
+_RSS_SCALE = 1 if sys.platform == 'darwin' else 1024
+
+class _State:
+    enabled = os.environ.get('FRA_METRICS', '1').lower() not in ('0', 'false', 'no', 'off')
+    log = None
+
+_state = _State()
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_counters = {}
+_gauges = {}
+_NULL = contextlib.nullcontext()
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def _max_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_SCALE
+
+def observe(name, value, **labels):
+    """Add one observation to a histogram."""
+    if not _state.enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        h[bisect.bisect_left(BUCKETS, value)] += 1
+        h[-1] += value
+
+def count(name, n=1, **labels):
+    if not _state.enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+def gauge(name, value, **labels):
+    if not _state.enabled:
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def _log(record):
+    line = json.dumps(record, default=str) + '\n'
+    with _lock:
+        _state.log.write(line)
+        _state.log.flush()
+
+class _Span:
+    __slots__ = ('stage', 'items', 'labels', 't0')
+
+    def __init__(self, stage, items, labels):
+        self.stage, self.items, self.labels = stage, items, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.t0
+        labels = dict(self.labels, stage=self.stage)
+        observe('fra_stage_seconds', seconds, **labels)
+        count('fra_stage_calls_total', **labels)
+        count('fra_stage_items_total', self.items, **labels)
+        if exc_type is not None:
+            count('fra_stage_errors_total', **labels)
+        rss = _max_rss()
+        gauge('fra_stage_max_rss_bytes', rss, **labels)
+        if _state.log is not None:
+            _log(dict(labels, ts=time.time(), seconds=round(seconds, 6), items=self.items, max_rss_bytes=rss,
+                      error=None if exc_type is None else exc_type.__name__))
+        return False
+
+def span(stage, items=1, **labels):
+    """Context manager timing one stage; a shared no-op when metrics are disabled."""
+    if not _state.enabled:
+        return _NULL
+    return _Span(stage, items, labels)
+
+def timed(stage):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _state.enabled:
+                return fn(*args, **kwargs)
+            with _Span(stage, 1, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+def enable(flag=True, log_path=None):
+    """Switch instrumentation at runtime; log_path starts (or '-' for stderr) the JSON-lines log."""
+    _state.enabled = flag
+    if log_path is not None:
+        _state.log = sys.stderr if log_path == '-' else open(log_path, 'a', encoding='utf-8')
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    esc = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in items) + '}'
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        hists = {k: list(v) for k, v in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    gauges[('fra_process_max_rss_bytes', ())] = _max_rss()
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f'# TYPE {name} {kind}')
+    for (name, labels), h in sorted(hists.items()):
+        header(name, 'histogram')
+        cum = 0
+        for le, n in zip(BUCKETS + ('+Inf',), h[:-1]):
+            cum += n
+            lines.append(f'{name}_bucket{_fmt_labels(labels, [("le", le)])} {cum}')
+        lines.append(f'{name}_sum{_fmt_labels(labels)} {h[-1]:.6f}')
+        lines.append(f'{name}_count{_fmt_labels(labels)} {cum}')
+    for kind, table in (('counter', counters), ('gauge', gauges)):
+        for (name, labels), v in sorted(table.items()):
+            header(name, kind)
+            lines.append(f'{name}{_fmt_labels(labels)} {v}')
+    return '\n'.join(lines) + '\n'
+
+if os.environ.get('FRA_METRICS_LOG'):
+    enable(_state.enabled, os.environ['FRA_METRICS_LOG'])
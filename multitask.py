@@ -0,0 +1,78 @@
+# multitask.py
+"""
+One network for fault classification and anomaly scoring.
+
+A shared Conv1D encoder feeds a classification head ('class_out', softmax) and a reconstruction
+head ('recon_out', same shape as the input), so one forward pass yields both the fault class and
+the reconstruction error used by anomaly.py. classification_model() returns the sub-graph that
+stops at the class head for callers that only need the label.
+"""
+import numpy as np
+
+CLASS_OUT = 'class_out'
+RECON_OUT = 'recon_out'
+
+def build_multitask(input_len=1024, n_classes=4, latent_dim=64, recon_weight=1.0):
+    from tensorflow.keras import layers, models
+    inp = layers.Input(shape=(input_len, 1), name='inp')
+    # shared encoder
+    x = layers.Conv1D(32, 7, activation='relu', padding='same')(inp)
+    x = layers.MaxPooling1D(2, padding='same')(x)
+    x = layers.Conv1D(64, 5, activation='relu', padding='same')(x)
+    enc = layers.MaxPooling1D(2, padding='same', name='encoder')(x)
+
+    # classification head
+    c = layers.Conv1D(128, 7, activation='relu', padding='same')(enc)
+    c = layers.GlobalAveragePooling1D()(c)
+    c = layers.Dense(128, activation='relu')(c)
+    out_class = layers.Dense(n_classes, activation='softmax', name=CLASS_OUT)(c)
+
+    # reconstruction head
+    r = layers.Flatten()(enc)
+    z = layers.Dense(latent_dim, activation='relu', name='latent')(r)
+    r = layers.Dense((input_len//4)*64, activation='relu')(z)
+    r = layers.Reshape((input_len//4, 64))(r)
+    r = layers.UpSampling1D(2)(r)
+    r = layers.Conv1D(32, 5, activation='relu', padding='same')(r)
+    r = layers.UpSampling1D(2)(r)
+    out_recon = layers.Conv1D(1, 7, activation='linear', padding='same', name=RECON_OUT)(r)
+
+    model = models.Model(inputs=inp, outputs={CLASS_OUT: out_class, RECON_OUT: out_recon})
+    model.compile(optimizer='adam',
+                  loss={CLASS_OUT: 'categorical_crossentropy', RECON_OUT: 'mse'},
+                  loss_weights={CLASS_OUT: 1.0, RECON_OUT: recon_weight},
+                  metrics={CLASS_OUT: ['accuracy']})
+    return model
+
+def _head(model, name):
+    from tensorflow.keras import models
+    return models.Model(inputs=model.inputs, outputs=model.get_layer(name).output)
+
+def classification_model(model):
+    """Class-probability sub-model sharing the encoder weights; skips the reconstruction head."""
+    return _head(model, CLASS_OUT)
+
+def reconstruction_model(model):
+    """Reconstruction-only sub-model (what anomaly.calibrate and AnomalyScorer expect)."""
+    return _head(model, RECON_OUT)
+
+def latent_model(model):
+    """Encoder latent vectors, e.g. as similarity.py signatures."""
+    return _head(model, 'latent')
+
+def split_outputs(out):
+    """(class probabilities, reconstruction) from a multitask model call, as numpy arrays."""
+    if isinstance(out, dict):
+        return np.asarray(out[CLASS_OUT]), np.asarray(out[RECON_OUT])
+    probs, recon = out
+    return np.asarray(probs), np.asarray(recon)
+
+def predict_both(model, X, batch_size=1024):
+    """Class probabilities (N, n_classes) and reconstructions (N, L) of an (N, L) batch in one pass."""
+    X = np.asarray(X, dtype=np.float32)
+    probs, recons = [], []
+    for s in range(0, len(X), batch_size):
+        p, r = split_outputs(model(X[s:s + batch_size, :, None], training=False))
+        probs.append(p)
+        recons.append(r[..., 0])
+    return np.concatenate(probs), np.concatenate(recons)
@@ -1,47 +1,121 @@
 # parse_csv.py
-import pandas as pd
+import re
 import numpy as np
+from metrics import timed
 
+META_KEYS = ['transformer','id','tap','operator','date']
+SWEEP_COLUMNS = ['sweep','sweep_id','sweep_no']
+
+def _detect_layout(columns):
+    """
+    Map header names to roles once: frequency, magnitude or real/imag, phase and metadata columns.
+    """
+    # unit suffixes are ignored: 'Frequency (Hz)' -> 'frequency', 'Magnitude (dB)' -> 'magnitude'
+    cols = [re.sub(r'\s*[\(\[][^\)\]]*[\)\]]$', '', c.strip().lower()) for c in columns]
+    layout = {'meta': {}, 'mag': None, 'real': None, 'imag': None, 'phase': None}
+    for k in META_KEYS:
+        for c in columns:
+            if k in c.lower():
+                layout['meta'][k] = c
+                break
+    # assume first column is frequency when not named
+    layout['freq'] = columns[cols.index('frequency')] if 'frequency' in cols else columns[0]
+    for name in ['magnitude','magnitude_db','mag_db','mag']:
+        if name in cols:
+            layout['mag'] = columns[cols.index(name)]; break
+    if layout['mag'] is None and ('real' in cols and 'imag' in cols):
+        layout['real'] = columns[cols.index('real')]
+        layout['imag'] = columns[cols.index('imag')]
+    elif 'phase' in cols:
+        layout['phase'] = columns[cols.index('phase')]
+    if layout['mag'] is None and layout['real'] is None:
+        raise ValueError("CSV: could not find magnitude or real/imag columns. Inspect file.")
+    layout['numeric'] = [c for c in (layout['freq'], layout['mag'], layout['real'], layout['imag'], layout['phase']) if c is not None]
+    return layout
+
+def _canonical(layout, meta, get):
+    """Build the canonical dict; get(column) returns that column as a float array."""
+    freq = get(layout['freq'])
+    phase = None
+    if layout['mag'] is not None:
+        mag = get(layout['mag'])
+        if layout['phase'] is not None:
+            phase = get(layout['phase'])
+    else:
+        complex_ = get(layout['real']) + 1j*get(layout['imag'])
+        mag = 20 * np.log10(np.abs(complex_) + 1e-12)
+        phase = np.angle(complex_, deg=True)
+    return {'metadata': meta, 'frequency': freq, 'magnitude_db': mag, 'phase_deg': phase}
+
+@timed('parse_csv')
 def parse_csv(path):
     """
     Generic CSV FRA parser.
     Tries to detect columns: frequency, magnitude (dB), phase (deg), real, imag.
     Returns canonical dict.
     """
+    import pandas as pd
     df = pd.read_csv(path)
-    cols = [c.strip().lower() for c in df.columns]
+    layout = _detect_layout(list(df.columns))
 
     # metadata hint extraction (if present)
-    meta = {}
-    for k in ['transformer','id','tap','operator','date']:
-        for c in df.columns:
-            if k in c.lower():
-                meta[k] = str(df[c].iloc[0])
-                break
-
-    if 'frequency' not in cols:
-        # assume first column is frequency
-        freq = df.iloc[:, 0].to_numpy(dtype=float)
-    else:
-        freq = df.iloc[:, cols.index('frequency')].to_numpy(dtype=float)
-
-    mag = None; phase = None
-    if 'magnitude' in cols or 'magnitude_db' in cols or 'mag_db' in cols or 'mag' in cols:
-        for name in ['magnitude','magnitude_db','mag_db','mag']:
-            if name in cols:
-                mag = df.iloc[:, cols.index(name)].to_numpy(dtype=float); break
-
-    if mag is None and ('real' in cols and 'imag' in cols):
-        real = df.iloc[:, cols.index('real')].to_numpy(dtype=float)
-        imag = df.iloc[:, cols.index('imag')].to_numpy(dtype=float)
-        complex_ = real + 1j*imag
-        mag = 20 * np.log10(np.abs(complex_) + 1e-12)
-        phase = np.angle(complex_, deg=True)
-    else:
-        if 'phase' in cols:
-            phase = df.iloc[:, cols.index('phase')].to_numpy(dtype=float)
+    meta = {k: str(df[c].iloc[0]) for k, c in layout['meta'].items()}
+    return _canonical(layout, meta, lambda c: df[c].to_numpy(dtype=float))
 
-    if mag is None:
-        raise ValueError("CSV: could not find magnitude or real/imag columns. Inspect file.")
+def iter_csv_sweeps(path, chunksize=200_000, sweep_column=None):
+    """
+    Streaming parser for large and multi-sweep CSV exports; yields one canonical dict per sweep.
+    The header is inspected once, then only the needed columns are read with explicit dtypes in
+    chunks of `chunksize` rows, so memory is bounded by one chunk plus the sweep being assembled.
+    A new sweep starts where `sweep_column` changes value (auto-detected from SWEEP_COLUMNS) or,
+    without such a column, where the frequency resets against the sweep direction, which is taken
+    from the first rows that differ (low -> high or high -> low).
+    """
+    import pandas as pd
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    layout = _detect_layout(columns)
+    if sweep_column is None:
+        sweep_column = next((c for c in columns if c.strip().lower() in SWEEP_COLUMNS), None)
+    dtypes = {c: np.float64 for c in layout['numeric']}
+    for c in list(layout['meta'].values()) + ([sweep_column] if sweep_column else []):
+        dtypes.setdefault(c, str)
+    freq_col = layout['freq']
 
-    return {'metadata': meta, 'frequency': freq, 'magnitude_db': mag, 'phase_deg': phase}
+    pieces = {c: [] for c in layout['numeric']}
+    meta = None
+    last = None
+    direction = None
+    for chunk in pd.read_csv(path, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize):
+        n = len(chunk)
+        if n == 0:
+            continue
+        arrays = {c: chunk[c].to_numpy() for c in layout['numeric']}
+        keys = chunk[sweep_column].to_numpy() if sweep_column else arrays[freq_col]
+        if sweep_column:
+            cuts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            new_at_start = last is not None and keys[0] != last
+        else:
+            if direction is None:
+                steps = np.diff(keys if last is None else np.r_[last, keys])
+                steps = steps[steps != 0]
+                direction = np.sign(steps[0]) if steps.size else None
+            if direction is None:
+                cuts = np.empty(0, dtype=np.int64)
+                new_at_start = False
+            else:
+                cuts = np.flatnonzero(direction * (keys[1:] - keys[:-1]) < 0) + 1
+                new_at_start = last is not None and direction * (keys[0] - last) < 0
+        starts = ([0] if new_at_start else []) + cuts.tolist()
+        bounds = [0] + cuts.tolist() + [n]
+        for s, e in zip(bounds[:-1], bounds[1:]):
+            if s in starts and pieces[freq_col]:
+                yield _canonical(layout, meta, lambda c: np.concatenate(pieces[c]))
+                pieces = {c: [] for c in layout['numeric']}
+                meta = None
+            if meta is None:
+                meta = {k: str(chunk[c].iloc[s]) for k, c in layout['meta'].items()}
+            for c in layout['numeric']:
+                pieces[c].append(arrays[c][s:e])
+        last = keys[-1]
+    if pieces[freq_col]:
+        yield _canonical(layout, meta, lambda c: np.concatenate(pieces[c]))
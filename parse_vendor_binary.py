@@ -1,25 +1,100 @@
 # parse_vendor_binary.py
 import numpy as np
-import struct
 import os
+from metrics import timed
 
-def parse_vendor_binary(path):
+SCHEMAS = {}
+
+def register_schema(name, fields, header_size=0, endian='<', record_header=0, header_fields=(),
+                    points=None, record_stride=None):
+    """
+    Register a binary record layout.
+    fields: per-sample (name, dtype) pairs. Names are canonical keys ('frequency', 'magnitude_db',
+            'phase_deg'); a complex 'response' field or 'real'/'imag' pair is converted to dB/phase.
+    header_size: bytes of file header skipped before the first record.
+    record_header / header_fields: bytes at the start of every record, and (name, dtype) pairs decoded
+            from them into the sweep metadata.
+    points: samples per record; None means the whole payload is a single record.
+    record_stride: bytes from one record to the next (default: header + samples, packed).
+    """
+    point = np.dtype([(n, np.dtype(dt).newbyteorder(endian)) for n, dt in fields])
+    SCHEMAS[name] = {
+        'point': point, 'header_size': header_size, 'record_header': record_header,
+        'header': np.dtype([(n, np.dtype(dt).newbyteorder(endian)) for n, dt in header_fields]),
+        'points': points, 'record_stride': record_stride,
+    }
+    return SCHEMAS[name]
+
+# fallback layout: float32 sequence freq, mag, freq, mag...
+register_schema('interleaved_f32', [('frequency', 'f4'), ('magnitude_db', 'f4')])
+register_schema('interleaved_f64', [('frequency', 'f8'), ('magnitude_db', 'f8')])
+register_schema('f64_mag_phase', [('frequency', 'f8'), ('magnitude_db', 'f8'), ('phase_deg', 'f8')])
+register_schema('f64_complex', [('frequency', 'f8'), ('response', 'c16')])
+
+def _record_dtype(schema, points):
+    rh = schema['record_header']
+    names, formats, offsets = ['points'], [(schema['point'], (points,))], [rh]
+    if schema['header'].names:
+        names.append('header'); formats.append(schema['header']); offsets.append(0)
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                     'itemsize': rh + schema['point'].itemsize * points})
+
+def open_vendor_binary(path, schema='interleaved_f32'):
+    """
+    Memory-map a binary file as an array of records (nothing is read until sliced).
+    rec['points'][field] on any record is a zero-copy view into the file.
+    """
+    sc = SCHEMAS[schema] if isinstance(schema, str) else schema
+    payload = os.path.getsize(path) - sc['header_size']
+    points = sc['points']
+    if points is None:
+        points = (payload - sc['record_header']) // sc['point'].itemsize
+        if points < 2 or sc['record_header'] + points * sc['point'].itemsize != payload:
+            raise ValueError("Vendor binary: payload size does not fit the schema.")
+    dtype = _record_dtype(sc, points)
+    stride = sc['record_stride'] or dtype.itemsize
+    if payload < dtype.itemsize:
+        raise ValueError("Vendor binary: file holds no complete record for the schema.")
+    # the last record may omit trailing padding, so step by stride over packed records
+    n_records = (payload - dtype.itemsize) // stride + 1
+    raw = np.memmap(path, dtype=np.uint8, mode='r', offset=sc['header_size'], shape=(payload,))
+    first = raw[:dtype.itemsize].view(dtype)
+    return np.lib.stride_tricks.as_strided(first, shape=(n_records,), strides=(stride,), writeable=False)
+
+def _canonical(rec):
+    pts = rec['points']
+    names = pts.dtype.names
+    meta = {}
+    if 'header' in rec.dtype.names:
+        meta = {n: rec['header'][n].item() for n in rec['header'].dtype.names}
+    if 'response' in names or ('real' in names and 'imag' in names):
+        z = pts['response'] if 'response' in names else pts['real'] + 1j*pts['imag']
+        mag = 20 * np.log10(np.abs(z) + 1e-12)
+        phase = np.angle(z, deg=True)
+    else:
+        mag = pts['magnitude_db']
+        phase = pts['phase_deg'] if 'phase_deg' in names else None
+    return {'metadata': meta, 'frequency': pts['frequency'], 'magnitude_db': mag, 'phase_deg': phase}
+
+def iter_vendor_binary(path, schema='interleaved_f32'):
+    """Yield one canonical dict per record; real-valued channels are views into the memmap."""
+    records = open_vendor_binary(path, schema)
+    for i in range(records.shape[0]):
+        yield _canonical(records[i])
+
+@timed('parse_vendor_binary')
+def parse_vendor_binary(path, schema=None, record=0):
     """
     Vendor binary parsing is vendor-specific. This is a safe fallback that tries common float patterns.
-    Prefer implementing vendor SDK parser when available.
+    Prefer implementing vendor SDK parser when available, or register its layout with register_schema().
     """
-    size = os.path.getsize(path)
-    with open(path, 'rb') as f:
-        raw = f.read()
+    if schema is not None:
+        return _canonical(open_vendor_binary(path, schema)[record])
 
     # try interpreting as float32 sequence: freq, mag, freq, mag...
     try:
-        arr = np.frombuffer(raw, dtype=np.float32)
-        if arr.size % 2 == 0 and arr.size >= 4:
-            freq = arr[::2]
-            mag = arr[1::2]
-            return {'metadata': {}, 'frequency': freq, 'magnitude_db': mag, 'phase_deg': None}
-    except Exception:
+        return _canonical(open_vendor_binary(path, 'interleaved_f32')[record])
+    except ValueError:
         pass
 
     raise NotImplementedError("Vendor binary parser: schema unknown. Use vendor SDK or reverse-engineer format.")
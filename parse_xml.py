@@ -1,6 +1,26 @@
 # parse_xml.py
-import xmltodict
+import warnings
+import xml.etree.ElementTree as ET
 import numpy as np
+from metrics import timed
+
+FREQ_KEYS = ['frequency','frequencies']
+MAG_KEYS = ['magnitude','magnitudelist','mag']
+PHASE_KEYS = ['phase','phaselist']
+META_KEYS = ['instrument','operator','date','tap','transformer']
+_SEARCHES = [FREQ_KEYS, MAG_KEYS, PHASE_KEYS] + [[k] for k in META_KEYS]
+
+def _decode(text):
+    """Whitespace-separated numbers -> float array, decoded in C; falls back to float() for odd input."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        try:
+            arr = np.fromstring(text, dtype=float, sep=' ')
+        except (DeprecationWarning, ValueError):
+            arr = None
+    if arr is None or (arr.size == 0 and text.strip()):
+        return np.array([float(i) for i in text.split()], dtype=float)
+    return arr
 
 def _to_array(x):
     if x is None:
@@ -8,39 +28,98 @@ def _to_array(x):
     if isinstance(x, list):
         return np.array([float(i) for i in x], dtype=float)
     if isinstance(x, str):
-        return np.array([float(i) for i in x.strip().split()], dtype=float)
+        return _decode(x)
     if isinstance(x, dict) and '#text' in x:
-        return np.array([float(i) for i in x['#text'].split()], dtype=float)
+        return _decode(x['#text'])
     # try numeric children
     try:
         return np.array([float(v) for v in x.values()], dtype=float)
     except Exception:
         raise ValueError("Unsupported XML numeric format")
 
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _matches(name, candidates):
+    return any(c.lower() in name.lower() for c in candidates)
+
+def _text(elem):
+    text = ''.join([elem.text or ''] + [c.tail or '' for c in elem]).strip()
+    return text or None
+
+def _to_obj(elem):
+    """Same value xmltodict would produce for this element (text, None or dict)."""
+    if not elem.attrib and len(elem) == 0:
+        return _text(elem)
+    obj = {'@' + _local(k): v for k, v in elem.attrib.items()}
+    for child in elem:
+        key, val = _local(child.tag), _to_obj(child)
+        if key not in obj:
+            obj[key] = val
+        elif isinstance(obj[key], list):
+            obj[key].append(val)
+        else:
+            obj[key] = [obj[key], val]
+    text = _text(elem)
+    if text:
+        obj['#text'] = text
+    return obj
+
+def _find(frame, candidates, i):
+    """
+    What the old recursive find_key returned for this element's dict: the first matching attribute
+    or child key, else the first hit inside a (non-repeated, dict-valued) child, in document order.
+    """
+    for k, v in frame['attrs']:
+        if _matches(k, candidates):
+            return v
+    children = frame['children']
+    for tag, items in children.items():
+        if _matches(tag, candidates):
+            return items[0]['value'] if len(items) == 1 else [c['value'] for c in items]
+    for items in children.values():
+        if len(items) == 1 and items[0]['is_dict'] and items[0]['found'][i] is not None:
+            return items[0]['found'][i]
+    return None
+
+@timed('parse_xml')
 def parse_xml(path):
     """
     Generic XML FRA parser. Vendor schemas vary — adapt as needed.
+    Streams the document with iterparse: frequency/magnitude/phase and metadata nodes are located in
+    a single pass using the same key heuristics as before, and elements are freed as soon as they end.
     """
-    with open(path, 'r') as f:
-        doc = xmltodict.parse(f.read())
-
-    # search heuristics
-    def find_key(d, candidates):
-        if not isinstance(d, dict):
-            return None
-        for k in d.keys():
-            if any(c.lower() in k.lower() for c in candidates):
-                return d[k]
-        for v in d.values():
-            if isinstance(v, dict):
-                res = find_key(v, candidates)
-                if res is not None:
-                    return res
-        return None
+    stack = []
+    doc = None
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            tag = _local(elem.tag)
+            keep = (stack and stack[-1]['keep']) or any(_matches(tag, c) for c in _SEARCHES)
+            stack.append({'tag': tag, 'keep': keep, 'children': {},
+                          'attrs': [('@' + _local(k), v) for k, v in elem.attrib.items()]})
+            continue
+        frame = stack.pop()
+        tag = frame['tag']
+        summary = {
+            'is_dict': bool(frame['attrs'] or frame['children']),
+            'found': [_find(frame, c, i) for i, c in enumerate(_SEARCHES)],
+            # values are only ever needed for elements whose own tag matches a search
+            'value': _to_obj(elem) if any(_matches(tag, c) for c in _SEARCHES) else None,
+        }
+        if stack:
+            stack[-1]['children'].setdefault(tag, []).append(summary)
+            if not stack[-1]['keep']:
+                elem.clear()
+        else:
+            doc = {'tag': tag, 'summary': summary}
+            elem.clear()
+
+    def find_key(i):
+        if _matches(doc['tag'], _SEARCHES[i]):
+            return doc['summary']['value']
+        return doc['summary']['found'][i] if doc['summary']['is_dict'] else None
 
-    freq_node = find_key(doc, ['frequency','frequencies'])
-    mag_node = find_key(doc, ['magnitude','magnitudelist','mag'])
-    phase_node = find_key(doc, ['phase','phaselist'])
+    freq_node, mag_node, phase_node = find_key(0), find_key(1), find_key(2)
 
     if freq_node is None or mag_node is None:
         raise ValueError("XML: required nodes not found. Inspect schema.")
@@ -51,11 +130,9 @@ def parse_xml(path):
 
     # try metadata extraction (simple)
     metadata = {}
-    top = doc
-    if isinstance(top, dict):
-        for key in ['instrument','operator','date','tap','transformer']:
-            node = find_key(top, [key])
-            if isinstance(node, str):
-                metadata[key] = node
+    for i, key in enumerate(META_KEYS, start=3):
+        node = find_key(i)
+        if isinstance(node, str):
+            metadata[key] = node
 
     return {'metadata': metadata, 'frequency': frequency, 'magnitude_db': magnitude, 'phase_deg': phase}
@@ -1,13 +1,24 @@
 # preprocessing.py
+from functools import lru_cache
+import json
+import os
 import numpy as np
-from scipy import interpolate, signal
+
+def _check_trace(freq, mag_db):
+    """Same input rules for the per-trace and batch paths: >= 2 samples, matching lengths."""
+    if len(freq) != len(mag_db):
+        raise ValueError("x and y arrays must be equal in length along interpolation axis.")
+    if len(freq) < 2:
+        raise ValueError("x and y arrays must have at least 2 entries")
 
 def resample_to_log_grid(freq, mag_db, n_points=1024, fmin=None, fmax=None):
     freq = np.asarray(freq)
     mag_db = np.asarray(mag_db)
+    _check_trace(freq, mag_db)
     if fmin is None: fmin = max(freq.min(), 1e-3)
     if fmax is None: fmax = freq.max()
     grid = np.logspace(np.log10(fmin), np.log10(fmax), num=n_points)
+    from scipy import interpolate
     interp = interpolate.interp1d(freq, mag_db, kind='linear', bounds_error=False, fill_value='extrapolate')
     mag = interp(grid)
     return grid, mag
@@ -19,5 +30,161 @@ def normalize(z):
 
 def denoise(mag_db, method='median'):
     if method == 'median':
+        from scipy import signal
         return signal.medfilt(mag_db, kernel_size=5)
     return mag_db
+
+# ---------- Batch API (many traces per call) ----------
+
+CHANNELS = ('magnitude_db', 'phase_deg')
+
+@lru_cache(maxsize=64)
+def log_grid(fmin, fmax, n_points):
+    """Cached read-only log-spaced grid, identical to the one resample_to_log_grid builds."""
+    grid = np.logspace(np.log10(fmin), np.log10(fmax), num=n_points)
+    grid.flags.writeable = False
+    return grid
+
+def grid_span(grid):
+    """(fmin, fmax) of a stored log grid, rounded because logspace endpoints carry float noise."""
+    return float(f'{grid[0]:.12g}'), float(f'{grid[-1]:.12g}')
+
+def grid_path(model_path):
+    return os.path.splitext(model_path)[0] + '.grid.json'
+
+def save_grid(model_path, fmin, fmax, n_points):
+    """Record the fixed log grid a model was trained on, next to the model file."""
+    path = grid_path(model_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'fmin': float(fmin), 'fmax': float(fmax), 'n_points': int(n_points)}, f)
+    return path
+
+def load_grid(model_path):
+    """{'fmin', 'fmax', 'n_points'} saved by save_grid, or None if the model used per-trace ranges."""
+    try:
+        with open(grid_path(model_path), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _interp_plan(freq, grid):
+    """
+    Indices and weights reproducing interp1d(kind='linear', fill_value='extrapolate')
+    on an arbitrary (possibly unsorted) frequency axis: y = y[i0]*(1-w) + y[i1]*w.
+    Segments are chosen as interp1d does, so repeated frequencies pick the same samples.
+    """
+    order = np.argsort(freq, kind='mergesort')
+    xs = freq[order]
+    hi = np.clip(np.searchsorted(xs, grid, side='left'), 1, xs.size - 1)
+    lo = hi - 1
+    width = xs[hi] - xs[lo]
+    # only reached when extrapolating past a repeated endpoint, where interp1d divides by zero;
+    # hold the endpoint value instead
+    flat = width == 0
+    w = (grid - xs[lo]) / np.where(flat, 1.0, width)
+    w[flat] = 0.0
+    return order[lo], order[hi], w
+
+def _as_trace(t):
+    if isinstance(t, dict):
+        return t['frequency'], t['magnitude_db'], t.get('phase_deg')
+    freq, mag = t[0], t[1]
+    return freq, mag, (t[2] if len(t) > 2 else None)
+
+def resample_batch(traces, n_points=1024, fmin=None, fmax=None, out=None):
+    """
+    Resample a ragged collection of traces onto log grids in one go.
+    traces: iterable of canonical parser dicts or (frequency, magnitude_db[, phase_deg]) tuples.
+    Traces sharing a frequency axis share one interpolation plan, so a fleet measured on the
+    same instrument settings is resampled with a single gather per channel.
+    out: optional dict channel -> preallocated (N, n_points) array (np.memmap works too).
+    Returns dict with 'frequency' (1-D grid when fmin and fmax are both given, else (N, n_points))
+    and one (N, n_points) matrix per channel; phase rows are NaN where a trace has no phase.
+    """
+    traces = [_as_trace(t) for t in traces]
+    for freq, mag, phase in traces:
+        _check_trace(freq, mag)
+        if phase is not None and len(phase) != len(freq):
+            raise ValueError("x and y arrays must be equal in length along interpolation axis.")
+    n = len(traces)
+    res = {}
+    for ch in CHANNELS:
+        arr = (out or {}).get(ch)
+        if arr is None:
+            arr = np.empty((n, n_points), dtype=float)
+        elif arr.shape != (n, n_points):
+            raise ValueError(f"out['{ch}'] must have shape {(n, n_points)}, got {arr.shape}")
+        res[ch] = arr
+    shared_grid = fmin is not None and fmax is not None
+    grids = log_grid(float(fmin), float(fmax), n_points) if shared_grid else np.empty((n, n_points))
+
+    # group rows by frequency axis so each distinct axis is planned once
+    groups = {}
+    for i, (freq, _, _) in enumerate(traces):
+        freq = np.ascontiguousarray(freq, dtype=float)
+        bucket = groups.setdefault((freq.size, hash(freq.tobytes())), [])
+        for axis, rows in bucket:
+            if np.array_equal(axis, freq):
+                rows.append(i); break
+        else:
+            bucket.append((freq, [i]))
+
+    for freq, rows in (g for bucket in groups.values() for g in bucket):
+        lo = max(freq.min(), 1e-3) if fmin is None else fmin
+        hi = freq.max() if fmax is None else fmax
+        grid = log_grid(float(lo), float(hi), n_points)
+        if not shared_grid:
+            grids[rows] = grid
+        i0, i1, w = _interp_plan(freq, grid)
+        mags = np.stack([np.asarray(traces[r][1], dtype=float) for r in rows])
+        res['magnitude_db'][rows] = mags[:, i0] * (1 - w) + mags[:, i1] * w
+        with_phase = [r for r in rows if traces[r][2] is not None]
+        if len(with_phase) < len(rows):
+            res['phase_deg'][[r for r in rows if traces[r][2] is None]] = np.nan
+        if with_phase:
+            ph = np.stack([np.asarray(traces[r][2], dtype=float) for r in with_phase])
+            res['phase_deg'][with_phase] = ph[:, i0] * (1 - w) + ph[:, i1] * w
+    res['frequency'] = grids
+    return res
+
+def denoise_batch(X, method='median', kernel_size=5, out=None):
+    """Row-wise denoise of an (N, L) matrix; 'median' matches signal.medfilt (zero-padded edges)."""
+    X = np.asarray(X, dtype=float)
+    if method == 'median':
+        from scipy import ndimage
+        return ndimage.median_filter(X, size=(1, kernel_size), mode='constant', cval=0.0, output=out)
+    if out is not None:
+        out[...] = X
+        return out
+    return X
+
+def normalize_batch(X, out=None):
+    """Row-wise z-score of an (N, L) matrix, same as normalize() applied to each row."""
+    X = np.asarray(X, dtype=float)
+    mean = X.mean(axis=1, keepdims=True)
+    std = X.std(axis=1, keepdims=True) + 1e-12
+    if out is None:
+        return (X - mean) / std
+    np.subtract(X, mean, out=out)
+    out /= std
+    return out
+
+def preprocess_batch(traces, n_points=1024, fmin=None, fmax=None, denoise_method='median',
+                     normalize_output=True, out=None):
+    """
+    resample -> denoise -> normalize for a whole batch of traces.
+    Same layout as resample_batch; results land in `out` arrays when given.
+    """
+    res = resample_batch(traces, n_points=n_points, fmin=fmin, fmax=fmax, out=out)
+    for ch in CHANNELS:
+        X = res[ch]
+        # phase rows of traces without phase are all-NaN by design and are left as they are
+        rows = ~np.isnan(X).all(axis=1) if ch == 'phase_deg' else np.ones(len(X), dtype=bool)
+        if not rows.any():
+            continue
+        sub = X if rows.all() else X[rows]
+        sub = denoise_batch(sub, method=denoise_method)
+        if normalize_output:
+            sub = normalize_batch(sub)
+        X[rows] = sub
+    return res
@@ -0,0 +1,58 @@
+# render.py
+"""
+In-process PNG rendering of the report figures with matplotlib's Agg canvas.
+
+One FigureRenderer keeps a magnitude and a phase figure template alive and only swaps the line
+data per call, so a warm renderer produces both images in milliseconds with no external export
+process and no temporary files.
+"""
+import io
+import threading
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# same titles/colours as the interactive Plotly figures, dark like the plotly_dark template
+TEMPLATES = {
+    "magnitude": {"title": "Frequency Response (Magnitude)", "ylabel": "Magnitude (dB)", "color": "royalblue"},
+    "phase": {"title": "Phase Response", "ylabel": "Phase (°)", "color": "orange"},
+}
+BACKGROUND = "#111111"
+FOREGROUND = "#f2f5fa"
+
+class FigureRenderer:
+    def __init__(self, width_in=6.5, height_in=3.2, dpi=150):
+        self.dpi = dpi
+        self._figs = {}
+        for name, t in TEMPLATES.items():
+            fig = Figure(figsize=(width_in, height_in), dpi=dpi, facecolor=BACKGROUND)
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot(1, 1, 1, facecolor=BACKGROUND)
+            (line,) = ax.plot([], [], color=t["color"], linewidth=1.5)
+            ax.set_title(t["title"], color=FOREGROUND)
+            ax.set_xlabel("Frequency (Hz)", color=FOREGROUND)
+            ax.set_ylabel(t["ylabel"], color=FOREGROUND)
+            ax.tick_params(colors=FOREGROUND)
+            for spine in ax.spines.values():
+                spine.set_color("#506784")
+            ax.grid(True, color="#283442", linewidth=0.8)
+            fig.tight_layout()
+            self._figs[name] = (fig, ax, line)
+
+    def render(self, name, x, y):
+        """PNG bytes of template `name` ('magnitude' or 'phase') drawn with the given data."""
+        fig, ax, line = self._figs[name]
+        line.set_data(x, y)
+        ax.relim()
+        ax.autoscale_view()
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=self.dpi, facecolor=BACKGROUND)
+        return buf.getvalue()
+
+_local = threading.local()
+
+def get_renderer():
+    """Warm renderer for the calling thread (matplotlib figures are not thread-safe)."""
+    if not hasattr(_local, "renderer"):
+        _local.renderer = FigureRenderer()
+    return _local.renderer
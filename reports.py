@@ -0,0 +1,179 @@
+# reports.py
+"""
+Background report generation with a content-addressed result cache.
+
+Reports are keyed by a hash of the trace (frequency/magnitude/phase values) plus the model version,
+so re-submitting the same sweep against the same model returns the cached HTML/PDF at once.
+
+    queue = ReportQueue()
+    key = queue.submit(df, fault_type, prob)   # returns immediately
+    queue.status(key)                          # 'queued' | 'running' | 'done' | 'failed' | 'unknown'
+    queue.fetch(key)                           # waits if needed, then {'html_report', 'pdf_report', ...}
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+REPORT_CACHE_DIR = os.environ.get("FRA_REPORT_CACHE", "report_cache")
+REPORT_CACHE_MB = float(os.environ.get("FRA_REPORT_CACHE_MB", "512"))
+TRACE_COLUMNS = ["Frequency (Hz)", "Magnitude (dB)", "Phase (°)"]
+_KEY = re.compile(r"[0-9a-f]{32}")
+
+def model_version(path=None):
+    """Cheap fingerprint of the model file (size + mtime); 'stub' while no model is trained."""
+    from export import runtime_path
+    if path is None:
+        from inference import MODEL_PATH as path
+    path = runtime_path(path)
+    if not os.path.exists(path):
+        return "stub"
+    st = os.stat(path)
+    return f"{os.path.basename(path)}-{st.st_size}-{st.st_mtime_ns}"
+
+def trace_key(df, version):
+    h = hashlib.sha256(version.encode())
+    for col in TRACE_COLUMNS:
+        if col in df.columns:
+            h.update(col.encode())
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()[:32]
+
+class ReportCache:
+    """On-disk report store, one directory per key, evicted least-recently-used beyond max_bytes."""
+
+    def __init__(self, root=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MB * 2**20):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _manifest(self, key):
+        return os.path.join(self.root, key, "result.json")
+
+    def get(self, key):
+        """Cached result dict with absolute file paths, or None. Marks the entry as recently used."""
+        if not _KEY.fullmatch(key):
+            return None
+        manifest = self._manifest(key)
+        try:
+            with open(manifest, encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(manifest)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        entry = os.path.dirname(os.path.abspath(manifest))
+        for k in ("html_report", "pdf_report"):
+            result[k] = os.path.join(entry, result[k])
+        return result
+
+    def staging_dir(self):
+        path = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(path)
+        return path
+
+    def put(self, key, staging, result):
+        """Publish a finished staging directory under `key` atomically, then evict."""
+        result = dict(result, **{k: os.path.basename(result[k]) for k in ("html_report", "pdf_report")})
+        with open(os.path.join(staging, "result.json"), "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        try:
+            os.replace(staging, os.path.join(self.root, key))
+        except OSError:
+            # another worker published the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.root):
+            manifest = self._manifest(name)
+            if name.startswith(".") or not os.path.exists(manifest):
+                continue
+            d = os.path.join(self.root, name)
+            size = sum(e.stat().st_size for e in os.scandir(d) if e.is_file())
+            entries.append((os.stat(manifest).st_mtime, name, size))
+        total = sum(e[2] for e in entries)
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= size
+
+def _render_job(df, fault_type, prob, out_dir):
+    from inference import predict_fault_type, render_report
+    if fault_type is None:
+        fault_type, prob = predict_fault_type(df)
+    paths = render_report(df, fault_type, prob, out_dir=out_dir, stem="report")
+    return dict(paths, fault_type=fault_type, probability=prob, rendered_at=time.time())
+
+class ReportQueue:
+    """Renders reports in a process pool so callers get their prediction back without waiting."""
+
+    def __init__(self, cache=None, workers=2, version=None):
+        self.cache = cache or ReportCache()
+        self.version = version or model_version()
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.jobs = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def submit(self, df, fault_type=None, prob=None):
+        """Queue a report for `df` (prediction is made in the worker when not given); returns its key."""
+        key = trace_key(df, self.version)
+        with self._lock:
+            if key in self.jobs or self.cache.get(key) is not None:
+                return key
+            self.errors.pop(key, None)
+            staging = self.cache.staging_dir()
+            fut = self.pool.submit(_render_job, df, fault_type, prob, staging)
+            self.jobs[key] = fut
+        fut.add_done_callback(lambda f: self._finish(key, staging, f))
+        return key
+
+    def _finish(self, key, staging, fut):
+        try:
+            self.cache.put(key, staging, fut.result())
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            with self._lock:
+                self.errors[key] = f"{type(e).__name__}: {e}"
+        with self._lock:
+            self.jobs.pop(key, None)
+
+    def status(self, key):
+        with self._lock:
+            fut = self.jobs.get(key)
+            if fut is not None:
+                return "running" if fut.running() else "queued"
+            if key in self.errors:
+                return "failed"
+        return "done" if self.cache.get(key) is not None else "unknown"
+
+    def fetch(self, key, timeout=None):
+        """Result dict for a finished report; blocks up to `timeout` seconds while it renders."""
+        with self._lock:
+            fut = self.jobs.get(key)
+        if fut is not None:
+            fut.exception(timeout=timeout)
+            # the done-callback publishes to the cache right after the future resolves
+            while self.status(key) in ("queued", "running"):
+                time.sleep(0.01)
+        with self._lock:
+            if key in self.errors:
+                raise RuntimeError(f"Report {key} failed: {self.errors[key]}")
+        result = self.cache.get(key)
+        if result is None:
+            raise KeyError(f"Unknown report {key}")
+        return result
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
@@ -0,0 +1,222 @@
+# server.py
+"""
+FastAPI service for FRA fault prediction.
+
+    uvicorn server:app --workers 1
+
+The classifier is loaded once at startup. Concurrent /predict requests are queued and scored in
+micro-batches: a batch is sent to the model when it reaches FRA_MAX_BATCH_SIZE sweeps or when the
+oldest queued sweep has waited FRA_MAX_WAIT_MS milliseconds, whichever comes first.
+POST /predict?report=true also queues an HTML/PDF report (see reports.py) and returns its id without
+waiting for rendering; poll GET /reports/{id} and download from /reports/{id}/pdf or /html.
+When a similarity index (similarity.py) exists at FRA_SIMILARITY_INDEX, /predict also returns the
+FRA_NEIGHBORS most similar historical sweeps and their recorded diagnoses.
+GET /metrics serves per-stage latency, throughput and memory in Prometheus text format (metrics.py).
+"""
+import asyncio
+import io
+import os
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from feature_cache import default_cache, features_from_bytes
+from inference import MODEL_PATH, load_classifier, model_grid, predict_proba, label_for
+from parse_csv import parse_csv
+from parse_xml import parse_xml
+from metrics import count, render_prometheus, span
+from reports import ReportQueue, TRACE_COLUMNS, model_version
+from similarity import SimilarityIndex
+
+MAX_BATCH_SIZE = int(os.environ.get("FRA_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.environ.get("FRA_MAX_WAIT_MS", "10"))
+REPORT_WORKERS = int(os.environ.get("FRA_REPORT_WORKERS", "2"))
+SIMILARITY_INDEX = os.environ.get("FRA_SIMILARITY_INDEX", "fleet.sim")
+NEIGHBORS = int(os.environ.get("FRA_NEIGHBORS", "5"))
+
+class MicroBatcher:
+    """Collects single feature vectors from many requests and scores them together."""
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, x):
+        """Queue one (L,) feature vector; resolves to its class-probability vector."""
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((x, fut))
+        return await fut
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # requests whose client went away are dropped before touching the model
+            batch = [(x, fut) for x, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            count('fra_batches_total')
+            count('fra_batched_sweeps_total', len(batch))
+            try:
+                probs = await run_in_threadpool(self.predict_fn, np.stack([x for x, _ in batch]))
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), p in zip(batch, probs):
+                if not fut.done():
+                    fut.set_result(p)
+
+state = {}
+
+@asynccontextmanager
+async def lifespan(app):
+    model = load_classifier(MODEL_PATH)
+    if model is None:
+        raise RuntimeError(f"Model file '{MODEL_PATH}' not found. Train it with train.train_classifier or set FRA_MODEL_PATH.")
+    state['model'] = model
+    state['n_points'] = int(model.input_shape[1])
+    state['grid'] = model_grid(MODEL_PATH)
+    state['batcher'] = MicroBatcher(lambda X: predict_proba(model, X))
+    state['batcher'].start()
+    state['reports'] = ReportQueue(workers=REPORT_WORKERS, version=model_version(MODEL_PATH))
+    index = SimilarityIndex.load(SIMILARITY_INDEX) if os.path.isdir(SIMILARITY_INDEX) else None
+    # queries are resampled onto the grid the index was built on; without a recorded grid the
+    # stored signatures cannot be matched, so no neighbours are served
+    if index is not None and (index.grid is None or index.grid['n_points'] != index.input_len):
+        index = None
+    state['index'] = index
+    yield
+    await state['batcher'].stop()
+    state['reports'].shutdown(wait=False)
+    state.clear()
+
+app = FastAPI(title="FRA Fault Prediction", lifespan=lifespan)
+
+def _parse_upload(filename, data, n_points, grid=(None, None), keep_parsed=False):
+    """
+    (parsed dict or None, features on the model's grid). Features come from the shared feature
+    cache by content hash, so a re-uploaded file is only parsed again when the trace itself is
+    needed (reports).
+    """
+    parsed = _parser(filename)(io.BytesIO(data)) if keep_parsed else None
+    return parsed, _features(filename, data, n_points, grid, parsed)
+
+def _parser(filename):
+    return parse_xml if filename.lower().endswith('.xml') else parse_csv
+
+def _features(filename, data, n_points, grid, parsed=None):
+    with span('preprocess'):
+        X = features_from_bytes(data, (lambda buf: parsed) if parsed is not None else _parser(filename),
+                                n_points=n_points, fmin=grid[0], fmax=grid[1], cache=default_cache())
+    return X[0]
+
+def _neighbors(filename, data, x, parsed=None):
+    """Nearest indexed sweeps; the query is resampled onto the index grid when it differs from the model's."""
+    index = state['index']
+    g = index.grid
+    if g['n_points'] != len(x) or (g['fmin'], g['fmax']) != state['grid']:
+        x = _features(filename, data, g['n_points'], (g['fmin'], g['fmax']), parsed)
+    with span('similarity', items=NEIGHBORS):
+        ids, dist, labels = index.search(x, k=NEIGHBORS)
+    return [{"id": int(i), "label": label, "distance": round(float(d), 4)}
+            for i, d, label in zip(ids[0], dist[0], labels[0]) if i >= 0]
+
+def _trace_frame(parsed):
+    phase = parsed['phase_deg'] if parsed['phase_deg'] is not None else np.full(len(parsed['frequency']), np.nan)
+    return pd.DataFrame(dict(zip(TRACE_COLUMNS, (parsed['frequency'], parsed['magnitude_db'], phase))))
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "model": MODEL_PATH, "queued": state['batcher'].queue.qsize()}
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/predict")
+async def predict(file: UploadFile = File(...), report: bool = False):
+    with span('request_predict'):
+        return await _predict(file, report)
+
+async def _predict(file, report):
+    data = await file.read()
+    try:
+        parsed, x = await run_in_threadpool(_parse_upload, file.filename or '', data, state['n_points'],
+                                       state['grid'], report)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse '{file.filename}': {e}")
+    with span('queue_wait'):
+        probs = await state['batcher'].submit(x)
+    neighbors = None
+    if state['index'] is not None:
+        neighbors = await run_in_threadpool(_neighbors, file.filename or '', data, x, parsed)
+    i = int(np.argmax(probs))
+    response = {
+        "status": "success",
+        "filename": file.filename,
+        "result": {
+            "fault_type": label_for(i),
+            "probability": round(float(probs[i]) * 100, 2),
+        },
+    }
+    if neighbors is not None:
+        response["result"]["neighbors"] = neighbors
+    if report:
+        response["report_id"] = state['reports'].submit(_trace_frame(parsed), label_for(i), round(float(probs[i]), 2))
+    return response
+
+@app.get("/reports/{report_id}")
+async def report_status(report_id: str):
+    status = state['reports'].status(report_id)
+    if status == "unknown":
+        raise HTTPException(status_code=404, detail=f"Unknown report '{report_id}'")
+    return {"report_id": report_id, "status": status}
+
+@app.get("/reports/{report_id}/{kind}")
+async def report_file(report_id: str, kind: str):
+    if kind not in ("pdf", "html"):
+        raise HTTPException(status_code=404, detail="Report kind must be 'pdf' or 'html'")
+    if state['reports'].status(report_id) != "done":
+        raise HTTPException(status_code=404, detail=f"Report '{report_id}' is not ready")
+    result = state['reports'].fetch(report_id)
+    path = result[f"{kind}_report"]
+    media = "application/pdf" if kind == "pdf" else "text/html"
+    return FileResponse(path, media_type=media, filename=f"fra_report_{report_id}.{kind}")
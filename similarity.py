@@ -0,0 +1,310 @@
+# similarity.py
+"""
+Approximate nearest-neighbour search over FRA signatures.
+
+Vectors are normalized log-grid signatures (preprocessing.normalize / archive features) or
+autoencoder latents. They are reduced to `dim` PCA components (for z-scored signatures the
+Euclidean distance is a monotone function of the correlation), then stored in an IVF index:
+k-means coarse centroids, and each query scans only the `nprobe` closest inverted lists.
+
+    idx = SimilarityIndex.build(X, labels=diagnoses, ids=rows)    # trains PCA + k-means
+    idx.add(X_new, labels=new_diagnoses)                         # incremental inserts
+    idx.save('fleet.sim')                                        # appends a new segment only
+    ids, dist, labels = SimilarityIndex.load('fleet.sim').search(x, k=5)
+
+On disk an index is a directory: index.json (settings, label vocabulary, segment list, grid),
+model.npz (PCA mean/components and centroids) and seg-XXXXX.npz files of inserted rows.
+save() writes only rows added since the last save; compact() merges segments.
+
+`grid` ({'fmin', 'fmax', 'n_points'}) records the log grid of the stored signatures
+(index_archive takes it from the archive); queries must be resampled onto the same grid.
+"""
+import json
+import os
+import numpy as np
+from preprocessing import grid_span
+
+DIM = 64
+NPROBE = 16
+
+def _kmeans(X, k, iters=10, seed=0, chunk=65536):
+    """Lloyd's k-means on rows of X (float32); empty clusters are reseeded from random rows."""
+    rng = np.random.default_rng(seed)
+    C = X[rng.choice(len(X), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(X, C, chunk)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        C[~empty] = np.add.reduceat(X[order], starts[~empty]) / counts[~empty, None]
+        if empty.any():
+            C[empty] = X[rng.choice(len(X), int(empty.sum()), replace=False)]
+    return C
+
+def _nearest(X, C, chunk=65536):
+    """Index of the closest row of C for every row of X."""
+    cn = (C ** 2).sum(axis=1)
+    out = np.empty(len(X), dtype=np.int32)
+    for s in range(0, len(X), chunk):
+        out[s:s + chunk] = (cn - 2 * X[s:s + chunk] @ C.T).argmin(axis=1)
+    return out
+
+def _atomic_save(path, **arrays):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+class SimilarityIndex:
+    def __init__(self, mean, components, centroids, nprobe=NPROBE, label_names=(), grid=None):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)  # (dim, input_len)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self._cnorm = (self.centroids ** 2).sum(axis=1)
+        self.nprobe = nprobe
+        self.label_names = list(label_names)
+        self._codes = {name: i for i, name in enumerate(self.label_names)}
+        self.input_len = self.components.shape[1]
+        self.grid = grid
+        self._vecs = np.empty((0, self.components.shape[0]), dtype=np.float32)
+        self._lists = np.empty(0, dtype=np.int32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._labels = np.empty(0, dtype=np.int32)
+        self._n = 0
+        self._saved = 0
+        self._segments = []
+        self._path = None  # directory the listed segments live in
+        self._members = None  # per-list row numbers, rebuilt lazily after inserts
+
+    def __len__(self):
+        return self._n
+
+    # ---------- building ----------
+    @classmethod
+    def train(cls, X, dim=DIM, n_lists=None, nprobe=NPROBE, sample=None, seed=0):
+        """Fit PCA and coarse centroids on X (or a random sample of it); no rows are added."""
+        X = np.asarray(X, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        n_lists = n_lists or int(min(4096, max(1, 4 * np.sqrt(len(X)))))
+        sample = sample or min(len(X), max(32 * n_lists, 20000))
+        S = X[rng.choice(len(X), sample, replace=False)] if sample < len(X) else X
+        mean = S.mean(axis=0)
+        # principal axes from the SVD of the centered sample
+        _, _, vt = np.linalg.svd(S - mean, full_matrices=False)
+        components = vt[:min(dim, vt.shape[0])]
+        return cls(mean, components, _kmeans((S - mean) @ components.T, min(n_lists, len(S)), seed=seed), nprobe)
+
+    @classmethod
+    def build(cls, X, labels=None, ids=None, **kwargs):
+        idx = cls.train(X, **kwargs)
+        idx.add(X, labels=labels, ids=ids)
+        return idx
+
+    def project(self, X):
+        return ((np.asarray(X, dtype=np.float32) - self.mean) @ self.components.T).astype(np.float32)
+
+    def _encode_labels(self, labels, n):
+        if labels is None:
+            return np.full(n, -1, dtype=np.int32)
+        codes = np.empty(n, dtype=np.int32)
+        for i, name in enumerate(labels):
+            if name is None:
+                codes[i] = -1
+                continue
+            name = str(name)
+            if name not in self._codes:
+                self._codes[name] = len(self.label_names)
+                self.label_names.append(name)
+            codes[i] = self._codes[name]
+        return codes
+
+    def _grow(self, n):
+        need = self._n + n
+        if need <= len(self._ids):
+            return
+        cap = max(need, 2 * len(self._ids), 1024)
+        for name in ('_vecs', '_lists', '_ids', '_labels'):
+            old = getattr(self, name)
+            new = np.empty((cap,) + old.shape[1:], dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def add(self, X, labels=None, ids=None):
+        """Insert (N, input_len) signatures with optional labels (strings) and integer ids."""
+        V = self.project(np.atleast_2d(X))
+        n = len(V)
+        if ids is None:
+            ids = np.arange(self._n, self._n + n)
+        self._grow(n)
+        s = self._n
+        self._vecs[s:s + n] = V
+        self._lists[s:s + n] = _nearest(V, self.centroids)
+        self._ids[s:s + n] = ids
+        self._labels[s:s + n] = self._encode_labels(labels, n)
+        self._n += n
+        self._members = None
+        return np.asarray(ids)
+
+    # ---------- search ----------
+    def _lists_members(self):
+        if self._members is None:
+            order = np.argsort(self._lists[:self._n], kind='stable').astype(np.int64)
+            bounds = np.searchsorted(self._lists[:self._n][order], np.arange(len(self.centroids) + 1))
+            self._members = (order, bounds)
+        return self._members
+
+    def search(self, X, k=5, nprobe=None):
+        """
+        k nearest stored rows for each query row: (ids, squared distances, labels), each (Q, k).
+        Missing neighbours (fewer than k candidates) have id -1, distance inf and label None.
+        """
+        Q = self.project(np.atleast_2d(X))
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        order, bounds = self._lists_members()
+        probe = np.argsort(self._cnorm - 2 * Q @ self.centroids.T, axis=1)[:, :nprobe]
+        ids = np.full((len(Q), k), -1, dtype=np.int64)
+        dist = np.full((len(Q), k), np.inf, dtype=np.float32)
+        labels = [[None] * k for _ in range(len(Q))]
+        for qi, q in enumerate(Q):
+            rows = np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probe[qi]])
+            if rows.size == 0:
+                continue
+            d = ((self._vecs[rows] - q) ** 2).sum(axis=1)
+            top = np.argpartition(d, k - 1)[:k] if rows.size > k else np.arange(rows.size)
+            top = top[np.argsort(d[top])]
+            hit = rows[top]
+            ids[qi, :len(hit)] = self._ids[hit]
+            dist[qi, :len(hit)] = d[top]
+            labels[qi][:len(hit)] = [self.label_names[c] if c >= 0 else None for c in self._labels[hit]]
+        return ids, dist, labels
+
+    # ---------- persistence ----------
+    def _write_meta(self, path):
+        meta = {'nprobe': self.nprobe, 'label_names': self.label_names, 'segments': self._segments,
+                'count': self._n, 'grid': self.grid}
+        tmp = os.path.join(path, 'index.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'index.json'))
+
+    def _target(self, path):
+        """
+        Prepare `path` for writing; returns True when the segments saved so far live in another
+        directory, in which case every row has to be written again.
+        """
+        moved = self._path is not None and self._path != os.path.abspath(path)
+        if moved:
+            self._segments, self._saved = [], 0
+        os.makedirs(path, exist_ok=True)
+        model = os.path.join(path, 'model.npz')
+        if moved or not os.path.exists(model):
+            _atomic_save(model, mean=self.mean, components=self.components, centroids=self.centroids)
+        self._path = os.path.abspath(path)
+        return moved
+
+    def save(self, path):
+        """
+        Persist rows added since the last save as one new segment (plus the model on first save).
+        Saving to a directory other than the one the index was loaded from or saved to writes all rows.
+        """
+        self._target(path)
+        if self._n > self._saved:
+            name = f'seg-{len(self._segments):05d}.npz'
+            s, e = self._saved, self._n
+            _atomic_save(os.path.join(path, name), vecs=self._vecs[s:e], lists=self._lists[s:e],
+                         ids=self._ids[s:e], labels=self._labels[s:e])
+            self._segments.append(name)
+            self._saved = self._n
+        self._write_meta(path)
+        return path
+
+    def compact(self, path):
+        """Rewrite all rows as a single segment and drop the old segment files."""
+        old = [] if self._target(path) else list(self._segments)
+        self._segments, self._saved = [], 0
+        tmp_name = 'seg-compact.npz'
+        _atomic_save(os.path.join(path, tmp_name), vecs=self._vecs[:self._n], lists=self._lists[:self._n],
+                     ids=self._ids[:self._n], labels=self._labels[:self._n])
+        self._segments, self._saved = [tmp_name], self._n
+        self._write_meta(path)
+        for name in old:
+            if name != tmp_name:
+                os.remove(os.path.join(path, name))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'index.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, 'model.npz')) as m:
+            idx = cls(m['mean'], m['components'], m['centroids'], meta['nprobe'], meta['label_names'],
+                      meta.get('grid'))
+        parts = []
+        for name in meta['segments']:
+            with np.load(os.path.join(path, name)) as seg:
+                parts.append({k: seg[k] for k in ('vecs', 'lists', 'ids', 'labels')})
+        if parts:
+            idx._vecs = np.concatenate([p['vecs'] for p in parts])
+            idx._lists = np.concatenate([p['lists'] for p in parts])
+            idx._ids = np.concatenate([p['ids'] for p in parts])
+            idx._labels = np.concatenate([p['labels'] for p in parts])
+        idx._n = idx._saved = len(idx._ids)
+        idx._segments = list(meta['segments'])
+        idx._path = os.path.abspath(path)
+        return idx
+
+def archive_grid(archive):
+    fmin, fmax = grid_span(archive.feature_grid)
+    return {'fmin': fmin, 'fmax': fmax, 'n_points': len(archive.feature_grid)}
+
+def index_archive(archive, label_key='label', channel='magnitude_db', block=65536, **kwargs):
+    """
+    Index every feature row of a FleetArchive; ids are archive row numbers and labels come from
+    the `label_key` metadata field. Rows without features are skipped.
+    """
+    n = len(archive)
+    if n == 0:
+        raise ValueError("Archive is empty; nothing to index.")
+    rng = np.random.default_rng(kwargs.get('seed', 0))
+    sample_rows = np.sort(rng.choice(n, min(n, 100_000), replace=False))
+    S = archive.f[f'features/{channel}'][sample_rows]
+    idx = SimilarityIndex.train(S[~np.isnan(S).any(axis=1)], **kwargs)
+    idx.grid = archive_grid(archive)
+    meta = archive.f['rows/metadata'].asstr()
+    for s in range(0, n, block):
+        X = archive.features(channel, s, min(s + block, n))
+        labels = [json.loads(m).get(label_key) for m in meta[s:s + len(X)]]
+        ok = ~np.isnan(X).any(axis=1)
+        idx.add(X[ok], labels=[l for l, o in zip(labels, ok) if o], ids=np.arange(s, s + len(X))[ok])
+    return idx
+
+def main(argv=None):
+    import argparse
+    from archive import FleetArchive
+    ap = argparse.ArgumentParser(description="Build or extend a similarity index from a fleet archive.")
+    ap.add_argument('archive')
+    ap.add_argument('--out', default='fleet.sim')
+    ap.add_argument('--label-key', default='label', help="metadata field holding the diagnosis")
+    ap.add_argument('--dim', type=int, default=DIM)
+    ap.add_argument('--lists', type=int, default=None)
+    args = ap.parse_args(argv)
+    with FleetArchive(args.archive, 'r') as ar:
+        if os.path.isdir(args.out):
+            # incremental: only archive rows beyond those already indexed
+            idx = SimilarityIndex.load(args.out)
+            if idx.grid != archive_grid(ar):
+                raise SystemExit(f"{args.out} was built on grid {idx.grid}, the archive uses {archive_grid(ar)}")
+            start = int(idx._ids[:len(idx)].max()) + 1 if len(idx) else 0
+            X = ar.features('magnitude_db', start)
+            meta = ar.f['rows/metadata'].asstr()[start:]
+            ok = ~np.isnan(X).any(axis=1)
+            idx.add(X[ok], labels=[json.loads(m).get(args.label_key) for m, o in zip(meta, ok) if o],
+                    ids=np.arange(start, start + len(X))[ok])
+        else:
+            idx = index_archive(ar, args.label_key, dim=args.dim, n_lists=args.lists)
+    idx.save(args.out)
+    print(f"Indexed {len(idx)} sweeps in {args.out}")
+
+if __name__ == "__main__":
+    main()
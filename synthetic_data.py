@@ -1,36 +1,128 @@
 # synthetic_data.py
+"""
+Synthetic FRA magnitude signatures.
+
+generate_batch() builds whole (N, n_points) blocks for one fault class in a single vectorized
+operation with randomized fault severity and position. create_shards() spreads shards across
+processes and writes <name>.X.npy / <name>.y.npy pairs (the layout dataset.ShardSource reads);
+every shard has its own seed derived from the master seed, so output does not depend on the
+number of workers.
+
+    python synthetic_data.py --samples 1000000 --out synthetic_shards --workers 8
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import numpy as np
-import json
-from math import sin
-import random
 
-def generate_signature(n_points=1024, fault=None):
-    # log freq
+LABELS = ['no_fault', 'axial', 'radial', 'core_ground']
+SHARDS_DIR = 'synthetic_shards'
+SHARD_SIZE = 65536
+
+@lru_cache(maxsize=8)
+def _grid(n_points):
+    """Frequency axis, its log and the healthy baseline (computed once per n_points)."""
     freq = np.logspace(0, 4, n_points)
-    base = np.sin(np.log(freq))*5  # synthetic baseline wiggle
+    logf = np.log(freq)
+    base = np.sin(logf) * 5  # synthetic baseline wiggle
     # add resonant peaks
     for p in [50, 300, 1200]:
-        base += 6 * np.exp(-0.5*((np.log(freq)-np.log(p))/0.6)**2)
+        base += 6 * np.exp(-0.5 * ((logf - np.log(p)) / 0.6) ** 2)
+    for a in (freq, logf, base):
+        a.setflags(write=False)
+    return freq, logf, base
+
+def _fault(logf, fault, severity, shift):
+    """(N, n_points) fault component; severity scales amplitude, shift moves it along ln(f)."""
+    severity = np.asarray(severity, dtype=float)[:, None]
+    shift = np.asarray(shift, dtype=float)[:, None]
     if fault == 'axial':
-        base += 10 * np.exp(-0.5*((np.log(freq)-np.log(80))/0.4)**2)
+        return 10 * severity * np.exp(-0.5 * ((logf - np.log(80) - shift) / 0.4) ** 2)
     if fault == 'radial':
-        base += 8 * np.exp(-0.5*((np.log(freq)-np.log(1200))/0.3)**2)
+        return 8 * severity * np.exp(-0.5 * ((logf - np.log(1200) - shift) / 0.3) ** 2)
     if fault == 'core_ground':
-        base += np.linspace(0, -12, n_points)
+        # linear drop in dB across the sweep, starting later for positive shift
+        t = np.linspace(0, 1, logf.size)[None, :]
+        start = np.clip(shift / (logf[-1] - logf[0]), 0, 0.9)
+        return -12 * severity * np.clip((t - start) / (1 - start), 0, 1)
+    return np.zeros((severity.shape[0], logf.size))
+
+def generate_signature(n_points=1024, fault=None):
+    freq, logf, base = _grid(n_points)
+    mag_db = base + _fault(logf, fault, [1.0], [0.0])[0]
     # noise
-    base += np.random.normal(0, 0.5, size=n_points)
-    mag_db = base
+    mag_db += np.random.normal(0, 0.5, size=n_points)
     return {'frequency': freq, 'mag': mag_db}
 
+def generate_batch(n, n_points=1024, fault=None, rng=None, severity=(0.5, 1.5), max_shift=0.5,
+                   noise_std=0.5, dtype=np.float32):
+    """
+    n signatures of one fault class as an (n, n_points) array on the shared frequency axis.
+    Severity is drawn uniformly from `severity` and the fault position is shifted by up to
+    +/- max_shift in ln(f) (0.5 ~ a factor of 1.65 in frequency).
+    """
+    rng = np.random.default_rng(rng)
+    _, logf, base = _grid(n_points)
+    out = rng.normal(0, noise_std, size=(n, n_points))
+    out += base
+    if fault not in (None, 'no_fault'):
+        sev = rng.uniform(*severity, size=n)
+        shift = rng.uniform(0, max_shift, size=n) if fault == 'core_ground' else \
+            rng.uniform(-max_shift, max_shift, size=n)
+        out += _fault(logf, fault, sev, shift)
+    return out.astype(dtype, copy=False)
+
+def generate_labelled(n, n_points=1024, rng=None, **kwargs):
+    """Class-balanced (X, y) with labels in LABELS order, rows shuffled."""
+    rng = np.random.default_rng(rng)
+    y = rng.permutation(np.arange(n) % len(LABELS)).astype(np.int8)
+    X = np.empty((n, n_points), dtype=kwargs.get('dtype', np.float32))
+    for i, label in enumerate(LABELS):
+        rows = np.flatnonzero(y == i)
+        X[rows] = generate_batch(rows.size, n_points, fault=label, rng=rng, **kwargs)
+    return X, y
+
+def _write_shard(args):
+    path, n, n_points, seed = args
+    X, y = generate_labelled(n, n_points, rng=np.random.default_rng(seed))
+    for suffix, arr in (('.X.npy', X), ('.y.npy', y)):
+        tmp = path + suffix + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp, path + suffix)
+    return path
+
+def create_shards(n_samples, out_dir=SHARDS_DIR, shard_size=SHARD_SIZE, n_points=1024, seed=0, workers=None):
+    """Write n_samples labelled signatures as part-XXXXX shards plus frequency.npy; returns shard paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, 'frequency.npy'), _grid(n_points)[0])
+    sizes = [min(shard_size, n_samples - s) for s in range(0, n_samples, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(os.path.join(out_dir, f'part-{i:05d}'), n, n_points, ss) for i, (n, ss) in enumerate(zip(sizes, seeds))]
+    if workers == 1 or len(jobs) == 1:
+        return [_write_shard(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_write_shard, jobs))
+
 def create_dataset(n_per_class=50, out='synthetic.npy'):
-    labels = ['no_fault','axial','radial','core_ground']
+    """Legacy object-array format (list of dicts); prefer create_shards for anything large."""
+    freq = _grid(1024)[0]
     data = []
-    for i,label in enumerate(labels):
-        for _ in range(n_per_class):
-            f = generate_signature(1024, fault=(label if label!='no_fault' else None))
-            data.append({'frequency': f['frequency'], 'mag': f['mag'], 'label': i})
+    for i, label in enumerate(LABELS):
+        for mag in generate_batch(n_per_class, 1024, fault=label, severity=(1, 1), max_shift=0, dtype=float):
+            data.append({'frequency': freq, 'mag': mag, 'label': i})
     np.save(out, data)
     print("Saved", out)
 
 if __name__ == "__main__":
-    create_dataset(20, out='synthetic.npy')
+    ap = argparse.ArgumentParser(description="Generate sharded synthetic FRA signatures.")
+    ap.add_argument('--samples', type=int, default=80)
+    ap.add_argument('--out', default=SHARDS_DIR)
+    ap.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    ap.add_argument('--n-points', type=int, default=1024)
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--workers', type=int, default=None)
+    args = ap.parse_args()
+    paths = create_shards(args.samples, args.out, args.shard_size, args.n_points, args.seed, args.workers)
+    print(f"Saved {args.samples} samples in {len(paths)} shards to {args.out}")
@@ -0,0 +1,45 @@
+# conftest.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_sweep(n=500, fmin=20.0, fmax=2e6, seed=0, phase=True):
+    rng = np.random.default_rng(seed)
+    freq = np.logspace(np.log10(fmin), np.log10(fmax), n)
+    mag = -20 * np.log10(freq) / 4 + np.cumsum(rng.normal(0, 0.2, n))
+    return {'metadata': {}, 'frequency': freq, 'magnitude_db': mag,
+            'phase_deg': rng.uniform(-90, 90, n) if phase else None}
+
+def write_csv(path, sweeps, sweep_column=None, **meta):
+    frames = []
+    for i, s in enumerate(sweeps):
+        cols = {'Frequency (Hz)': s['frequency'], 'Magnitude (dB)': s['magnitude_db']}
+        if s.get('phase_deg') is not None:
+            cols['Phase (deg)'] = s['phase_deg']
+        df = pd.DataFrame(cols)
+        if sweep_column:
+            df.insert(0, sweep_column, i)
+        for k, v in meta.items():
+            df[k] = v
+        frames.append(df)
+    pd.concat(frames).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def sweep():
+    return make_sweep()
+
+@pytest.fixture(autouse=True)
+def feature_cache_dir(tmp_path, monkeypatch):
+    """Point the default feature cache at a per-test directory instead of ~/.cache."""
+    import feature_cache
+    root = str(tmp_path / 'feature_cache')
+    monkeypatch.setattr(feature_cache, 'FEATURE_CACHE_DIR', root)
+    monkeypatch.setattr(feature_cache, '_default', {})
+    return root
@@ -0,0 +1,78 @@
+# legacy.py
+"""The original xmltodict / pandas / np.frombuffer parsers, kept as parity references."""
+import numpy as np
+import pandas as pd
+
+def parse_csv(path):
+    df = pd.read_csv(path)
+    cols = [c.strip().lower() for c in df.columns]
+    meta = {}
+    for k in ['transformer', 'id', 'tap', 'operator', 'date']:
+        for c in df.columns:
+            if k in c.lower():
+                meta[k] = str(df[c].iloc[0])
+                break
+    if 'frequency' not in cols:
+        freq = df.iloc[:, 0].to_numpy(dtype=float)
+    else:
+        freq = df.iloc[:, cols.index('frequency')].to_numpy(dtype=float)
+    mag = None; phase = None
+    for name in ['magnitude', 'magnitude_db', 'mag_db', 'mag']:
+        if name in cols:
+            mag = df.iloc[:, cols.index(name)].to_numpy(dtype=float); break
+    if mag is None and ('real' in cols and 'imag' in cols):
+        complex_ = df.iloc[:, cols.index('real')].to_numpy(dtype=float) + 1j*df.iloc[:, cols.index('imag')].to_numpy(dtype=float)
+        mag = 20 * np.log10(np.abs(complex_) + 1e-12)
+        phase = np.angle(complex_, deg=True)
+    elif 'phase' in cols:
+        phase = df.iloc[:, cols.index('phase')].to_numpy(dtype=float)
+    if mag is None:
+        raise ValueError("CSV: could not find magnitude or real/imag columns. Inspect file.")
+    return {'metadata': meta, 'frequency': freq, 'magnitude_db': mag, 'phase_deg': phase}
+
+def _to_array(x):
+    if x is None:
+        return None
+    if isinstance(x, list):
+        return np.array([float(i) for i in x], dtype=float)
+    if isinstance(x, str):
+        return np.array([float(i) for i in x.strip().split()], dtype=float)
+    if isinstance(x, dict) and '#text' in x:
+        return np.array([float(i) for i in x['#text'].split()], dtype=float)
+    return np.array([float(v) for v in x.values()], dtype=float)
+
+def parse_xml(path):
+    import xmltodict
+    with open(path, 'r') as f:
+        doc = xmltodict.parse(f.read())
+
+    def find_key(d, candidates):
+        if not isinstance(d, dict):
+            return None
+        for k in d.keys():
+            if any(c.lower() in k.lower() for c in candidates):
+                return d[k]
+        for v in d.values():
+            if isinstance(v, dict):
+                res = find_key(v, candidates)
+                if res is not None:
+                    return res
+        return None
+
+    freq_node = find_key(doc, ['frequency', 'frequencies'])
+    mag_node = find_key(doc, ['magnitude', 'magnitudelist', 'mag'])
+    phase_node = find_key(doc, ['phase', 'phaselist'])
+    if freq_node is None or mag_node is None:
+        raise ValueError("XML: required nodes not found. Inspect schema.")
+    metadata = {}
+    for key in ['instrument', 'operator', 'date', 'tap', 'transformer']:
+        node = find_key(doc, [key])
+        if isinstance(node, str):
+            metadata[key] = node
+    return {'metadata': metadata, 'frequency': _to_array(freq_node), 'magnitude_db': _to_array(mag_node),
+            'phase_deg': _to_array(phase_node) if phase_node is not None else None}
+
+def parse_vendor_binary(path):
+    with open(path, 'rb') as f:
+        arr = np.frombuffer(f.read(), dtype=np.float32)
+    return {'metadata': {}, 'frequency': arr[::2], 'magnitude_db': arr[1::2], 'phase_deg': None}
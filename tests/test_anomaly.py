@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import export
+from anomaly import AnomalyScorer, calibrate, reconstruction_errors, save_thresholds, load_thresholds, thresholds_path
+from archive import FleetArchive
+from preprocessing import preprocess_batch, save_grid
+from tests.conftest import make_sweep
+
+class ScaleModel:
+    """Stand-in autoencoder: reconstructs its input scaled by `gain`."""
+
+    def __init__(self, gain=0.9):
+        self.gain = gain
+
+    def __call__(self, x, training=False):
+        return np.asarray(x) * self.gain
+
+def test_reconstruction_errors():
+    X = np.random.default_rng(0).normal(size=(10, 64)).astype(np.float32)
+    trace, bands = reconstruction_errors(ScaleModel(0.5), X, n_bands=4, batch_size=3)
+    np.testing.assert_allclose(trace, (0.25 * X ** 2).mean(axis=1), rtol=1e-5)
+    np.testing.assert_allclose(bands[:, 0], (0.25 * X[:, :16] ** 2).mean(axis=1), rtol=1e-5)
+    np.testing.assert_allclose(bands.mean(axis=1), trace, rtol=1e-5)
+
+def test_dict_output_model():
+    X = np.ones((2, 16), dtype=np.float32)
+    model = lambda x, training=False: {'class_out': np.zeros((len(x), 4)), 'recon_out': np.zeros_like(x)}
+    trace, _ = reconstruction_errors(model, X, n_bands=2)
+    np.testing.assert_allclose(trace, 1.0)
+
+def test_calibrate_and_round_trip(tmp_path):
+    X = np.random.default_rng(1).normal(size=(1000, 32)).astype(np.float32)
+    th = calibrate(ScaleModel(), X, quantile=0.95, n_bands=4)
+    trace, _ = reconstruction_errors(ScaleModel(), X, n_bands=4)
+    assert th['input_len'] == 32 and len(th['bands']) == 4
+    assert abs((trace > th['trace']).mean() - 0.05) < 0.01
+    model_path = str(tmp_path / 'ae.h5')
+    assert save_thresholds(th, model_path) == thresholds_path(model_path)
+    assert load_thresholds(model_path) == th
+
+def _scorer(tmp_path, monkeypatch, n_points=64, grid=(20.0, 2e6)):
+    model_path = str(tmp_path / 'ae.h5')
+    X = np.random.default_rng(2).normal(size=(200, n_points)).astype(np.float32)
+    save_thresholds(calibrate(ScaleModel(), X, n_bands=4), model_path)
+    if grid:
+        save_grid(model_path, *grid, n_points)
+    monkeypatch.setattr(export, 'load_runtime_model', lambda path: ScaleModel())
+    return AnomalyScorer(model_path)
+
+def _archive(path, n_points, fmin=20.0, fmax=2e6):
+    sweeps = [make_sweep(n=100, seed=i) for i in range(5)]
+    with FleetArchive(path) as ar:
+        ar.extend(sweeps, features=preprocess_batch(sweeps, n_points=n_points, fmin=fmin, fmax=fmax))
+    return FleetArchive(path, 'r')
+
+def test_scorer_rejects_other_input_lengths(tmp_path, monkeypatch):
+    scorer = _scorer(tmp_path, monkeypatch)
+    assert scorer.score(np.zeros((3, 64)))['score'].shape == (3,)
+    with pytest.raises(ValueError):
+        scorer.score(np.zeros((3, 128)))
+
+def test_score_archive_checks_the_grid(tmp_path, monkeypatch):
+    scorer = _scorer(tmp_path, monkeypatch)
+    with _archive(str(tmp_path / 'same.h5'), 64) as ar:
+        assert scorer.score_archive(ar)['score'].shape == (5,)
+    with _archive(str(tmp_path / 'range.h5'), 64, fmin=100.0) as ar:
+        with pytest.raises(ValueError, match='grid'):
+            scorer.score_archive(ar)
+    with _archive(str(tmp_path / 'points.h5'), 32) as ar:
+        with pytest.raises(ValueError):
+            scorer.score_archive(ar)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from archive import FleetArchive
+from preprocessing import preprocess_batch
+from tests.conftest import make_sweep
+
+def _sweeps(n):
+    out = []
+    for i in range(n):
+        s = make_sweep(n=50 + 10 * i, seed=i, phase=i % 2 == 0)
+        s['metadata'] = {'transformer': f'T{i % 3}', 'tap': str(i % 2), 'label': i}
+        out.append(s)
+    return out
+
+def test_round_trip(tmp_path):
+    sweeps = _sweeps(5)
+    with FleetArchive(str(tmp_path / 'a.h5')) as ar:
+        rows = ar.extend(sweeps, sources=[f's{i}' for i in range(5)])
+        assert rows.tolist() == [0, 1, 2, 3, 4]
+    with FleetArchive(str(tmp_path / 'a.h5'), 'r') as ar:
+        assert len(ar) == 5
+        for s, got in zip(sweeps, (ar[i] for i in range(5))):
+            np.testing.assert_array_equal(got['frequency'], s['frequency'])
+            np.testing.assert_array_equal(got['magnitude_db'], s['magnitude_db'])
+            if s['phase_deg'] is None:
+                assert got['phase_deg'] is None
+            else:
+                np.testing.assert_array_equal(got['phase_deg'], s['phase_deg'])
+            assert got['metadata'] == s['metadata']
+        assert ar[-1]['metadata']['label'] == 4
+        with pytest.raises(IndexError):
+            ar[5]
+
+def test_append_after_reopen(tmp_path):
+    path = str(tmp_path / 'a.h5')
+    sweeps = _sweeps(4)
+    with FleetArchive(path) as ar:
+        ar.extend(sweeps[:2])
+    with FleetArchive(path) as ar:
+        assert ar.append(sweeps[2]) == 2
+        ar.extend(sweeps[3:])
+        np.testing.assert_array_equal(ar[3]['magnitude_db'], sweeps[3]['magnitude_db'])
+
+def test_find(tmp_path):
+    with FleetArchive(str(tmp_path / 'a.h5')) as ar:
+        ar.extend(_sweeps(7), sources=[f's{i}' for i in range(7)])
+        assert ar.find(transformer='T1').tolist() == [1, 4]
+        assert ar.find(transformer='T0', tap='0').tolist() == [0, 6]
+        assert ar.find(transformer=['T1', 'T2'], block=2).tolist() == [1, 2, 4, 5]
+        assert ar.find(source='s3').tolist() == [3]
+        assert ar.find(transformer='nope').size == 0
+        with pytest.raises(KeyError):
+            ar.find(colour='red')
+
+def test_iter_rows_order_and_duplicates(tmp_path):
+    sweeps = _sweeps(6)
+    with FleetArchive(str(tmp_path / 'a.h5')) as ar:
+        ar.extend(sweeps)
+        rows = [4, 1, 4, 0, 5, 1]
+        got = list(ar.iter_rows(rows, block=4))
+        assert len(got) == len(rows)
+        for r, g in zip(rows, got):
+            np.testing.assert_array_equal(g['frequency'], sweeps[r]['frequency'])
+            assert g['metadata']['label'] == r
+        assert [g['metadata']['label'] for g in ar.iter_rows()] == list(range(6))
+
+def test_features(tmp_path):
+    sweeps = _sweeps(3)
+    feats = preprocess_batch(sweeps, n_points=64, fmin=20.0, fmax=2e6)
+    with FleetArchive(str(tmp_path / 'a.h5')) as ar:
+        ar.extend(sweeps, features=feats)
+        np.testing.assert_allclose(ar.features('magnitude_db'), feats['magnitude_db'], rtol=1e-6)
+        np.testing.assert_allclose(ar.feature_grid, feats['frequency'])
+        with pytest.raises(ValueError):
+            ar.extend(sweeps)
+        with pytest.raises(ValueError):
+            ar.extend(sweeps, features=preprocess_batch(sweeps, n_points=64, fmin=10.0, fmax=2e6))
+        assert len(ar) == 3
@@ -0,0 +1,13 @@
+import benchmark
+
+def test_missing_modules():
+    assert benchmark.missing_modules(['numpy', 'no_such_module_fra']) == ['no_such_module_fra']
+
+def test_report_stage_skipped_without_backends(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(benchmark, 'REPORT_DEPENDENCIES', ('numpy', 'no_such_module_fra'))
+    paths = benchmark.ensure_inputs(str(tmp_path), 'p100', 1, 100, ['bin'])
+    stages, skipped = benchmark.model_stages(paths, 1, 100)
+    assert 'analyze_fra_file' not in stages
+    assert skipped['analyze_fra_file'] == 'missing optional dependencies: no_such_module_fra'
+    assert 'predict' in skipped  # no model file in the working directory
@@ -0,0 +1,31 @@
+import numpy as np
+
+from archive import FleetArchive
+from dataset import class_index, open_source
+from inference import CLASS_LABELS
+from preprocessing import preprocess_batch
+from tests.conftest import make_sweep
+
+def _archive(path, labels):
+    sweeps = [make_sweep(n=100, seed=i) for i in range(len(labels))]
+    for s, label in zip(sweeps, labels):
+        s['metadata'] = {'label': label}
+    with FleetArchive(path) as ar:
+        ar.extend(sweeps, features=preprocess_batch(sweeps, n_points=64, fmin=20.0, fmax=2e6))
+    return path
+
+def test_class_index():
+    assert class_index(2, CLASS_LABELS) == 2 and class_index('3', CLASS_LABELS) == 3
+    assert class_index('Radial Deformation', CLASS_LABELS) == CLASS_LABELS.index('Radial Deformation')
+    assert class_index('class1', CLASS_LABELS) == -1
+
+def test_archive_labels_accept_class_names(tmp_path):
+    src = open_source(_archive(str(tmp_path / 'a.h5'), [0, 'Axial Displacement', '2', 'Core Grounding']))
+    assert src.has_labels and list(src.labels) == [0, 1, 2, 3] and src.n_classes() == 4
+
+def test_archive_with_diagnosis_strings_opens_unlabelled(tmp_path):
+    # the same metadata the similarity index reads its diagnoses from
+    src = open_source(_archive(str(tmp_path / 'a.h5'), ['class0', 'class1', 'Normal']))
+    assert list(src.labels) == [-1, -1, 0] and not src.has_labels
+    X, y = src.read(src.blocks()[0])
+    assert X.shape == (3, 64) and list(y) == [-1, -1, 0]
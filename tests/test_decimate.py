@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from decimate import decimate
+
+def _trace(n=1_000_000):
+    x = np.logspace(1, 6.3, n)
+    y = np.sin(np.log(x) * 7)
+    y[123_457] = 50.0    # narrow resonance peak
+    y[876_543] = -60.0   # narrow notch
+    return x, y
+
+def test_minmax_keeps_extremes():
+    x, y = _trace()
+    dx, dy = decimate(x, y, max_points=2000)
+    assert len(dx) <= 2002
+    assert dy.max() == 50.0 and dx[dy.argmax()] == x[123_457]
+    assert dy.min() == -60.0 and dx[dy.argmin()] == x[876_543]
+    assert dx[0] == x[0] and dx[-1] == x[-1]
+    assert np.all(np.diff(dx) > 0)
+
+def test_lttb_size_and_peak():
+    x = np.logspace(1, 6.3, 200_000)
+    y = np.zeros_like(x)
+    y[50_000] = 10.0
+    dx, dy = decimate(x, y, max_points=500, method='lttb')
+    assert len(dx) == 500 and dy.max() == 10.0
+
+def test_short_trace_unchanged_and_unsorted_input():
+    x = np.array([3.0, 1.0, 2.0]); y = np.array([30.0, 10.0, np.nan])
+    dx, dy = decimate(x, y)
+    assert dx.tolist() == [1.0, 3.0] and dy.tolist() == [10.0, 30.0]
+    with pytest.raises(ValueError):
+        decimate(x, y, method='nope')
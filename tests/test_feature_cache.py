@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from feature_cache import FeatureCache, feature_key, features_from_bytes
+from inference import prepare_features
+from parse_csv import parse_csv
+from tests.conftest import write_csv
+
+def _entries(root):
+    return sorted(os.path.join(d, f) for d, _, fs in os.walk(root) for f in fs if not f.startswith('.'))
+
+def test_features_match_inference(tmp_path, sweep):
+    path = write_csv(tmp_path / 'x.csv', [sweep])
+    data = open(path, 'rb').read()
+    calls = []
+
+    def parse(buf):
+        calls.append(1)
+        return parse_csv(buf)
+    cache = FeatureCache(str(tmp_path / 'fc'))
+    a = features_from_bytes(data, parse, n_points=128, cache=cache)
+    b = features_from_bytes(data, parse, n_points=128, cache=cache)
+    assert len(calls) == 1 and a.dtype == np.float32 and a.shape == (1, 128)
+    np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(a[0], prepare_features(sweep['frequency'], sweep['magnitude_db'], n_points=128))
+    features_from_bytes(data, parse, n_points=64, cache=cache)
+    assert len(calls) == 2
+
+def test_keys_cover_parameters():
+    keys = {feature_key('d', 1024), feature_key('d', 512), feature_key('d', 1024, 20.0, 2e6),
+            feature_key('d', 1024, denoise_method=None), feature_key('e', 1024)}
+    assert len(keys) == 5
+
+def test_lru_eviction(tmp_path):
+    entry = 4096 + 128  # float32 payload plus the .npy header
+    cache = FeatureCache(str(tmp_path), max_bytes=3 * entry)
+    keys = [feature_key(str(i)) for i in range(3)]
+    for t, k in enumerate(keys):
+        cache.put(k, np.zeros(1024))
+        os.utime(cache._path(k), (t, t))
+    assert cache.get(keys[0]) is not None  # refreshes its mtime
+    cache.put(feature_key('3'), np.zeros(1024))
+    cache.evict()
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(feature_key('3')) is not None
+
+def _hammer(args):
+    root, seed = args
+    cache = FeatureCache(root, max_bytes=64 * 4096)
+    rng = np.random.default_rng(seed)
+    bad = 0
+    for _ in range(200):
+        v = int(rng.integers(0, 100))
+        arr = cache.get_or_compute(feature_key(str(v)), lambda: np.full(1024, v, dtype=np.float32))
+        bad += int(arr.shape != (1024,) or not (arr == v).all())
+    return bad
+
+def test_concurrent_processes(tmp_path):
+    root = str(tmp_path / 'fc')
+    with ProcessPoolExecutor(4) as pool:
+        assert sum(pool.map(_hammer, [(root, s) for s in range(4)])) == 0
+    entries = _entries(root)
+    assert not [e for e in entries if e.endswith('.tmp')]
+    # each process writes up to max_bytes/16 between scans, and skips a scan another one is running
+    entry = 4096 + 128
+    assert sum(os.path.getsize(e) for e in entries) <= 64 * entry * (1 + 4 / 16)
+    FeatureCache(root, max_bytes=64 * 4096).evict()
+    assert sum(os.path.getsize(e) for e in _entries(root)) <= 64 * 4096
+
+def test_file_and_sweep_callers_do_not_share_entries(tmp_path):
+    from dataset import FileSource
+    from feature_cache import features_for_file
+    from tests.conftest import make_sweep
+    path = write_csv(tmp_path / 'multi.csv', [make_sweep(n=100, seed=i) for i in range(5)])
+    data = open(path, 'rb').read()
+    for order in ('server_first', 'training_first'):
+        cache = FeatureCache(str(tmp_path / order))
+        calls = [lambda: features_from_bytes(data, parse_csv, n_points=128, cache=cache),
+                 lambda: features_for_file(path, n_points=128, cache=cache)]
+        if order == 'training_first':
+            calls.reverse()
+        for call in calls:
+            call()
+        assert features_from_bytes(data, parse_csv, n_points=128, cache=cache).shape == (1, 128)
+        assert features_for_file(path, n_points=128, cache=cache).shape == (5, 128)
+        assert FileSource([path], labels=[2], n_points=128, cache=cache).length == 5
+
+def test_default_location_is_created_on_first_write(tmp_path):
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, HOME=str(tmp_path / 'home'), XDG_CACHE_HOME='', FRA_FEATURE_CACHE='',
+               PYTHONPATH=repo)
+    code = ("import inference, feature_cache; c = feature_cache.default_cache(); "
+            "print(c.root); assert not __import__('os').path.exists(c.root); "
+            "c.put('ab' * 16, [1.0]); assert c.get('ab' * 16) is not None")
+    out = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == str(tmp_path / 'home' / '.cache' / 'fra' / 'features')
+    assert sorted(os.listdir(tmp_path)) == ['home']
+
+def test_default_cache_takes_a_root(tmp_path):
+    from feature_cache import default_cache
+    root = str(tmp_path / 'elsewhere')
+    assert default_cache(root).root == root
+    assert default_cache(root) is default_cache(root)
+    assert default_cache('off') is None
+    assert not os.path.exists(root)
+
+def test_repeated_last_frequency_matches_inference(tmp_path):
+    data = b'Frequency (Hz),Magnitude (dB)\n10,1\n100,2\n1000,3\n1000,3.5\n'
+    cached = features_from_bytes(data, parse_csv, n_points=8, cache=FeatureCache(str(tmp_path)))
+    assert np.isfinite(cached).all()
+    np.testing.assert_allclose(cached[0], prepare_features([10, 100, 1000, 1000], [1, 2, 3, 3.5], n_points=8),
+                               atol=1e-6)
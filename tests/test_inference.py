@@ -0,0 +1,41 @@
+import numpy as np
+
+from archive import FleetArchive
+from dataset import ArchiveSource, ShardSource
+from inference import CLASS_LABELS, RECOMMENDATIONS, model_grid, prepare_features, recommendation_for
+from preprocessing import preprocess_batch, save_grid, load_grid
+from synthetic_data import create_shards
+from tests.conftest import make_sweep
+
+def test_grid_round_trip(tmp_path):
+    model = str(tmp_path / 'clf.h5')
+    assert load_grid(model) is None and model_grid(model) == (None, None)
+    save_grid(model, 20, 2e6, 128)
+    assert load_grid(model) == {'fmin': 20.0, 'fmax': 2e6, 'n_points': 128}
+    assert model_grid(model) == (20.0, 2e6)
+
+def test_serving_features_match_archive_training_features(tmp_path):
+    sweeps = [make_sweep(fmin=5.0, fmax=5e6, seed=i) for i in range(3)]
+    path = str(tmp_path / 'a.h5')
+    with FleetArchive(path) as ar:
+        ar.extend(sweeps, features=preprocess_batch(sweeps, n_points=128, fmin=20.0, fmax=2e6))
+    src = ArchiveSource(path, label_key=None)
+    assert src.grid == (20.0, 2e6)
+    train_rows = src.read(src.blocks()[0])[0]
+    for s, row in zip(sweeps, train_rows):
+        x = prepare_features(s['frequency'], s['magnitude_db'], n_points=128, fmin=src.grid[0], fmax=src.grid[1])
+        np.testing.assert_allclose(x, row, atol=1e-5)
+    # the per-upload range gives a differently aligned vector
+    assert not np.allclose(prepare_features(sweeps[0]['frequency'], sweeps[0]['magnitude_db'], n_points=128),
+                           train_rows[0], atol=1e-3)
+
+def test_shard_source_grid(tmp_path):
+    create_shards(100, out_dir=str(tmp_path), shard_size=50, n_points=64, workers=1)
+    src = ShardSource(str(tmp_path))
+    freq = np.load(str(tmp_path / 'frequency.npy'))
+    assert src.grid == (1.0, 1e4) and np.allclose(src.grid, (freq[0], freq[-1])) and src.length == 100
+
+def test_every_model_label_has_a_recommendation():
+    assert all(label in RECOMMENDATIONS for label in CLASS_LABELS)
+    assert recommendation_for('Axial Displacement') == RECOMMENDATIONS['Axial Displacement']
+    assert 'baseline' in recommendation_for('Class 7')
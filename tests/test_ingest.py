@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+
+from archive import FleetArchive
+from ingest import ingest, sniff_format
+from tests.conftest import make_sweep, write_csv
+
+def _tree(root):
+    (root / 'a').mkdir()
+    write_csv(root / 'a' / 'two.csv', [make_sweep(seed=1), make_sweep(seed=2)], sweep_column='sweep')
+    s = make_sweep(seed=3)
+    np.stack([s['frequency'], s['magnitude_db']], axis=1).astype('<f4').tofile(root / 'a' / 'one.bin')
+    (root / 'b.xml').write_text('<FRA><Frequency>10 100 1000</Frequency><Magnitude>-1 -2 -3</Magnitude></FRA>')
+    (root / 'broken.xml').write_text('<FRA><Frequency>10 100</Frequency></FRA>')
+
+def test_sniff_format(tmp_path):
+    (tmp_path / 'x').write_text('<?xml version="1.0"?><a/>')
+    (tmp_path / 'y').write_text('f,m\n1,2\n')
+    (tmp_path / 'z').write_bytes(np.arange(8, dtype='<f4').tobytes())
+    assert [sniff_format(str(tmp_path / n)) for n in 'xyz'] == ['xml', 'csv', 'binary']
+
+def test_ingest_and_resume(tmp_path):
+    root = tmp_path / 'data'
+    root.mkdir()
+    _tree(root)
+    archive = str(tmp_path / 'fleet.h5')
+    stats = ingest(str(root), archive, workers=2, n_points=64, progress_every=0)
+    assert (stats['files'], stats['sweeps'], stats['errors']) == (4, 4, 1)
+    with open(archive + '.errors.jsonl') as f:
+        errors = [json.loads(line) for line in f]
+    assert [e['path'].endswith('broken.xml') for e in errors] == [True]
+    with FleetArchive(archive, 'r') as ar:
+        assert len(ar) == 4
+        assert ar.features('magnitude_db').shape == (4, 64)
+        assert not np.isnan(ar.features('magnitude_db')).any()
+        assert len(set(ar.index('source'))) == 3
+
+    # a re-run only picks up new files
+    write_csv(root / 'new.csv', [make_sweep(seed=4)])
+    stats = ingest(str(root), archive, workers=2, n_points=64, progress_every=0)
+    assert (stats['files'], stats['skipped'], stats['sweeps']) == (1, 4, 1)
+    with FleetArchive(archive, 'r') as ar:
+        assert len(ar) == 5
+
+def test_degenerate_sweeps_are_file_errors(tmp_path):
+    root = tmp_path / 'data'
+    root.mkdir()
+    desc = make_sweep(seed=5)
+    write_csv(root / 'descending.csv', [{k: (v[::-1] if isinstance(v, np.ndarray) else v) for k, v in desc.items()}])
+    (root / 'one_point.csv').write_text('Frequency (Hz),Magnitude (dB)\n100,-3\n')
+    bad = make_sweep(seed=6)
+    bad['magnitude_db'][::3] = np.nan
+    write_csv(root / 'nan.csv', [bad])
+    (root / 'flat.csv').write_text('Frequency (Hz),Magnitude (dB)\n100,-3\n100,-4\n100,-5\n')
+    archive = str(tmp_path / 'fleet.h5')
+    stats = ingest(str(root), archive, workers=2, n_points=64, progress_every=0)
+    assert (stats['sweeps'], stats['errors']) == (1, 3)
+    with open(archive + '.errors.jsonl') as f:
+        failed = sorted(json.loads(line)['path'].rsplit('/', 1)[1] for line in f)
+    assert failed == ['flat.csv', 'nan.csv', 'one_point.csv']
+    with FleetArchive(archive, 'r') as ar:
+        assert len(ar) == 1 and np.isfinite(ar.features('magnitude_db')).all()
+        assert ar.index('source')[0].endswith('descending.csv')
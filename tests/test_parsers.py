@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from parse_csv import parse_csv, iter_csv_sweeps
+from parse_xml import parse_xml
+from parse_vendor_binary import parse_vendor_binary, iter_vendor_binary
+from tests import legacy
+from tests.conftest import make_sweep, write_csv
+
+def assert_same(a, b):
+    assert a['metadata'] == b['metadata']
+    for ch in ('frequency', 'magnitude_db', 'phase_deg'):
+        if b[ch] is None:
+            assert a[ch] is None
+        else:
+            np.testing.assert_array_equal(np.asarray(a[ch], dtype=float), b[ch])
+
+@pytest.mark.parametrize('columns', [
+    {'frequency': 'f', 'magnitude': 'm', 'phase': 'p'},
+    {'Frequency': 'f', 'mag_db': 'm'},
+    {'Freq_Hz': 'f', 'real': 're', 'imag': 'im'},
+    {'frequency': 'f', 'magnitude': 'm', 'Transformer_ID': 'meta', 'tap': 'meta'},
+])
+def test_csv_matches_legacy(tmp_path, columns):
+    rng = np.random.default_rng(1)
+    values = {'f': np.logspace(1, 6, 200), 'm': rng.normal(size=200), 'p': rng.normal(size=200),
+              're': rng.normal(size=200), 'im': rng.normal(size=200), 'meta': ['T-7'] * 200}
+    path = tmp_path / 'x.csv'
+    pd.DataFrame({name: values[v] for name, v in columns.items()}).to_csv(path, index=False)
+    assert_same(parse_csv(str(path)), legacy.parse_csv(str(path)))
+
+def test_csv_unit_suffixes(tmp_path, sweep):
+    parsed = parse_csv(write_csv(tmp_path / 'x.csv', [sweep]))
+    np.testing.assert_allclose(parsed['magnitude_db'], sweep['magnitude_db'])
+    np.testing.assert_allclose(parsed['phase_deg'], sweep['phase_deg'])
+
+@pytest.mark.parametrize('chunksize', [7, 100_000])
+def test_iter_csv_sweeps_by_column(tmp_path, chunksize):
+    sweeps = [make_sweep(n=n, seed=n) for n in (40, 25, 60)]
+    path = write_csv(tmp_path / 'x.csv', sweeps, sweep_column='sweep', transformer='T1')
+    got = list(iter_csv_sweeps(path, chunksize=chunksize))
+    assert len(got) == 3
+    for g, s in zip(got, sweeps):
+        np.testing.assert_allclose(g['frequency'], s['frequency'])
+        np.testing.assert_allclose(g['magnitude_db'], s['magnitude_db'])
+        assert g['metadata'] == {'transformer': 'T1'}
+
+@pytest.mark.parametrize('chunksize', [7, 100_000])
+def test_iter_csv_sweeps_by_frequency_reset(tmp_path, chunksize):
+    sweeps = [make_sweep(n=n, seed=n) for n in (40, 25, 60)]
+    got = list(iter_csv_sweeps(write_csv(tmp_path / 'x.csv', sweeps), chunksize=chunksize))
+    assert [len(g['frequency']) for g in got] == [40, 25, 60]
+
+XML_DOCS = [
+    """<FRA><Frequencies>10 100 1000 10000</Frequencies><Magnitude>-1 -2.5 -3 -4</Magnitude>
+       <Phase>1 2 3 4</Phase></FRA>""",
+    """<Test><Header><Operator>ann</Operator><Date>2024-01-02</Date><Tap>5</Tap></Header>
+       <Data><Frequency unit="Hz">1e1 1e2 1e3</Frequency><MagnitudeList>-1 -2 -3</MagnitudeList></Data></Test>""",
+    """<r><sweep><frequency><v>1</v><w>2</w><x>3</x></frequency><mag><v>4</v><w>5</w><x>6</x></mag></sweep></r>""",
+]
+
+@pytest.mark.parametrize('doc', XML_DOCS)
+def test_xml_matches_legacy(tmp_path, doc):
+    pytest.importorskip('xmltodict')
+    path = tmp_path / 'x.xml'
+    path.write_text(doc)
+    assert_same(parse_xml(str(path)), legacy.parse_xml(str(path)))
+
+def test_xml_missing_nodes(tmp_path):
+    path = tmp_path / 'x.xml'
+    path.write_text('<FRA><Frequency>1 2</Frequency></FRA>')
+    with pytest.raises(ValueError):
+        parse_xml(str(path))
+
+def test_binary_matches_legacy(tmp_path):
+    path = tmp_path / 'x.bin'
+    s = make_sweep(n=300)
+    np.stack([s['frequency'], s['magnitude_db']], axis=1).astype('<f4').tofile(path)
+    assert_same(parse_vendor_binary(str(path)), legacy.parse_vendor_binary(str(path)))
+    assert len(list(iter_vendor_binary(str(path)))) == 1
+
+def test_binary_f64_complex(tmp_path):
+    path = tmp_path / 'x.bin'
+    f = np.logspace(1, 6, 20)
+    z = np.exp(1j * np.linspace(0, 1, 20)) * np.linspace(1, 2, 20)
+    rec = np.empty(20, dtype=[('frequency', '<f8'), ('response', '<c16')])
+    rec['frequency'], rec['response'] = f, z
+    np.concatenate([rec, rec]).tofile(path)
+    from parse_vendor_binary import register_schema
+    register_schema('test_c16_x20', [('frequency', 'f8'), ('response', 'c16')], points=20)
+    got = list(iter_vendor_binary(str(path), 'test_c16_x20'))
+    assert len(got) == 2
+    np.testing.assert_allclose(got[1]['magnitude_db'], 20 * np.log10(np.abs(z) + 1e-12))
+    np.testing.assert_allclose(got[1]['phase_deg'], np.angle(z, deg=True))
+
+def _reversed(s):
+    return {k: (v[::-1] if isinstance(v, np.ndarray) else v) for k, v in s.items()}
+
+@pytest.mark.parametrize('chunksize', [1, 7, 100_000])
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('lengths', [(500,), (40, 25, 60)])
+def test_iter_csv_sweeps_direction(tmp_path, chunksize, descending, lengths):
+    sweeps = [make_sweep(n=n, seed=n) for n in lengths]
+    if descending:
+        sweeps = [_reversed(s) for s in sweeps]
+    got = list(iter_csv_sweeps(write_csv(tmp_path / 'x.csv', sweeps), chunksize=chunksize))
+    assert [len(g['frequency']) for g in got] == list(lengths)
+    for g, s in zip(got, sweeps):
+        np.testing.assert_allclose(g['frequency'], s['frequency'])
+        np.testing.assert_allclose(g['magnitude_db'], s['magnitude_db'])
+
+def test_iter_csv_sweeps_repeated_frequencies(tmp_path):
+    s = make_sweep(n=30)
+    s = {k: (np.repeat(v, 2) if isinstance(v, np.ndarray) else v) for k, v in s.items()}
+    for sweep in (s, _reversed(s)):
+        assert len(list(iter_csv_sweeps(write_csv(tmp_path / 'x.csv', [sweep, sweep]), chunksize=3))) == 2
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from preprocessing import resample_to_log_grid, denoise, normalize, resample_batch, preprocess_batch
+from tests.conftest import make_sweep
+
+def test_resample_batch_matches_per_trace():
+    sweeps = [make_sweep(n=n, seed=n) for n in (100, 300, 300, 57)]
+    sweeps[2]['frequency'] = sweeps[1]['frequency']  # shared axis, one plan
+    res = resample_batch(sweeps, n_points=128)
+    for i, s in enumerate(sweeps):
+        grid, mag = resample_to_log_grid(s['frequency'], s['magnitude_db'], n_points=128)
+        np.testing.assert_allclose(res['frequency'][i], grid)
+        np.testing.assert_allclose(res['magnitude_db'][i], mag, atol=1e-9)
+
+def test_shared_grid_and_missing_phase():
+    sweeps = [make_sweep(seed=1), make_sweep(seed=2, phase=False)]
+    res = resample_batch(sweeps, n_points=64, fmin=100.0, fmax=1e6)
+    assert res['frequency'].shape == (64,)
+    assert np.isnan(res['phase_deg'][1]).all() and not np.isnan(res['phase_deg'][0]).any()
+
+def test_preprocess_batch_matches_per_trace():
+    sweeps = [make_sweep(seed=i) for i in range(3)]
+    res = preprocess_batch(sweeps, n_points=256)
+    for i, s in enumerate(sweeps):
+        _, mag = resample_to_log_grid(s['frequency'], s['magnitude_db'], n_points=256)
+        np.testing.assert_allclose(res['magnitude_db'][i], normalize(denoise(mag)), atol=1e-9)
+
+@pytest.mark.parametrize('freq, mag', [([100.0], [1.0]), ([], []), ([1.0, 2.0, 3.0], [1.0, 2.0])])
+def test_bad_traces_raise_in_both_paths(freq, mag):
+    with pytest.raises(ValueError):
+        resample_to_log_grid(freq, mag, n_points=16)
+    with pytest.raises(ValueError):
+        resample_batch([make_sweep(), (freq, mag)], n_points=16)
+    with pytest.raises(ValueError):
+        preprocess_batch([(freq, mag)], n_points=16)
+
+@pytest.mark.parametrize('freq', [[10.0, 100.0, 1000.0, 1000.0], [10.0, 100.0, 100.0, 1000.0],
+                                  [1000.0, 10.0, 1000.0, 100.0]])
+def test_repeated_frequencies_match_per_trace(freq):
+    mag = [1.0, 2.0, 3.0, 3.5]
+    grid, ref = resample_to_log_grid(freq, mag, n_points=8)
+    res = resample_batch([(freq, mag)], n_points=8)
+    assert np.isfinite(ref).all()
+    np.testing.assert_allclose(res['magnitude_db'][0], ref, atol=1e-9)
+    feats = preprocess_batch([(freq, mag)], n_points=8)['magnitude_db'][0]
+    np.testing.assert_allclose(feats, normalize(denoise(ref)), atol=1e-9)
+
+def test_repeated_outer_frequency_holds_its_value():
+    # interp1d divides by zero on these zero-width end segments
+    res = resample_batch([([10.0, 10.0, 100.0], [1.0, 2.0, 4.0]), ([10.0, 100.0, 100.0], [1.0, 2.0, 4.0])],
+                         n_points=4, fmin=10.0, fmax=1000.0)
+    assert res['magnitude_db'][0, 0] == 1.0 and res['magnitude_db'][1, -1] == 2.0
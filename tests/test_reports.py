@@ -0,0 +1,54 @@
+import os
+
+from reports import ReportCache
+
+KEYS = ['%032x' % i for i in range(1, 4)]
+
+def _put(cache, key, size=1000):
+    staging = cache.staging_dir()
+    for name in ('report.html', 'report.pdf'):
+        with open(os.path.join(staging, name), 'wb') as f:
+            f.write(b'x' * size)
+    cache.put(key, staging, {'html_report': os.path.join(staging, 'report.html'),
+                             'pdf_report': os.path.join(staging, 'report.pdf'), 'fault_type': 'Normal'})
+
+def _age(cache, key, t):
+    os.utime(cache._manifest(key), (t, t))
+
+def test_put_get(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    assert cache.get(KEYS[0]) is None
+    _put(cache, KEYS[0])
+    got = cache.get(KEYS[0])
+    assert got['fault_type'] == 'Normal'
+    assert os.path.isfile(got['html_report']) and os.path.isfile(got['pdf_report'])
+    assert cache.get('../etc') is None
+    assert not [n for n in os.listdir(tmp_path) if n.startswith('.tmp-')]
+
+def test_second_publish_of_same_key_is_dropped(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    _put(cache, KEYS[0])
+    _put(cache, KEYS[0], size=5)
+    assert os.path.getsize(cache.get(KEYS[0])['pdf_report']) == 1000
+    assert sorted(os.listdir(tmp_path)) == [KEYS[0]]
+
+def test_lru_eviction(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=5000)
+    _put(cache, KEYS[0]); _age(cache, KEYS[0], 1000)
+    _put(cache, KEYS[1]); _age(cache, KEYS[1], 2000)
+    assert cache.get(KEYS[0]) is not None  # now the most recently used
+    _put(cache, KEYS[2])
+    assert cache.get(KEYS[1]) is None
+    assert cache.get(KEYS[0]) is not None and cache.get(KEYS[2]) is not None
+
+def test_model_version_ignores_an_export_older_than_the_model(tmp_path):
+    from export import runtime_path
+    from reports import model_version
+    h5, lite = tmp_path / 'clf.h5', tmp_path / 'clf.tflite'
+    h5.write_bytes(b'keras')
+    lite.write_bytes(b'lite')
+    os.utime(h5, (100, 100))
+    os.utime(lite, (200, 200))
+    assert runtime_path(str(h5)) == str(lite) and model_version(str(h5)).startswith('clf.tflite')
+    os.utime(h5, (300, 300))  # retrained after the export
+    assert runtime_path(str(h5)) == str(h5) and model_version(str(h5)).startswith('clf.h5')
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('httpx')
+from fastapi.testclient import TestClient
+
+import server
+from archive import FleetArchive
+from preprocessing import preprocess_batch
+from similarity import index_archive
+from tests.conftest import make_sweep, write_csv
+
+class StubModel:
+    """Stands in for the Keras classifier: uniform probabilities over 4 classes."""
+    input_shape = (None, 128, 1)
+
+    def __call__(self, X, training=False):
+        return np.full((len(X), 4), 0.25, dtype=np.float32)
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # archive rows live on the fixed ingest grid; uploads cover a wider range
+    sweeps = [make_sweep(n=300, fmin=5.0, fmax=5e6, seed=i) for i in range(60)]
+    for i, s in enumerate(sweeps):
+        s['metadata'] = {'label': f'class{i % 3}'}
+    with FleetArchive('fleet.h5') as ar:
+        ar.extend(sweeps, features=preprocess_batch(sweeps, n_points=128, fmin=20.0, fmax=2e6))
+        index_archive(ar, dim=16, n_lists=4).save('fleet.sim')
+    monkeypatch.setattr(server, 'load_classifier', lambda path: StubModel())
+    monkeypatch.setattr(server, 'SIMILARITY_INDEX', 'fleet.sim')
+    with TestClient(server.app) as c:
+        yield c, sweeps
+
+def test_neighbours_use_the_index_grid(client):
+    c, sweeps = client
+    with open(write_csv('upload.csv', [sweeps[7]]), 'rb') as f:
+        res = c.post('/predict', files={'file': ('upload.csv', f, 'text/csv')}).json()
+    nearest = res['result']['neighbors'][0]
+    assert nearest['id'] == 7 and nearest['label'] == 'class1'
+    assert nearest['distance'] < 1e-3
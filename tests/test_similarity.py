@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+
+from similarity import SimilarityIndex
+
+def _data(n=2000, L=128, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, L)).astype(np.float32), [f'c{i % 4}' for i in range(n)]
+
+def test_self_search():
+    X, labels = _data()
+    idx = SimilarityIndex.build(X, labels=labels, ids=np.arange(100, 2100), dim=128, n_lists=16, nprobe=16)
+    ids, dist, got = idx.search(X[:20], k=3)
+    assert ids[:, 0].tolist() == list(range(100, 120))
+    np.testing.assert_allclose(dist[:, 0], 0, atol=1e-3)
+    assert [g[0] for g in got] == labels[:20]
+
+def test_fewer_candidates_than_k():
+    X, _ = _data(n=5)
+    ids, dist, labels = SimilarityIndex.build(X, dim=4, n_lists=1).search(X[:1], k=8)
+    assert (ids[0, 5:] == -1).all() and np.isinf(dist[0, 5:]).all() and labels[0][5:] == [None] * 3
+
+def test_save_load_incremental_and_compact(tmp_path):
+    X, labels = _data()
+    path = str(tmp_path / 'idx')
+    idx = SimilarityIndex.build(X[:1500], labels=labels[:1500], dim=32, n_lists=8)
+    idx.save(path)
+    idx.add(X[1500:], labels=labels[1500:], ids=np.arange(1500, 2000))
+    idx.save(path)
+    assert sorted(f for f in os.listdir(path) if f.startswith('seg-')) == ['seg-00000.npz', 'seg-00001.npz']
+    loaded = SimilarityIndex.load(path)
+    assert len(loaded) == 2000
+    for a, b in zip(idx.search(X[1990:], k=5), loaded.search(X[1990:], k=5)):
+        np.testing.assert_array_equal(np.asarray(a), np.asarray(b))
+    loaded.compact(path)
+    again = SimilarityIndex.load(path)
+    assert len(again) == 2000 and again.search(X[1999], k=1)[0][0, 0] == 1999
+
+def test_archive_index_records_grid(tmp_path):
+    from archive import FleetArchive
+    from preprocessing import preprocess_batch
+    from similarity import index_archive
+    from tests.conftest import make_sweep
+    sweeps = [make_sweep(n=200, seed=i) for i in range(40)]
+    with FleetArchive(str(tmp_path / 'a.h5')) as ar:
+        ar.extend(sweeps, features=preprocess_batch(sweeps, n_points=64, fmin=20.0, fmax=2e6))
+        idx = index_archive(ar, dim=8, n_lists=2)
+    assert idx.grid == {'fmin': 20.0, 'fmax': 2e6, 'n_points': 64}
+    idx.save(str(tmp_path / 'idx'))
+    assert SimilarityIndex.load(str(tmp_path / 'idx')).grid == idx.grid
+
+def test_save_to_another_directory(tmp_path):
+    X, labels = _data()
+    a, b, c = (str(tmp_path / n) for n in 'abc')
+    idx = SimilarityIndex.build(X[:1000], labels=labels[:1000], dim=32, n_lists=8)
+    idx.save(a)
+    moved = SimilarityIndex.load(a)
+    moved.add(X[1000:], labels=labels[1000:], ids=np.arange(1000, 2000))
+    moved.save(b)
+    for path, n in ((a, 1000), (b, 2000)):
+        loaded = SimilarityIndex.load(path)
+        assert len(loaded) == n
+        assert loaded.search(X[n - 1], k=1)[0][0, 0] == n - 1
+    # compacting into a new directory leaves the source directory intact
+    SimilarityIndex.load(b).compact(c)
+    assert len(SimilarityIndex.load(c)) == 2000 and len(SimilarityIndex.load(b)) == 2000
@@ -1,39 +1,139 @@
 # train.py
 import numpy as np
-from sklearn.model_selection import train_test_split
-from tensorflow.keras.utils import to_categorical
 from classifier import build_1d_cnn
 from autoencoder import build_autoencoder
-import joblib
+from anomaly import calibrate, save_thresholds
+from dataset import open_source, make_dataset, sample
+from multitask import build_multitask, reconstruction_model
+from preprocessing import grid_path, save_grid
+from synthetic_data import SHARDS_DIR
 import os
 
-def train_classifier(X, y, model_path='fra_classifier.h5', epochs=20, batch_size=32):
+def _record_grid(model_path, grid, input_len):
+    """
+    Save the (fmin, fmax) grid the features were resampled onto, so serving resamples uploads the
+    same way; without one, a stale grid file is removed and each upload keeps its own range.
+    """
+    if grid is not None:
+        save_grid(model_path, grid[0], grid[1], input_len)
+    elif os.path.exists(grid_path(model_path)):
+        os.remove(grid_path(model_path))
+
+def train_classifier(X=None, y=None, model_path='fra_classifier.h5', epochs=20, batch_size=32,
+                     source=None, val_source=None, n_classes=None, augment=True, cache=None, grid=None):
     """
     X: (N, L) float array, y: integer labels (N,)
+    or source: shard directory/glob, FleetArchive or dataset.FileSource (raw files via the feature
+    cache) streamed through dataset.make_dataset (val_source optional, same kinds).
+    grid: (fmin, fmax) of the log grid X was resampled onto; defaults to the source's grid.
+    It is saved next to the model (<model>.grid.json) and used by inference.prepare_features.
     """
-    X = X[..., None]
-    y_cat = to_categorical(y, num_classes=np.max(y)+1)
-    X_train, X_val, y_train, y_val = train_test_split(X, y_cat, test_size=0.2, random_state=42)
-    model = build_1d_cnn(input_len=X.shape[1], n_classes=y_cat.shape[1])
-    model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=epochs, batch_size=batch_size)
+    if source is None:
+        from sklearn.model_selection import train_test_split
+        from tensorflow.keras.utils import to_categorical
+        X = X[..., None]
+        y_cat = to_categorical(y, num_classes=np.max(y)+1)
+        X_train, X_val, y_train, y_val = train_test_split(X, y_cat, test_size=0.2, random_state=42)
+        model = build_1d_cnn(input_len=X.shape[1], n_classes=y_cat.shape[1])
+        model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=epochs, batch_size=batch_size)
+    else:
+        src = open_source(source)
+        if not src.has_labels:
+            raise ValueError("Classifier training needs a labelled source")
+        n_classes = n_classes or src.n_classes()
+        train_ds = make_dataset(src, batch_size, n_classes=n_classes, augment=augment, cache=cache)
+        val_ds = None
+        if val_source is not None:
+            val_ds = make_dataset(val_source, batch_size, n_classes=n_classes, shuffle=False)
+        model = build_1d_cnn(input_len=src.input_len, n_classes=n_classes)
+        model.fit(train_ds, validation_data=val_ds, epochs=epochs)
+        grid = grid or src.grid
     model.save(model_path)
+    _record_grid(model_path, grid, model.input_shape[1])
     print("Saved classifier to", model_path)
     return model
 
-def train_autoencoder(X_normal, model_path='fra_autoencoder.h5', epochs=50, batch_size=32):
+def train_autoencoder(X_normal=None, model_path='fra_autoencoder.h5', epochs=50, batch_size=32, quantile=0.99,
+                      source=None, healthy_label=0, augment=False, cache=None, n_calibration=20000, grid=None):
     """
     X_normal: (N_normal, L) only healthy signatures
+    or source: streamed as in train_classifier; labelled sources are filtered to healthy_label.
+    Also calibrates anomaly thresholds on the healthy data (up to n_calibration streamed rows)
+    and saves them next to the model; grid as in train_classifier.
     """
-    Xn = X_normal[..., None]
-    ae = build_autoencoder(input_len=Xn.shape[1])
-    ae.fit(Xn, Xn, epochs=epochs, batch_size=batch_size, validation_split=0.1)
+    if source is None:
+        Xn = X_normal[..., None]
+        ae = build_autoencoder(input_len=Xn.shape[1])
+        ae.fit(Xn, Xn, epochs=epochs, batch_size=batch_size, validation_split=0.1)
+        X_calib = X_normal
+    else:
+        src = open_source(source)
+        only = healthy_label if src.has_labels else None
+        ae = build_autoencoder(input_len=src.input_len)
+        ae.fit(make_dataset(src, batch_size, autoencoder=True, only_label=only, augment=augment, cache=cache),
+               epochs=epochs)
+        X_calib = sample(src, n_calibration, only_label=only)
+        grid = grid or src.grid
     ae.save(model_path)
+    _record_grid(model_path, grid, ae.input_shape[1])
     print("Saved autoencoder to", model_path)
+    th_path = save_thresholds(calibrate(ae, X_calib, quantile=quantile), model_path)
+    print("Saved anomaly thresholds to", th_path)
     return ae
 
+def train_multitask(X=None, y=None, model_path='fra_multitask.h5', epochs=30, batch_size=32, source=None,
+                    val_source=None, n_classes=None, healthy_label=0, recon_weight=1.0, augment=True,
+                    cache=None, quantile=0.99, n_calibration=20000, grid=None):
+    """
+    Joint training of the shared-encoder model (multitask.build_multitask).
+    Classification uses every sample; the reconstruction loss is weighted to healthy_label samples only,
+    so reconstruction error stays an anomaly score. Thresholds are calibrated on healthy samples and
+    saved next to the model as for train_autoencoder; grid as in train_classifier.
+    """
+    import tensorflow as tf
+    if source is None:
+        from sklearn.model_selection import train_test_split
+        from tensorflow.keras.utils import to_categorical
+        y_cat = to_categorical(y, num_classes=np.max(y)+1)
+        X_train, X_val, y_train, y_val = train_test_split(X, y_cat, test_size=0.2, random_state=42)
+        targets = lambda X_, y_: ({'class_out': y_, 'recon_out': X_[..., None]},
+                                  {'class_out': np.ones(len(X_)), 'recon_out': (y_.argmax(axis=1) == healthy_label).astype(float)})
+        model = build_multitask(input_len=X.shape[1], n_classes=y_cat.shape[1], recon_weight=recon_weight)
+        t_train, w_train = targets(X_train, y_train)
+        model.fit(X_train[..., None], t_train, sample_weight=w_train,
+                  validation_data=(X_val[..., None], *targets(X_val, y_val)), epochs=epochs, batch_size=batch_size)
+        X_calib = X[y == healthy_label][:n_calibration]
+    else:
+        src = open_source(source)
+        if not src.has_labels:
+            raise ValueError("Multitask training needs a labelled source")
+        n_classes = n_classes or src.n_classes()
+
+        def targets(x, y_):
+            healthy = tf.cast(tf.equal(tf.argmax(y_, axis=-1), healthy_label), tf.float32)
+            return x, {'class_out': y_, 'recon_out': x}, {'class_out': tf.ones_like(healthy), 'recon_out': healthy}
+        train_ds = make_dataset(src, batch_size, n_classes=n_classes, augment=augment, cache=cache).map(targets)
+        val_ds = None
+        if val_source is not None:
+            val_ds = make_dataset(val_source, batch_size, n_classes=n_classes, shuffle=False).map(targets)
+        model = build_multitask(input_len=src.input_len, n_classes=n_classes, recon_weight=recon_weight)
+        model.fit(train_ds, validation_data=val_ds, epochs=epochs)
+        X_calib = sample(src, n_calibration, only_label=healthy_label)
+        grid = grid or src.grid
+    model.save(model_path)
+    _record_grid(model_path, grid, model.input_shape[1])
+    print("Saved multitask model to", model_path)
+    th_path = save_thresholds(calibrate(reconstruction_model(model), X_calib, quantile=quantile), model_path)
+    print("Saved anomaly thresholds to", th_path)
+    return model
+
 if __name__ == "__main__":
+    import joblib
     # placeholder quick test using synthetic data generator if available
-    if os.path.exists('synthetic.npy'):
+    if os.path.isdir(SHARDS_DIR):
+        train_classifier(source=SHARDS_DIR)
+        joblib.dump({'dummy':'ok'}, 'meta.joblib')
+    elif os.path.exists('synthetic.npy'):
         data = np.load('synthetic.npy', allow_pickle=True)
         X = np.stack([d['mag'] for d in data])
         y = np.array([d['label'] for d in data])
@@ -1,8 +1,10 @@
 # utils.py
-import matplotlib.pyplot as plt
 import numpy as np
+from decimate import decimate
 
 def plot_signal(freq, mag_db, title="FRA"):
+    import matplotlib.pyplot as plt
+    freq, mag_db = decimate(freq, mag_db)
     plt.figure(figsize=(9,4))
     plt.semilogx(freq, mag_db)
     plt.xlabel("Frequency (Hz)")
@@ -12,6 +14,7 @@ def plot_signal(freq, mag_db, title="FRA"):
     plt.show()
 
 def save_hdf5(path, parsed):
+    """One h5 file per trace. For fleets of sweeps use archive.FleetArchive instead."""
     import h5py
     with h5py.File(path,'w') as f:
         md = f.create_group('metadata')